@@ -0,0 +1,556 @@
+"""
+Sinh file xuất đơn hàng giả lập và đo thời gian các báo cáo của bae_engine, để so sánh hiệu năng giữa các phiên bản.
+File giả lập dùng đúng tên cột của file xuất (COLUMN_MAPPING), địa chỉ/tên tiếng Việt, và có chèn sẵn các nhóm gian lận
+(cùng số điện thoại, cùng IP trong 1 giờ, cùng N3, địa chỉ gần giống nhau...) để mọi báo cáo đều có kết quả.
+
+    python bae_bench.py generate --rows 100000 --out orders_100k.csv
+    python bae_bench.py run --rows 10000 100000 1000000 --report all --results bench.jsonl --label "3.0.3"
+    python bae_bench.py compare old.jsonl new.jsonl
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import bae_engine
+
+GENERATOR_VERSION = 1 # Tăng khi dữ liệu sinh ra với cùng tham số thay đổi (file đã sinh trong workdir bị bỏ)
+BENCH_ROWS = [10000, 100000, 1000000]
+BENCH_WORKDIR = os.path.join(tempfile.gettempdir(), 'bae_bench')
+EXPORT_START = datetime(2025, 1, 6) # Ngày đầu của file xuất giả lập
+
+# Số giá trị khác nhau của mỗi cột, tính theo tỉ lệ số dòng (0.5 -> 50 000 giá trị cho 100 000 dòng)
+DEFAULT_CARDINALITY = {
+    'buyer_id': 0.6,
+    'recipient_phone_': 0.8,
+    'ip_checkout': 0.7,
+    'N3': 0.5,
+    'buyer_shipping_address_district': 0.7,
+    'recipient_name': 0.3,
+    'pv_promotion_id': 0.001,
+    'fsv_voucher_code': 0.002,
+}
+
+# Các kiểu nhóm gian lận được chèn, xem _inject_ring
+RING_KINDS = ['phone', 'ip', 'n3', 'address', 'domain', 'city_state', 'name']
+
+PHONE_PREFIXES = ['90', '91', '93', '94', '96', '97', '98', '32', '33', '34', '35', '36', '37', '38', '39',
+                  '70', '76', '77', '78', '79', '81', '82', '83', '84', '85', '86', '88', '89']
+# Tỉnh/thành -> quận/huyện -> phường/xã
+LOCATIONS = {
+    'TP. Hồ Chí Minh': {
+        'Quận 1': ['Phường Bến Nghé', 'Phường Bến Thành', 'Phường Đa Kao'],
+        'Quận 3': ['Phường Võ Thị Sáu', 'Phường 9', 'Phường 14'],
+        'Quận Bình Thạnh': ['Phường 25', 'Phường 26', 'Phường 12'],
+        'TP. Thủ Đức': ['Phường An Phú', 'Phường Linh Trung', 'Phường Hiệp Bình Chánh'],
+        'Huyện Bình Chánh': ['Xã Bình Hưng', 'Xã Vĩnh Lộc A', 'Thị trấn Tân Túc'],
+    },
+    'Hà Nội': {
+        'Quận Ba Đình': ['Phường Kim Mã', 'Phường Liễu Giai', 'Phường Ngọc Hà'],
+        'Quận Cầu Giấy': ['Phường Dịch Vọng', 'Phường Yên Hòa', 'Phường Nghĩa Đô'],
+        'Quận Hoàng Mai': ['Phường Định Công', 'Phường Hoàng Liệt', 'Phường Tương Mai'],
+        'Huyện Gia Lâm': ['Xã Đa Tốn', 'Thị trấn Trâu Quỳ', 'Xã Kiêu Kỵ'],
+    },
+    'Đà Nẵng': {
+        'Quận Hải Châu': ['Phường Hòa Cường Bắc', 'Phường Thạch Thang'],
+        'Quận Sơn Trà': ['Phường An Hải Bắc', 'Phường Mân Thái'],
+    },
+    'Bình Dương': {
+        'TP. Thủ Dầu Một': ['Phường Phú Cường', 'Phường Hiệp Thành'],
+        'TP. Dĩ An': ['Phường Dĩ An', 'Phường Tân Đông Hiệp'],
+    },
+    'Cần Thơ': {
+        'Quận Ninh Kiều': ['Phường An Hòa', 'Phường Xuân Khánh'],
+    },
+    'Nghệ An': {
+        'TP. Vinh': ['Phường Hưng Bình', 'Phường Lê Lợi'],
+        'Huyện Diễn Châu': ['Xã Diễn Kỷ', 'Thị trấn Diễn Châu'],
+    },
+}
+STREETS = ['Lê Lợi', 'Nguyễn Huệ', 'Trần Hưng Đạo', 'Hai Bà Trưng', 'Lý Thường Kiệt', 'Phan Đình Phùng', 'Nguyễn Trãi',
+           'Điện Biên Phủ', 'Cách Mạng Tháng Tám', 'Võ Văn Kiệt', 'Lê Văn Sỹ', 'Hoàng Văn Thụ', 'Nguyễn Văn Cừ', 'Quang Trung',
+           'Phạm Văn Đồng', 'Xuân Thủy', 'Cầu Giấy', 'Kim Mã', 'Tôn Đức Thắng', 'Bạch Đằng']
+STREET_FORMATS = ['Số {no} {street}', '{no} đường {street}', 'Số {no}, ngõ {alley}, {street}', 'Hẻm {alley}/{no} {street}',
+                  'Tổ {alley}, ấp {no}', 'Chung cư {street}, Block {block}, phòng {no}']
+SURNAMES = ['Nguyễn', 'Trần', 'Lê', 'Phạm', 'Hoàng', 'Huỳnh', 'Phan', 'Vũ', 'Võ', 'Đặng', 'Bùi', 'Đỗ', 'Hồ', 'Ngô', 'Dương', 'Lý']
+MIDDLE_NAMES = ['Văn', 'Thị', 'Hữu', 'Minh', 'Ngọc', 'Thanh', 'Đức', 'Quang', 'Thu', 'Gia']
+GIVEN_NAMES = ['An', 'Bình', 'Châu', 'Dũng', 'Hà', 'Hải', 'Hương', 'Khánh', 'Linh', 'Long', 'Mai', 'Nam', 'Phúc', 'Quân',
+               'Sơn', 'Thảo', 'Trang', 'Tuấn', 'Vy', 'Yến', 'Huy', 'Lan', 'Tâm', 'Việt']
+PRODUCTS = ['Áo thun nam cổ tròn', 'Quần jean nữ ống rộng', 'Giày thể thao trắng', 'Tai nghe bluetooth', 'Sạc dự phòng 10000mAh',
+            'Kem chống nắng SPF50', 'Nồi chiên không dầu', 'Bình giữ nhiệt 500ml', 'Ốp lưng điện thoại', 'Son kem lì',
+            'Dầu gội thảo dược', 'Bàn phím cơ', 'Chuột không dây', 'Balo laptop', 'Đồng hồ thông minh']
+EMAIL_DOMAINS = ['gmail.com', 'yahoo.com', 'icloud.com', 'yahoo.com.vn', 'outlook.com', 'hotmail.com']
+EMAIL_DOMAIN_WEIGHTS = [0.8, 0.04, 0.05, 0.03, 0.04, 0.04]
+ADDRESS_ABBREVIATIONS = [('Phường', 'P.'), ('Quận', 'Q.'), ('Đường', 'Đ.'), ('đường', 'đ.'), ('Số', 'S.'), ('Thành phố', 'TP')]
+
+# Cột được chuẩn hóa trong báo cáo, đo riêng ở bước "normalize" (xem benchmark_report)
+NORMALIZED_COLUMNS = {
+    'same_order_value_similar_address': [('buyer_shipping_address_district', bae_engine.clean_addresses)],
+    'tolerant_address': [('buyer_shipping_address_district', bae_engine.clean_addresses)],
+    'similar_address': [('item_name', bae_engine.normalize_recipient_names),
+                        ('buyer_shipping_address_district', bae_engine.clean_addresses)],
+}
+STAGES = ['load', 'normalize', 'detect', 'write']
+
+
+# --- GENERATOR ---
+def _pool_size(rows, cardinality, column):
+    return max(1, int(round(rows * cardinality[column])))
+
+def _phones(rng, count):
+    """Distinct-looking Vietnamese mobile numbers as in the exports: 84 + 9 digits."""
+    prefixes = rng.choice(PHONE_PREFIXES, count)
+    numbers = rng.integers(0, 10 ** 7, count)
+    return np.array([f"84{prefix}{number:07d}" for prefix, number in zip(prefixes, numbers)], dtype=object)
+
+def _addresses(rng, count):
+    """(street line, state, city) of count home addresses spread over LOCATIONS."""
+    wards = [(state, city, ward) for state, cities in LOCATIONS.items() for city, city_wards in cities.items() for ward in city_wards]
+    picked = rng.integers(0, len(wards), count)
+    formats = rng.integers(0, len(STREET_FORMATS), count)
+    streets = rng.integers(0, len(STREETS), count)
+    numbers = rng.integers(1, 300, count)
+    alleys = rng.integers(1, 120, count)
+    lines = []
+    for ward_index, format_index, street_index, number, alley in zip(picked, formats, streets, numbers, alleys):
+        state, city, ward = wards[ward_index]
+        line = STREET_FORMATS[format_index].format(no=number, street=STREETS[street_index], alley=alley, block=chr(65 + alley % 6))
+        lines.append(f"{line}, {ward}, {city}")
+    states = np.array([wards[i][0] for i in picked], dtype=object)
+    cities = np.array([wards[i][1] for i in picked], dtype=object)
+    return np.array(lines, dtype=object), states, cities
+
+def _names(rng, count):
+    return np.array([f"{SURNAMES[a]} {MIDDLE_NAMES[b]} {GIVEN_NAMES[c]}" for a, b, c in zip(
+        rng.integers(0, len(SURNAMES), count), rng.integers(0, len(MIDDLE_NAMES), count),
+        rng.integers(0, len(GIVEN_NAMES), count))], dtype=object)
+
+def address_variant(address, rng):
+    """The same address written another way: without diacritics, abbreviated, lower case or with a typo."""
+    kind = rng.integers(0, 4)
+    if kind == 0:
+        return bae_engine.remove_diacritics(address)
+    if kind == 1:
+        for full, short in ADDRESS_ABBREVIATIONS:
+            address = address.replace(full, short)
+        return address
+    if kind == 2:
+        return address.lower().replace(',', '')
+    position = int(rng.integers(1, max(2, len(address) - 1)))
+    return address[:position - 1] + address[position] + address[position - 1] + address[position + 1:]
+
+def generate_orders(rows, seed=0, days=1, cardinality=None, rings=None, ring_size=(3, 12), variant_share=0.2):
+    """
+    Sinh một file xuất đơn hàng giả lập (tên cột như file thật, xem COLUMN_MAPPING).
+    Mỗi buyer có số điện thoại, IP, địa chỉ, N3, email và thời điểm đăng ký riêng, các đơn của buyer dùng lại các giá trị này
+    (kèm một phần đơn đổi số/địa chỉ/IP), sau đó các nhóm gian lận được chèn vào (xem _inject_ring).
+    Args:
+        rows (int): Số đơn hàng.
+        seed (int): Hạt giống ngẫu nhiên, cùng tham số luôn cho cùng dữ liệu.
+        days (int): Số ngày của file xuất (thời điểm tạo đơn trải đều).
+        cardinality (dict, optional): Ghi đè DEFAULT_CARDINALITY (tỉ lệ số giá trị khác nhau / số dòng).
+        rings (int, optional): Số nhóm gian lận, mặc định 1 nhóm mỗi 1000 đơn.
+        ring_size (tuple[int, int]): Số buyer tối thiểu/tối đa mỗi nhóm.
+        variant_share (float): Tỉ lệ đơn ghi địa chỉ theo cách khác (không dấu, viết tắt, lỗi gõ).
+    Returns:
+        tuple[pd.DataFrame, pd.DataFrame]: Dữ liệu đơn hàng và danh sách nhóm đã chèn (ring, kind, buyer_id).
+    """
+    rng = np.random.default_rng(seed)
+    cardinality = dict(DEFAULT_CARDINALITY, **(cardinality or {}))
+    start = np.datetime64(EXPORT_START, 's')
+    span_seconds = days * 24 * 3600
+
+    # Per buyer attributes, orders pick their buyer's values
+    buyer_count = _pool_size(rows, cardinality, 'buyer_id')
+    buyer_ids = 100000000 + rng.choice(buyer_count * 10, buyer_count, replace=False)
+    phones = _phones(rng, _pool_size(rows, cardinality, 'recipient_phone_'))
+    ips = np.array([f"{a}.{b}.{c}.{d}" for a, b, c, d in rng.integers([14, 0, 0, 1], [223, 256, 256, 255],
+                                                                      (_pool_size(rows, cardinality, 'ip_checkout'), 4))],
+                   dtype=object)
+    n3_values = np.array([phone[:8] for phone in _phones(rng, _pool_size(rows, cardinality, 'N3'))], dtype=object)
+    addresses, address_states, address_cities = _addresses(rng, _pool_size(rows, cardinality, 'buyer_shipping_address_district'))
+    names = _names(rng, _pool_size(rows, cardinality, 'recipient_name'))
+    promotions = 200000000 + np.arange(_pool_size(rows, cardinality, 'pv_promotion_id'))
+    vouchers = np.array([f"FSV{code:06d}" for code in rng.integers(0, 10 ** 6, _pool_size(rows, cardinality, 'fsv_voucher_code'))],
+                        dtype=object)
+
+    def own_values(pool_size):
+        # Each buyer its own value while the pool is large enough, then shared at random
+        if pool_size >= buyer_count:
+            return rng.permutation(pool_size)[:buyer_count]
+        return rng.integers(0, pool_size, buyer_count)
+
+    buyer_phone = own_values(len(phones))
+    buyer_ip = own_values(len(ips))
+    buyer_n3 = own_values(len(n3_values))
+    buyer_address = own_values(len(addresses))
+    buyer_name = own_values(len(names))
+    # 15% of the buyers registered during the export, the others up to a few years before
+    new_buyer = rng.random(buyer_count) < 0.15
+    registration = np.where(new_buyer, rng.integers(0, span_seconds, buyer_count),
+                            -rng.exponential(200 * 24 * 3600, buyer_count).astype(np.int64))
+    has_email = rng.random(buyer_count) < 0.35
+    email_domain = rng.choice(EMAIL_DOMAINS, buyer_count, p=EMAIL_DOMAIN_WEIGHTS)
+    email_domain = np.where(rng.random(buyer_count) < 0.05, [f"cty{i % 300}.vn" for i in range(buyer_count)], email_domain)
+    emails = np.array([f"user{buyer}@{domain}" if email else None
+                       for buyer, domain, email in zip(buyer_ids, email_domain, has_email)], dtype=object)
+
+    buyer = rng.integers(0, buyer_count, rows)
+
+    def own_or_random(own, pool_size, share):
+        return np.where(rng.random(rows) < share, rng.integers(0, pool_size, rows), own[buyer])
+
+    phone_index = own_or_random(buyer_phone, len(phones), 0.1)
+    address_index = own_or_random(buyer_address, len(addresses), 0.1)
+    ip_index = own_or_random(buyer_ip, len(ips), 0.3)
+    name_index = own_or_random(buyer_name, len(names), 0.2)
+    create_offset = np.maximum(rng.integers(0, span_seconds, rows), registration[buyer] + rng.integers(60, 3600, rows))
+    item_amount = rng.choice([1, 2, 3, 4, 5, 6], rows, p=[0.55, 0.2, 0.1, 0.07, 0.05, 0.03])
+    gmv = (np.round(rng.lognormal(np.log(250000), 0.9, rows) * np.sqrt(item_amount), -3)).astype(np.int64)
+
+    street_lines = addresses[address_index].copy()
+    for row in np.flatnonzero(rng.random(rows) < variant_share):
+        street_lines[row] = address_variant(street_lines[row], rng)
+    ip_column = ips[ip_index].copy()
+    ip_column[rng.random(rows) < 0.03] = '-'
+
+    # Plain arrays until the rings are in: setting rows of a DataFrame column copies its whole block
+    columns = {
+        'Order ID': np.zeros(rows, dtype=np.int64),
+        'Order Creation Time': start + create_offset.astype('timedelta64[s]'),
+        'Buyer User ID': buyer_ids[buyer],
+        'Buyer Registration Time': start + registration[buyer].astype('timedelta64[s]'),
+        'Buyer Recipient Address': street_lines.copy(),
+        'Buyer Recipient Address State': address_states[address_index],
+        'Buyer Recipient Address City': address_cities[address_index],
+        'Buyer Recipient Address District': street_lines,
+        'Buyer Recipient Phone': phones[phone_index],
+        'PV Promotion ID': np.where(rng.random(rows) < 0.4, rng.choice(promotions, rows), np.nan),
+        'Checkout IP Address': ip_column,
+        '# Items': item_amount,
+        'Order Value (Checkout Amount)': gmv,
+        'N3': n3_values[buyer_n3[buyer]],
+        'fsv_voucher_code': np.where(rng.random(rows) < 0.15, rng.choice(vouchers, rows), None),
+        'recipient_name': names[name_index],
+        'item_name': rng.choice(PRODUCTS, rows),
+        'domain': np.array([email.split('@')[1] if email else None for email in emails[buyer]], dtype=object),
+        'buyer_email': emails[buyer],
+    }
+
+    ring_rows = []
+    next_buyer_id = 900000000
+    for ring in range(rows // 1000 if rings is None else rings):
+        size = int(rng.integers(ring_size[0], ring_size[1] + 1))
+        kind = RING_KINDS[ring % len(RING_KINDS)]
+        rows_index = rng.choice(rows, size, replace=False)
+        ring_buyers = np.arange(next_buyer_id, next_buyer_id + size)
+        next_buyer_id += size
+        _inject_ring(columns, rows_index, ring_buyers, kind, ring, rng, start, span_seconds)
+        ring_rows.extend({'ring': ring, 'kind': kind, 'buyer_id': buyer_id} for buyer_id in ring_buyers)
+
+    df = pd.DataFrame(columns)
+    df['Order Creation Time'] = df['Order Creation Time'].astype('datetime64[ns]')
+    df['Buyer Registration Time'] = df['Buyer Registration Time'].astype('datetime64[ns]')
+    df = df.sort_values('Order Creation Time', kind='stable').reset_index(drop=True)
+    df['Order ID'] = 250106000000000 + np.arange(rows)
+    return df, pd.DataFrame(ring_rows, columns=['ring', 'kind', 'buyer_id'])
+
+def _inject_ring(columns, rows_index, ring_buyers, kind, ring, rng, start, span_seconds):
+    """
+    Gives rows_index to new buyers sharing what one report looks for:
+    phone: cùng số nhận, khuyến mãi, voucher và địa chỉ; ip: cùng IP trong 50 phút; n3: cùng N3, đăng ký trong 50 phút;
+    address: địa chỉ viết khác nhau của một nơi, cùng giá trị đơn và sản phẩm; domain: cùng tên miền email riêng,
+    đăng ký trong 50 phút; city_state: cùng tỉnh/quận, không email, đặt đơn trong 20 phút sau khi đăng ký;
+    name: cùng tên người nhận và địa chỉ.
+    """
+    size = len(rows_index)
+    template = {name: values[rows_index[0]] for name, values in columns.items()}
+    t0 = int(rng.integers(0, max(1, span_seconds - 3600)))
+    within_hour = start + (t0 + np.sort(rng.integers(0, 50 * 60, size))).astype('timedelta64[s]')
+
+    def put(column, values):
+        columns[column][rows_index] = values
+
+    put('Buyer User ID', ring_buyers)
+    if kind in ('phone', 'address', 'city_state', 'name'):
+        for column in ['Buyer Recipient Address State', 'Buyer Recipient Address City', 'Buyer Recipient Address District',
+                       'Buyer Recipient Address']:
+            put(column, template[column])
+    if kind == 'phone':
+        put('Buyer Recipient Phone', template['Buyer Recipient Phone'])
+        put('PV Promotion ID', 290000000 + ring)
+        put('fsv_voucher_code', f"FSVRING{ring:04d}")
+    elif kind == 'ip':
+        put('Checkout IP Address', f"100.64.{ring // 256 % 256}.{ring % 256}")
+        put('Order Creation Time', within_hour)
+    elif kind == 'n3':
+        put('N3', f"849{ring:05d}")
+        put('Buyer Registration Time', within_hour)
+        put('Order Creation Time', within_hour + np.timedelta64(2, 'h'))
+    elif kind == 'address':
+        variants = [address_variant(template['Buyer Recipient Address District'], rng) for _ in range(size)]
+        put('Buyer Recipient Address District', variants)
+        put('Buyer Recipient Address', variants)
+        put('Order Value (Checkout Amount)', template['Order Value (Checkout Amount)'])
+        put('# Items', 3)
+        put('item_name', template['item_name'])
+    elif kind == 'domain':
+        put('buyer_email', [f"nv{buyer_id}@ring{ring}.vn" for buyer_id in ring_buyers])
+        put('domain', f"ring{ring}.vn")
+        put('Buyer Registration Time', within_hour)
+    elif kind == 'city_state':
+        put('buyer_email', None)
+        put('domain', None)
+        put('Order Creation Time', within_hour)
+        put('Buyer Registration Time', within_hour - rng.integers(60, 15 * 60, size).astype('timedelta64[s]'))
+    elif kind == 'name':
+        put('recipient_name', template['recipient_name'])
+
+def write_export(df, path):
+    """Writes a generated export as .csv or .xlsx (by extension), like the files the reports read."""
+    if path.lower().endswith('.csv'):
+        df.to_csv(path, index=False)
+    else:
+        bae_engine.write_workbook([('Sheet1', df)], path)
+
+
+# --- BENCHMARK ---
+def _export_path(workdir, rows, seed, input_format):
+    return os.path.join(workdir, f"orders_{rows}_s{seed}_g{GENERATOR_VERSION}.{input_format}")
+
+@contextlib.contextmanager
+def _isolated_caches(workdir):
+    """Points the engine's Parquet sidecars and normalized-string store into workdir, so runs start cold and leave the user's caches alone."""
+    saved = bae_engine.SIDECAR_CACHE_DIR, bae_engine.NORMALIZED_STORE
+    bae_engine.SIDECAR_CACHE_DIR = os.path.join(workdir, 'sidecars')
+    try:
+        yield
+    finally:
+        bae_engine.SIDECAR_CACHE_DIR, bae_engine.NORMALIZED_STORE = saved
+        bae_engine.DATASET_CACHE.clear()
+
+def _cold_start(workdir):
+    bae_engine.DATASET_CACHE.clear()
+    shutil.rmtree(bae_engine.SIDECAR_CACHE_DIR, ignore_errors=True)
+    store_path = os.path.join(workdir, 'normalized.sqlite')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(store_path + suffix):
+            os.remove(store_path + suffix)
+    bae_engine.NORMALIZED_STORE = bae_engine.NormalizedStore(path=store_path)
+
+def benchmark_report(report_key, input_file_path, workdir, result_format=bae_engine.DEFAULT_RESULT_FORMAT):
+    """
+    Đo một báo cáo theo từng bước, bắt đầu từ bộ nhớ đệm trống:
+    load (đọc và chuẩn hóa kiểu dữ liệu file), normalize (chuẩn hóa địa chỉ/tên, chỉ các báo cáo trong NORMALIZED_COLUMNS),
+    detect (worker.run() trên dữ liệu đã đọc và chuẩn hóa), write (ghi file kết quả).
+    Returns:
+        dict: Thời gian (giây) của từng bước trong STAGES, 'total', 'ids' (số ID tìm được) và 'success'.
+    """
+    _cold_start(workdir)
+    logs = bae_engine.Signal(str)._bind()
+    worker_cls = bae_engine.REPORTS[report_key]['worker']
+    timings = {}
+
+    started = time.perf_counter()
+    df = bae_engine.read_and_map_data(input_file_path, logs, worker_cls.INPUT_COLUMNS)
+    timings['load'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    for column, normalize in NORMALIZED_COLUMNS.get(report_key, []):
+        if df is not None and column in df.columns:
+            normalize(df[column])
+    timings['normalize'] = time.perf_counter() - started
+
+    output_folder = os.path.join(workdir, 'out')
+    os.makedirs(output_folder, exist_ok=True)
+    output_file_path = bae_engine.result_output_path(output_folder, report_key, result_format)
+    if os.path.exists(output_file_path):
+        os.remove(output_file_path)
+    worker = bae_engine.create_worker(report_key, input_file_path, output_file_path)
+    worker.result_format = result_format
+    outcome = []
+    worker.finished.connect(lambda result: outcome.append(result is not None))
+    started = time.perf_counter()
+    worker.run()
+    timings['detect'] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    write_failed = worker.pending_result is not None and worker.pending_result.exception() is not None
+    timings['write'] = time.perf_counter() - started
+
+    success = bool(outcome and outcome[0]) and not write_failed
+    timings['total'] = sum(timings[stage] for stage in STAGES)
+    timings['ids'] = bae_engine._count_output_ids(worker.output_file_path) if success else 0
+    timings['success'] = success
+    return timings
+
+def _code_version():
+    """version.txt plus the git commit when run from a checkout."""
+    folder = os.path.dirname(os.path.abspath(__file__))
+    version = ''
+    if os.path.exists(os.path.join(folder, 'version.txt')):
+        with open(os.path.join(folder, 'version.txt'), encoding='utf-8') as f:
+            version = f.read().strip()
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=folder, capture_output=True, text=True,
+                                timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ''
+    return f"{version}+{commit}" if commit else version
+
+def run_benchmark(rows_list, report_keys, workdir=BENCH_WORKDIR, results_path=None, seed=0, label=None, input_format='csv',
+                  repeat=1, result_format=bae_engine.DEFAULT_RESULT_FORMAT, log=print):
+    """
+    Chạy benchmark_report cho mọi báo cáo trên file giả lập của mỗi số dòng (file được sinh một lần và giữ trong workdir).
+    Args:
+        rows_list (list[int]): Các số dòng, vd. BENCH_ROWS.
+        report_keys (list[str]): Các khóa trong REPORTS.
+        workdir (str): Thư mục chứa file giả lập, bộ nhớ đệm và kết quả tạm.
+        results_path (str, optional): File JSON Lines nhận thêm một dòng mỗi (số dòng, báo cáo), để so sánh bằng compare_results.
+        seed (int): Hạt giống của file giả lập.
+        label (str, optional): Nhãn của lần đo (vd. tên nhánh), mặc định là phiên bản code.
+        input_format (str): 'csv' hoặc 'xlsx'.
+        repeat (int): Số lần đo mỗi báo cáo, giữ lần nhanh nhất.
+        result_format (str): Định dạng file kết quả (RESULT_FORMATS).
+        log (callable): Nhận từng dòng tiến trình.
+    Returns:
+        list[dict]: Các bản ghi đã đo.
+    """
+    os.makedirs(workdir, exist_ok=True)
+    version = _code_version()
+    records = []
+    with _isolated_caches(workdir):
+        for rows in rows_list:
+            input_file_path = _export_path(workdir, rows, seed, input_format)
+            if not os.path.exists(input_file_path):
+                log(f"ℹ️ Đang sinh {rows} đơn hàng: {input_file_path}")
+                write_export(generate_orders(rows, seed=seed)[0], input_file_path)
+            for report_key in report_keys:
+                runs = [benchmark_report(report_key, input_file_path, workdir, result_format) for _ in range(max(1, repeat))]
+                best = min(runs, key=lambda timings: timings['total'])
+                record = {
+                    'label': label or version, 'version': version, 'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'rows': rows, 'report': report_key, 'seed': seed, 'generator': GENERATOR_VERSION,
+                    'input_format': input_format, 'result_format': result_format,
+                    **{f"{stage}_s": round(best[stage], 4) for stage in STAGES + ['total']},
+                    'ids': best['ids'], 'success': best['success'],
+                    'python': platform.python_version(), 'pandas': pd.__version__, 'cpus': os.cpu_count(),
+                }
+                records.append(record)
+                log(f"{rows:>8} {report_key:<34} " + " ".join(f"{stage} {best[stage]:7.2f}s" for stage in STAGES)
+                    + f" | {best['total']:7.2f}s {best['ids']:>7} ID{'' if best['success'] else ' ❌'}")
+                if results_path:
+                    with open(results_path, 'a', encoding='utf-8') as f:
+                        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+    return records
+
+def load_results(results_path, label=None):
+    """(rows, report) -> fastest record of a results file, only the records of label when given (default: the last label)."""
+    with open(results_path, encoding='utf-8') as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    if records:
+        label = label or records[-1]['label']
+    best = {}
+    for record in records:
+        key = (record['rows'], record['report'])
+        if record['label'] == label and (key not in best or record['total_s'] < best[key]['total_s']):
+            best[key] = record
+    return best
+
+def compare_results(old, new, log=print):
+    """
+    So sánh hai kết quả của load_results: thời gian từng báo cáo và số ID (khác số ID nghĩa là kết quả đã đổi).
+    Returns:
+        bool: True nếu mọi báo cáo có cùng số ID.
+    """
+    same_ids = True
+    log(f"{'rows':>8} {'report':<34} {'old':>9} {'new':>9} {'change':>8}  ids")
+    for key in sorted(set(old) & set(new)):
+        before, after = old[key], new[key]
+        change = (after['total_s'] - before['total_s']) / before['total_s'] * 100 if before['total_s'] else 0.0
+        ids_match = before['ids'] == after['ids']
+        same_ids &= ids_match
+        log(f"{key[0]:>8} {key[1]:<34} {before['total_s']:8.2f}s {after['total_s']:8.2f}s {change:+7.1f}%  "
+            + (f"{after['ids']}" if ids_match else f"{before['ids']} -> {after['ids']} ⚠️"))
+    for key in sorted(set(old) ^ set(new)):
+        log(f"{key[0]:>8} {key[1]:<34} chỉ có trong {'bản cũ' if key in old else 'bản mới'}")
+    return same_ids
+
+
+# --- COMMAND LINE ---
+def _cardinality_option(value):
+    column, _, ratio = value.partition('=')
+    if column not in DEFAULT_CARDINALITY or not ratio:
+        raise argparse.ArgumentTypeError(f"cần COT=TI_LE với COT thuộc: {', '.join(DEFAULT_CARDINALITY)}")
+    return column, float(ratio)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bae_bench', description="Sinh dữ liệu giả lập và đo thời gian các báo cáo.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    generate_parser = commands.add_parser('generate', help="Sinh một file xuất đơn hàng giả lập")
+    generate_parser.add_argument('--rows', type=int, required=True, metavar='N', help="Số đơn hàng")
+    generate_parser.add_argument('--out', required=True, metavar='FILE', help="File .csv hoặc .xlsx")
+    generate_parser.add_argument('--seed', type=int, default=0)
+    generate_parser.add_argument('--days', type=int, default=1, help="Số ngày của file xuất")
+    generate_parser.add_argument('--rings', type=int, metavar='N', help="Số nhóm gian lận chèn vào (mặc định 1 nhóm / 1000 đơn)")
+    generate_parser.add_argument('--ring-size', type=int, nargs=2, default=(3, 12), metavar=('MIN', 'MAX'),
+                                 help="Số buyer mỗi nhóm gian lận")
+    generate_parser.add_argument('--cardinality', type=_cardinality_option, action='append', default=[], metavar='COT=TI_LE',
+                                 help="Tỉ lệ số giá trị khác nhau / số dòng của một cột, vd. recipient_phone_=0.2")
+    generate_parser.add_argument('--rings-out', metavar='FILE', help="Lưu danh sách nhóm đã chèn (ring, kind, buyer_id) ra file CSV")
+    run_parser = commands.add_parser('run', help="Đo thời gian các báo cáo trên dữ liệu giả lập")
+    run_parser.add_argument('--rows', type=int, nargs='+', default=BENCH_ROWS, metavar='N')
+    run_parser.add_argument('--report', action='append', metavar='KEY', help="Khóa báo cáo, lặp lại để đo nhiều báo cáo (mặc định tất cả)")
+    run_parser.add_argument('--workdir', default=BENCH_WORKDIR, metavar='DIR')
+    run_parser.add_argument('--results', metavar='FILE', help="File JSON Lines lưu kết quả đo")
+    run_parser.add_argument('--label', help="Nhãn của lần đo, mặc định là phiên bản code")
+    run_parser.add_argument('--seed', type=int, default=0)
+    run_parser.add_argument('--input-format', choices=['csv', 'xlsx'], default='csv')
+    run_parser.add_argument('--format', dest='result_format', choices=bae_engine.available_result_formats(),
+                            default=bae_engine.DEFAULT_RESULT_FORMAT, help="Định dạng file kết quả")
+    run_parser.add_argument('--repeat', type=int, default=1, help="Số lần đo mỗi báo cáo, giữ lần nhanh nhất")
+    compare_parser = commands.add_parser('compare', help="So sánh hai file kết quả đo")
+    compare_parser.add_argument('old', metavar='OLD.jsonl')
+    compare_parser.add_argument('new', metavar='NEW.jsonl')
+    compare_parser.add_argument('--old-label')
+    compare_parser.add_argument('--new-label')
+    args = parser.parse_args(argv)
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(errors='replace')
+
+    if args.command == 'generate':
+        started = time.perf_counter()
+        df, rings = generate_orders(args.rows, seed=args.seed, days=args.days, cardinality=dict(args.cardinality),
+                                    rings=args.rings, ring_size=tuple(args.ring_size))
+        write_export(df, args.out)
+        if args.rings_out:
+            rings.to_csv(args.rings_out, index=False)
+        print(f"✅ Đã sinh {len(df)} đơn hàng, {rings['ring'].nunique()} nhóm gian lận tại: {args.out} "
+              f"({time.perf_counter() - started:.1f}s)")
+        return 0
+
+    if args.command == 'compare':
+        return 0 if compare_results(load_results(args.old, args.old_label), load_results(args.new, args.new_label)) else 1
+
+    report_keys = list(bae_engine.REPORTS) if not args.report or 'all' in args.report else list(dict.fromkeys(args.report))
+    unknown = [key for key in report_keys if key not in bae_engine.REPORTS]
+    if unknown:
+        parser.error(f"không có báo cáo: {', '.join(unknown)}")
+    records = run_benchmark(args.rows, report_keys, workdir=args.workdir, results_path=args.results, seed=args.seed,
+                            label=args.label, input_format=args.input_format, repeat=args.repeat,
+                            result_format=args.result_format)
+    return 0 if all(record['success'] for record in records) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
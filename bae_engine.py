@@ -0,0 +1,4542 @@
+"""
+Engine phát hiện nhóm ID, không phụ thuộc PyQt: đọc và chuẩn hóa dữ liệu đầu vào, các engine nhóm theo khóa và
+theo cửa sổ thời gian, chuẩn hóa địa chỉ, các Worker của từng báo cáo và BatchWorker chạy nhiều báo cáo song song.
+Giao diện (baepink3.0.3.py) chạy các worker này trong QThread, còn trên server không có màn hình thì dùng dòng lệnh:
+
+    python bae_engine.py list
+    python bae_engine.py run --report ip_create_time --in x.xlsx --out dir/
+"""
+import pandas as pd
+import numpy as np
+from datetime import datetime, timedelta
+import sys
+import os
+import time
+import argparse
+import glob
+import unicodedata
+import re
+import openpyxl
+from pandas.io.parsers import TextParser
+from fuzzywuzzy import fuzz
+import hashlib
+import json
+import shutil
+import tempfile
+import sqlite3
+import functools
+import contextlib
+import threading
+import queue
+import multiprocessing
+import ctypes
+import platform
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from collections import OrderedDict
+try:
+    import pyarrow # Dùng cho bộ nhớ đệm Parquet trên đĩa (không bắt buộc)
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+try:
+    import resource # Đo RSS cao nhất của process (không có trên Windows)
+except ImportError:
+    resource = None
+try:
+    import xlsxwriter # Ghi file kết quả .xlsx theo luồng, ít tốn bộ nhớ (không bắt buộc)
+    HAS_XLSXWRITER = True
+except ImportError:
+    HAS_XLSXWRITER = False
+try:
+    from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process # So khớp chuỗi theo lô (không bắt buộc)
+    HAS_RAPIDFUZZ = True
+except ImportError:
+    HAS_RAPIDFUZZ = False
+
+# --- CALLBACKS ---
+class BoundSignal(object):
+    """Callbacks of one signal on one object, called synchronously in the emitting thread."""
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def emit(self, *args):
+        for slot in list(self._slots):
+            slot(*args)
+
+class Signal(object):
+    """
+    Declared on a class like QtCore.pyqtSignal (progress = Signal(int)), so workers keep the same
+    progress/log/finished interface without Qt: each instance gets its own BoundSignal.
+    The UI connects these to real Qt signals, scripts and the command line pass plain callables.
+    """
+    def __init__(self, *types):
+        self.types = types
+
+    def __set_name__(self, owner, name):
+        self.attr_name = f'_signal_{name}'
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        bound = instance.__dict__.get(self.attr_name)
+        if bound is None:
+            bound = instance.__dict__[self.attr_name] = self._bind()
+        return bound
+
+    def _bind(self):
+        return BoundSignal()
+
+PROGRESS_MAX_RATE_HZ = 20 # Số lần cập nhật tiến độ tối đa mỗi giây
+
+class ThrottledBoundSignal(BoundSignal):
+    """
+    BoundSignal of a percentage: repeated values and values arriving faster than PROGRESS_MAX_RATE_HZ
+    are dropped before reaching the slots (0 and 100 always pass), so a worker can report after
+    every group without flooding the UI thread with cross-thread signals.
+    """
+    def __init__(self):
+        super().__init__()
+        self._last_value = None
+        self._last_time = 0.0
+
+    def emit(self, value):
+        if value == self._last_value:
+            return
+        now = time.monotonic()
+        if now - self._last_time < 1 / PROGRESS_MAX_RATE_HZ and value not in (0, 100):
+            return
+        self._last_value = value
+        self._last_time = now
+        super().emit(value)
+
+class ThrottledSignal(Signal):
+    """Signal(int) for progress percentages, see ThrottledBoundSignal."""
+    def _bind(self):
+        return ThrottledBoundSignal()
+
+# Mức chi tiết của nhật ký: LOG_DETAIL_VERBOSE ghi thêm từng nhóm tìm được
+LOG_DETAIL_NORMAL = 1
+LOG_DETAIL_VERBOSE = 2
+
+# --- DATASET CACHE CONFIGURATION ---
+DATASET_CACHE_MAX_ENTRIES = 4 # Số file tối đa giữ trong bộ nhớ
+DATASET_CACHE_MAX_BYTES = 2 * 1024 ** 3 # Ngân sách bộ nhớ (2 GB) cho các DataFrame đã đọc
+
+# Parquet copies of parsed inputs, reused across app restarts
+SIDECAR_CACHE_DIR = os.path.join(
+    os.environ.get('LOCALAPPDATA') or os.path.join(os.path.expanduser('~'), '.cache'), 'baepink', 'datasets')
+SIDECAR_FORMAT_VERSION = 4 # Tăng khi COLUMN_MAPPING hoặc cách chuẩn hóa kiểu dữ liệu thay đổi
+SIDECAR_MAX_FILES = 30 # Số file đầu vào tối đa giữ bản Parquet trong thư mục cache
+CSV_CHUNK_ROWS = 200000 # Số dòng đọc mỗi lần từ file CSV
+
+# Compact typed frame: các cột khóa dạng chuỗi được lưu dạng category (mã số nguyên + bảng giá trị để xuất kết quả),
+# các cột thời gian dạng datetime64[ns] (int64 nano giây), xem compact_frame
+KEY_COLUMNS = ['buyer_id', 'recipient_phone_', 'pv_promotion_id', 'fsv_voucher_code', 'ip_checkout', 'N3', 'domain',
+               'recipient_name', 'buyer_shipping_address_state', 'buyer_shipping_address_city', 'buyer_shipping_address_district']
+TIME_COLUMNS = ['create_time', 'registration_time']
+
+# Define the column mapping: tên cột dùng trong báo cáo -> tên cột trong file xuất
+COLUMN_MAPPING = {
+    'order_id': 'Order ID',
+    'create_time': 'Order Creation Time',
+    'buyer_id': 'Buyer User ID',
+    'registration_time': 'Buyer Registration Time',
+    'buyer_shipping_address': 'Buyer Recipient Address',
+    'buyer_shipping_address_state': 'Buyer Recipient Address State',
+    'buyer_shipping_address_city': 'Buyer Recipient Address City',
+    'buyer_shipping_address_district': 'Buyer Recipient Address District',
+    'recipient_phone_': 'Buyer Recipient Phone',
+    'pv_promotion_id': 'PV Promotion ID',
+    'ip_checkout': 'Checkout IP Address',
+    'item_amount': '# Items',
+    'gmv_vnd': 'Order Value (Checkout Amount)'
+}
+
+# Raw address/name -> normalized form, reused across sessions
+NORMALIZED_STORE_PATH = os.path.join(os.path.dirname(SIDECAR_CACHE_DIR), 'normalized.sqlite')
+NORMALIZED_STORE_MAX_ROWS = 2000000 # Số chuỗi tối đa, các chuỗi cũ nhất bị xóa trước
+
+# Per-key state of the incremental daily reports
+INCREMENTAL_STATE_PATH = os.path.join(os.path.dirname(SIDECAR_CACHE_DIR), 'incremental.sqlite')
+INCREMENTAL_STATE_VERSION = 1 # Tăng khi cách lưu trạng thái thay đổi
+INCREMENTAL_WINDOW_RETENTION = timedelta(days=30) # Các đơn cũ hơn bị xóa khỏi cửa sổ thời gian, None để giữ tất cả
+
+class DatasetCache:
+    """
+    Process-wide cache of mapped DataFrames, so every report run on the same input
+    file reuses one parsed copy instead of going through openpyxl again.
+
+    Entries are keyed by (absolute path, mtime, size, content hash) and evicted in
+    LRU order once either DATASET_CACHE_MAX_ENTRIES or DATASET_CACHE_MAX_BYTES is exceeded.
+    An entry may hold only the columns requested so far; it keeps the file's full mapped
+    header so readers can tell which columns are still missing, and grows as they are loaded.
+    Callers receive shallow copies: they may add, replace or drop columns and rows freely,
+    but must not write values in place into the shared arrays.
+    """
+    HASH_CHUNK_SIZE = 1024 * 1024
+
+    def __init__(self, max_entries=DATASET_CACHE_MAX_ENTRIES, max_bytes=DATASET_CACHE_MAX_BYTES):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict() # key -> (DataFrame, size in bytes, header)
+        self._digests = {} # (path, mtime_ns, size) -> content hash
+        self._lock = threading.Lock()
+        self._path_locks = {}
+
+    def _file_digest(self, stat_key):
+        """Returns the content hash of a file, hashing it only once per (path, mtime, size)."""
+        digest = self._digests.get(stat_key)
+        if digest is None:
+            hasher = hashlib.sha1()
+            with open(stat_key[0], 'rb') as f:
+                for chunk in iter(lambda: f.read(self.HASH_CHUNK_SIZE), b''):
+                    hasher.update(chunk)
+            digest = hasher.hexdigest()
+            self._digests[stat_key] = digest
+        return digest
+
+    def make_key(self, file_path):
+        """Builds the cache key for file_path. Raises FileNotFoundError if it does not exist."""
+        abs_path = os.path.abspath(file_path)
+        st = os.stat(abs_path)
+        stat_key = (abs_path, st.st_mtime_ns, st.st_size)
+        return stat_key + (self._file_digest(stat_key),)
+
+    def path_lock(self, file_path):
+        """Lock shared by all readers of one path, so concurrent reports parse a file only once."""
+        abs_path = os.path.abspath(file_path)
+        with self._lock:
+            return self._path_locks.setdefault(abs_path, threading.Lock())
+
+    def get(self, key):
+        """Returns (view of the cached DataFrame, mapped header) for key, or (None, None) on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None, None
+            self._entries.move_to_end(key)
+            return entry[0].copy(deep=False), entry[2]
+
+    def put(self, key, df, header):
+        """Stores df, holding some or all columns of header, under key and evicts least recently used entries over budget."""
+        with self._lock:
+            previous = self._entries.get(key)
+        if previous is not None and set(previous[0].columns) <= set(df.columns):
+            # Only the added columns need measuring
+            added = [col for col in df.columns if col not in set(previous[0].columns)]
+            size = previous[1] + int(df[added].memory_usage(index=False, deep=True).sum()) if added else previous[1]
+        else:
+            size = int(df.memory_usage(index=True, deep=True).sum())
+        with self._lock:
+            # Older versions of the same path can never be hit again
+            for old_key in [k for k in self._entries if k[0] == key[0] and k != key]:
+                del self._entries[old_key]
+            self._entries[key] = (df, size, header)
+            self._entries.move_to_end(key)
+            total = sum(s for _, s, _ in self._entries.values())
+            while len(self._entries) > 1 and (len(self._entries) > self.max_entries or total > self.max_bytes):
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                total -= evicted_size
+        return df.copy(deep=False)
+
+    def seed(self, key, df=None):
+        """Registers a known content hash for key (and optionally its full frame) without re-hashing the file."""
+        with self._lock:
+            self._digests[key[:3]] = key[3]
+        if df is not None:
+            self.put(key, df, list(df.columns))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests.clear()
+
+DATASET_CACHE = DatasetCache()
+
+SIDECAR_VALUE_TYPES = {'i': int, 'f': float, 's': str, 'b': lambda text: text == 'True'} # Kiểu Python của từng ô trong cột nhiều kiểu
+
+def _mixed_column_frame(series):
+    """
+    Parquet form of an object column holding mixed Python types (e.g. phone numbers read partly
+    as int, partly as str): every value as text in 'value' and its type in 'type', so
+    _restore_mixed_column gives back the same values and 912345678 and '912345678' stay different keys.
+    Returns None when a value has a type the sidecar cannot restore.
+    """
+    tags = {bool: 'b', str: 's'}
+    types = []
+    for value in series:
+        if value is None:
+            types.append(None)
+        elif isinstance(value, (int, np.integer)) and not isinstance(value, (bool, np.bool_)):
+            types.append('i')
+        elif isinstance(value, (float, np.floating)):
+            types.append('f')
+        elif type(value) in tags:
+            types.append(tags[type(value)])
+        else:
+            return None
+    values = [None if tag is None else repr(float(value)) if tag == 'f' else str(value) for value, tag in zip(series, types)]
+    return pd.DataFrame({'value': values, 'type': types})
+
+def _restore_mixed_column(frame):
+    """Values of a column written by _mixed_column_frame, with their original Python types."""
+    values = [None if tag is None else SIDECAR_VALUE_TYPES[tag](text) for text, tag in zip(frame['value'], frame['type'])]
+    return pd.Series(values, dtype=object)
+
+def _is_mixed_column(series):
+    return series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) in ('mixed', 'mixed-integer')
+
+def _downcast_integers(df):
+    """Stores int64 columns whose values fit in int32 as int32, halving their memory."""
+    int32 = np.iinfo(np.int32)
+    for col in df.columns[df.dtypes == np.int64]:
+        if len(df) and int32.min <= df[col].min() and df[col].max() <= int32.max:
+            df[col] = df[col].astype(np.int32)
+    return df
+
+def compact_frame(df):
+    """
+    Turns a freshly parsed frame into its compact typed form, once per file instead of once per report.
+    String KEY_COLUMNS become categoricals with sorted categories: group-bys, sorts and factorize then
+    run on the integer codes in the same order as on the strings, and the categories keep the values
+    for the output. TIME_COLUMNS are parsed to datetime64[ns] like the reports' pd.to_datetime(errors='coerce'),
+    and integer columns are downcast. Numeric keys and float IDs (whose NaN never match) are left as they are.
+    """
+    for col in df.columns.intersection(KEY_COLUMNS):
+        if df[col].dtype == object and pd.api.types.infer_dtype(df[col], skipna=True) == 'string':
+            df[col] = df[col].astype('category')
+    for col in df.columns.intersection(TIME_COLUMNS):
+        df[col] = pd.to_datetime(df[col], errors='coerce')
+    return _downcast_integers(df)
+
+def _sidecar_dir(content_hash):
+    return os.path.join(SIDECAR_CACHE_DIR, f"{content_hash}.v{SIDECAR_FORMAT_VERSION}")
+
+def _sidecar_column_path(content_hash, header, column):
+    # Column names can be anything, files are named after the column's position in the header
+    return os.path.join(_sidecar_dir(content_hash), f"{header.index(column)}.parquet")
+
+def _sidecar_header(content_hash):
+    """Returns the mapped header stored with a file's Parquet copy, or None if there is none."""
+    if not HAS_PYARROW:
+        return None
+    try:
+        with open(os.path.join(_sidecar_dir(content_hash), 'header.json'), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def _read_sidecar_column(path):
+    frame = pd.read_parquet(path, engine='pyarrow', memory_map=True)
+    return _restore_mixed_column(frame) if 'type' in frame.columns else frame.iloc[:, 0]
+
+def _load_sidecar(content_hash, header, columns, log_emitter):
+    """Loads the given columns of a parsed input that have a Parquet copy, or returns None if none has."""
+    available = [col for col in columns if os.path.exists(_sidecar_column_path(content_hash, header, col))]
+    if not available:
+        return None
+    try:
+        df = pd.concat([_read_sidecar_column(_sidecar_column_path(content_hash, header, col)).rename(col) for col in available], axis=1)
+        os.utime(_sidecar_dir(content_hash)) # Đánh dấu vừa dùng để không bị dọn khi prune
+    except Exception as e:
+        log_emitter.emit(f"⚠️ Không đọc được bản cache Parquet, sẽ đọc lại file gốc: {e}")
+        return None
+    log_emitter.emit("⚡ Đọc dữ liệu từ bản cache Parquet của file này.")
+    return df
+
+def _write_sidecar(content_hash, header, df, log_emitter):
+    """Writes the columns of df that have no Parquet copy yet, one compressed file per column."""
+    if not HAS_PYARROW:
+        return
+    directory = _sidecar_dir(content_hash)
+    tmp_path = None
+    try:
+        os.makedirs(directory, exist_ok=True)
+        header_path = os.path.join(directory, 'header.json')
+        if not os.path.exists(header_path):
+            tmp_path = f"{header_path}.{os.getpid()}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(header, f, ensure_ascii=False)
+            os.replace(tmp_path, header_path)
+        for col in df.columns:
+            path = _sidecar_column_path(content_hash, header, col)
+            if os.path.exists(path):
+                continue
+            frame = _mixed_column_frame(df[col]) if _is_mixed_column(df[col]) else df[[col]].set_axis(['value'], axis=1)
+            if frame is None:
+                continue # Cột này luôn được đọc lại từ file gốc
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            frame.to_parquet(tmp_path, engine='pyarrow', compression='zstd', index=False)
+            os.replace(tmp_path, path)
+    except Exception as e:
+        if tmp_path and os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        log_emitter.emit(f"⚠️ Không lưu được bản cache Parquet: {e}")
+        return
+    _prune_sidecars()
+
+def _prune_sidecars():
+    """Keeps only the SIDECAR_MAX_FILES most recently used Parquet copies."""
+    try:
+        entries = [os.path.join(SIDECAR_CACHE_DIR, name) for name in os.listdir(SIDECAR_CACHE_DIR)]
+        entries.sort(key=os.path.getmtime, reverse=True)
+        for path in entries[SIDECAR_MAX_FILES:]:
+            if os.path.isdir(path):
+                shutil.rmtree(path, ignore_errors=True)
+            else:
+                os.remove(path)
+    except OSError:
+        pass
+
+def _missing_columns(header, df, columns):
+    """Columns of header (restricted to `columns` when given) that df does not hold yet."""
+    wanted = header if columns is None else [col for col in header if col in set(columns)]
+    loaded = set() if df is None else set(df.columns)
+    return [col for col in wanted if col not in loaded]
+
+def _merge_columns(header, df, new_df):
+    """Combines the columns of two frames of the same file, in header order."""
+    if df is None or new_df is None:
+        return new_df if df is None else df
+    parts = {col: df[col] for col in df.columns}
+    parts.update((col, new_df[col]) for col in new_df.columns if col not in parts)
+    return pd.concat([parts[col] for col in dict.fromkeys(header) if col in parts], axis=1)
+
+def read_and_map_data(file_path, log_emitter, columns=None):
+    """
+    Reads data from an Excel or CSV file and maps columns based on COLUMN_MAPPING.
+    Results are shared through DATASET_CACHE, so columns that are already loaded are not parsed again,
+    and persisted as Parquet sidecars so later opens (even after a restart) skip the file parser.
+
+    Args:
+        file_path (str): The path to the input file.
+        log_emitter (pyqtSignal): The signal to emit log messages.
+        columns (list[str], optional): Names of the columns the caller needs, mapped or as exported
+            (see resolve_columns), all columns when None. Only these are parsed from the file. The returned DataFrame may hold more columns than requested.
+
+    Returns:
+        pd.DataFrame or None: The pandas DataFrame with mapped columns if successful, otherwise None.
+    """
+    try:
+        cache_key = DATASET_CACHE.make_key(file_path)
+    except FileNotFoundError:
+        log_emitter.emit(f"❌ Lỗi: Không tìm thấy file Excel tại đường dẫn: {file_path}")
+        return None
+    except OSError as e:
+        log_emitter.emit(f"❌ Đã xảy ra lỗi khi đọc file: {e}")
+        return None
+
+    if columns is not None:
+        columns = resolve_columns(columns)
+    with DATASET_CACHE.path_lock(file_path):
+        content_hash = cache_key[3]
+        df, header = DATASET_CACHE.get(cache_key)
+        if header is None:
+            header = _sidecar_header(content_hash)
+        missing = columns
+        if header is not None:
+            missing = _missing_columns(header, df, columns)
+            if not missing:
+                if df is not None:
+                    log_emitter.emit("♻️ Dữ liệu của file này đã được đọc trước đó, dùng lại bản trong bộ nhớ.")
+                    return df
+                missing = header[:1] # Cần ít nhất một cột để biết số dòng
+            df = _merge_columns(header, df, _load_sidecar(content_hash, header, missing, log_emitter))
+            missing = _missing_columns(header, df, missing)
+            if not missing:
+                return DATASET_CACHE.put(cache_key, df, header)
+
+        parsed, header = _read_and_map_file(file_path, log_emitter, missing)
+        if parsed is None:
+            return None
+        parsed = compact_frame(parsed)
+        _write_sidecar(content_hash, header, parsed, log_emitter)
+        return DATASET_CACHE.put(cache_key, _merge_columns(header, df, parsed), header)
+
+def resolve_columns(columns):
+    """
+    Translates column names to the mapped names used by the reports, so callers can ask for
+    either 'buyer_id' or its export name 'Buyer User ID'. Keeps order and drops duplicates.
+    """
+    raw_to_mapped = {old_col: new_col for new_col, old_col in COLUMN_MAPPING.items()}
+    return list(dict.fromkeys(raw_to_mapped.get(col, col) for col in columns))
+
+def _read_csv_streaming(file_path, pick_columns):
+    """
+    Reads a CSV file CSV_CHUNK_ROWS rows at a time, keeping only the columns chosen by
+    pick_columns(raw header) (all columns when it returns None) and downcasting each chunk
+    before the next one is parsed, so memory stays close to the size of the kept data
+    instead of twice the size of the whole file.
+    Returns (DataFrame, raw header).
+    """
+    raw_header = list(pd.read_csv(file_path, nrows=0).columns)
+    usecols = pick_columns(raw_header)
+    chunks = [_downcast_integers(chunk) for chunk in pd.read_csv(file_path, usecols=usecols, chunksize=CSV_CHUNK_ROWS)]
+    if not chunks:
+        return pd.read_csv(file_path, usecols=usecols, nrows=0), raw_header
+    return (chunks[0] if len(chunks) == 1 else pd.concat(chunks, ignore_index=True)), raw_header
+
+def _excel_cell_value(cell):
+    # Same conversion as pandas' openpyxl reader, so the parsed frame is identical to pd.read_excel
+    if cell.value is None:
+        return ""
+    if cell.data_type == openpyxl.cell.cell.TYPE_ERROR:
+        return np.nan
+    if cell.data_type == openpyxl.cell.cell.TYPE_NUMERIC:
+        val = int(cell.value)
+        return val if val == cell.value else float(cell.value)
+    return cell.value
+
+def _read_excel(file_path, pick_columns):
+    """
+    Reads the first sheet of an Excel file, keeping only the columns chosen by pick_columns(raw header).
+    When it returns None the whole sheet goes through pd.read_excel, otherwise the rows are streamed
+    with openpyxl and only the kept cells are converted and type-inferred, with the same rules as pd.read_excel.
+    Returns (DataFrame, raw header).
+    """
+    workbook = openpyxl.load_workbook(file_path, read_only=True, data_only=True, keep_links=False)
+    try:
+        sheet = workbook.worksheets[0]
+        sheet.reset_dimensions()
+        rows = sheet.iter_rows()
+        header_row = [_excel_cell_value(cell) for cell in next(rows, ())]
+        while header_row and header_row[-1] == "":
+            header_row.pop()
+        raw_header = list(TextParser([header_row], header=0).read().columns)
+        usecols = pick_columns(raw_header)
+        positions = [] if usecols is None else [raw_header.index(col) for col in usecols]
+        data = []
+        last_row_with_data = -1
+        for row in rows if usecols is not None else ():
+            # Rows holding data only in skipped columns still count, pandas keeps them as empty rows
+            if any(cell.value is not None and cell.value != "" for cell in row):
+                last_row_with_data = len(data)
+            data.append([_excel_cell_value(row[i]) if i < len(row) else "" for i in positions])
+        data = data[:last_row_with_data + 1]
+    finally:
+        workbook.close()
+    if usecols is None:
+        df = pd.read_excel(file_path, engine='openpyxl')
+        return df, list(df.columns)
+    if not data:
+        return pd.DataFrame(columns=usecols), raw_header
+    return TextParser(data, header=None, names=usecols, skip_blank_lines=False).read(), raw_header
+
+def _read_and_map_file(file_path, log_emitter, columns=None):
+    """
+    Parses file_path and maps its columns, keeping only `columns` (mapped names) when given.
+    See read_and_map_data. Returns (DataFrame, full mapped header) or (None, None).
+    """
+    try:
+        log_emitter.emit("ℹ️ Đang đọc dữ liệu từ file...")
+        file_extension = os.path.splitext(file_path)[1].lower()
+
+        raw_to_mapped = {old_col: new_col for new_col, old_col in COLUMN_MAPPING.items()}
+
+        def pick_columns(raw_header):
+            if columns is None:
+                return None
+            return [raw for raw in raw_header if raw_to_mapped.get(raw, raw) in set(columns)]
+
+        if file_extension in ['.xlsx', '.xls']:
+            log_emitter.emit("ℹ️ Phát hiện file Excel. Đang đọc...")
+            df, raw_header = _read_excel(file_path, pick_columns)
+        elif file_extension == '.csv':
+            log_emitter.emit("ℹ️ Phát hiện file CSV. Đang đọc...")
+            df, raw_header = _read_csv_streaming(file_path, pick_columns)
+        else:
+            log_emitter.emit(f"❌ Lỗi: Định dạng file không được hỗ trợ: {file_extension}. Vui lòng chọn file Excel (.xlsx, .xls) hoặc CSV (.csv).")
+            return None, None
+
+        # 2. Check and rename columns
+        header = [raw_to_mapped.get(col, col) for col in raw_header]
+        for new_col, old_col in COLUMN_MAPPING.items():
+            if old_col in raw_header:
+                log_emitter.emit(f"✅ Đã đổi tên cột '{old_col}' thành '{new_col}'.")
+        
+        # 3. Check for required columns after mapping
+        required_columns = list(COLUMN_MAPPING.keys())
+        if not all(col in header for col in required_columns):
+            missing_cols = [col for col in required_columns if col not in header]
+            log_emitter.emit(f"❗❗❗ Cảnh báo: File Excel đầu vào thiếu các cột sau: {', '.join(missing_cols)} để mapping.")
+            # return None
+
+        df.columns = [raw_to_mapped.get(col, col) for col in df.columns]
+        return df, header
+
+    except FileNotFoundError:
+        log_emitter.emit(f"❌ Lỗi: Không tìm thấy file Excel tại đường dẫn: {file_path}")
+        return None, None
+    except Exception as e:
+        log_emitter.emit(f"❌ Đã xảy ra lỗi khi đọc file: {e}")
+        return None, None
+
+
+# --- TIME WINDOW ENGINE ---
+def _factorize_ids(ids):
+    """
+    Factorizes IDs the way set() counts them on the records: missing float IDs never match each
+    other (NaN != NaN) while other missing values count as one ID.
+    """
+    codes = pd.factorize(ids)[0]
+    missing = codes < 0
+    if missing.any():
+        first_free = codes.max() + 1
+        codes[missing] = first_free + np.arange(missing.sum()) if ids.dtype.kind == 'f' else first_free
+    return codes
+
+def find_ids_in_time_windows(df, group_keys, time_col, thresholds, id_col='buyer_id', window=timedelta(hours=1), skip_on_hit=False):
+    """
+    Finds IDs belonging to time windows with many distinct IDs ("N IDs within 1 hour" reports).
+
+    Rows are sorted by group_keys + time_col. Every row i opens a window holding the rows of the
+    same group whose time is within `window` of row i. A window is a hit when it holds at least
+    `threshold` distinct IDs, and all IDs of hit windows are returned.
+    With skip_on_hit=True the scan continues after the end of a hit window instead of at the next
+    row, exactly like the "fixed start time" reports.
+
+    Distinct counts for all windows are computed together on int64 timestamps and factorized IDs:
+    a row counts for window i when it is the last occurrence of its ID inside that window, and the
+    windows for which that holds form a contiguous range of i, so all counts come from one
+    difference array instead of a Python loop per row.
+
+    Args:
+        df (pd.DataFrame): Dữ liệu đầu vào, time_col phải là kiểu datetime.
+        group_keys (list[str]): Các cột dùng để nhóm.
+        time_col (str): Cột thời gian.
+        thresholds (list[int]): Các ngưỡng số ID riêng biệt cần tính.
+        id_col (str): Cột ID cần đếm.
+        window (timedelta): Độ dài cửa sổ thời gian.
+        skip_on_hit (bool): Nhảy tới cuối cửa sổ khi gặp cửa sổ thỏa ngưỡng.
+
+    Returns:
+        dict: threshold -> set các ID thuộc các cửa sổ thỏa ngưỡng.
+    """
+    result = {threshold: set() for threshold in thresholds}
+    df = df.dropna(subset=group_keys + [time_col]).sort_values(by=group_keys + [time_col])
+    n = len(df)
+    if n == 0:
+        return result
+
+    group_codes = _factorize_keys(df, group_keys)
+    profile_count('groups', int(group_codes.max()) + 1)
+    times = df[time_col].to_numpy(dtype='datetime64[ns]').view(np.int64)
+    ids = df[id_col].to_numpy()
+
+    # Window end of every row: first row of a later group or later than time + window.
+    # Times are ranked so (group, time) fits one sortable int64 key.
+    unique_times = np.unique(times)
+    stride = len(unique_times) + 1
+    sort_keys = group_codes * stride + np.searchsorted(unique_times, times)
+    end_ranks = np.searchsorted(unique_times, times + pd.Timedelta(window).value, side='right')
+    window_ends = np.searchsorted(sort_keys, group_codes * stride + end_ranks)
+
+    # Next row with the same ID (n if none)
+    codes = _factorize_ids(ids)
+    order = np.argsort(codes, kind='stable')
+    next_same = np.full(n, n, dtype=np.int64)
+    same = codes[order[1:]] == codes[order[:-1]]
+    next_same[order[:-1][same]] = order[1:][same]
+
+    # Row p counts for window i iff i <= p < window_ends[i] <= next_same[p]
+    positions = np.arange(n)
+    first_window = np.searchsorted(window_ends, positions, side='right')
+    stop_window = np.minimum(positions, np.searchsorted(window_ends, next_same, side='right') - 1) + 1
+    valid = first_window < stop_window
+    distinct_counts = np.cumsum(np.bincount(first_window[valid], minlength=n + 1)
+                                - np.bincount(stop_window[valid], minlength=n + 1))[:n]
+
+    for threshold in thresholds:
+        hits = np.flatnonzero(distinct_counts >= threshold)
+        if skip_on_hit:
+            taken = []
+            position = 0
+            while True:
+                k = np.searchsorted(hits, position)
+                if k == len(hits):
+                    break
+                taken.append(hits[k])
+                position = window_ends[hits[k]]
+            hits = np.asarray(taken, dtype=np.int64)
+        covered = np.cumsum(np.bincount(hits, minlength=n + 1)
+                            - np.bincount(window_ends[hits], minlength=n + 1))[:n] > 0
+        result[threshold] = set(pd.unique(ids[covered]))
+    return result
+
+
+# --- KEY GROUP ENGINE ---
+def _factorize_keys(df, keys):
+    """
+    Returns one int64 group code per row for the combination of `keys` (-1 if any key is missing).
+    Codes are re-factorized after each column so they stay below len(df) for any number of keys.
+    """
+    group_codes = np.zeros(len(df), dtype=np.int64)
+    missing = np.zeros(len(df), dtype=bool)
+    for key in keys:
+        codes, uniques = pd.factorize(df[key])
+        missing |= codes < 0
+        group_codes = pd.factorize(group_codes * (len(uniques) + 1) + codes)[0]
+    group_codes[missing] = -1
+    return group_codes
+
+
+def find_ids_sharing_keys(df, keys, thresholds, id_col='buyer_id', count_missing_ids=False):
+    """
+    Finds IDs of groups of rows sharing the same `keys` with at least `threshold` distinct IDs.
+
+    Equivalent to groupby(keys)[id_col].nunique() >= threshold followed by merging the groups
+    back into df, but works on factorized codes only: distinct (group, ID) pairs are counted per
+    group and the counts are looked up per row, so the frame is never copied or merged and every
+    threshold comes out of the same counts.
+    Rows with a missing key never belong to a group. Missing IDs are only counted with
+    count_missing_ids=True (set() semantics), but a row of a matching group is always returned.
+
+    Args:
+        df (pd.DataFrame): Dữ liệu đầu vào.
+        keys (list[str]): Các cột của khóa nhóm.
+        thresholds (list[int]): Các ngưỡng số ID riêng biệt cần tính.
+        id_col (str): Cột ID cần đếm.
+        count_missing_ids (bool): Đếm cả ID bị thiếu như set() thay vì nunique().
+
+    Returns:
+        dict: threshold -> set các ID thuộc các nhóm thỏa ngưỡng.
+    """
+    result = {threshold: set() for threshold in thresholds}
+    if len(df) == 0:
+        return result
+
+    ids = df[id_col].to_numpy()
+    group_codes = _factorize_keys(df, keys)
+    profile_count('groups', int(group_codes.max()) + 1)
+    id_codes = _factorize_ids(ids) if count_missing_ids else pd.factorize(ids)[0]
+    counted = (group_codes >= 0) & (id_codes >= 0)
+    id_stride = max(id_codes.max(), 0) + 1
+    pairs = np.unique(group_codes[counted] * id_stride + id_codes[counted])
+    distinct_counts = np.bincount(pairs // id_stride, minlength=group_codes.max() + 1)
+
+    grouped = group_codes >= 0
+    row_counts = np.zeros(len(df), dtype=np.int64)
+    row_counts[grouped] = distinct_counts[group_codes[grouped]]
+    for threshold in thresholds:
+        result[threshold] = set(pd.unique(ids[row_counts >= threshold]))
+    return result
+
+
+def normalize_phone_numbers(phones):
+    """Normalizes phone numbers to a consistent format (digits only), None when no digit is left."""
+    if isinstance(phones.dtype, pd.CategoricalDtype):
+        # Each distinct phone is normalized once, rows pick theirs by category code (-1 -> None)
+        normalized = normalize_phone_numbers(pd.Series(phones.cat.categories, dtype=object)).to_numpy(dtype=object)
+        return pd.Series(np.append(normalized, None)[phones.cat.codes.to_numpy()], index=phones.index)
+    digits = phones.astype(str).str.replace(r'\D', '', regex=True)
+    return digits.where(phones.notna() & (digits != ''), None)
+
+
+# --- RULE PLANNER ---
+# Reports dựa trên quy tắc, theo khóa trong REPORTS.
+# KEY_RULES: "cùng khóa, >= K ID khác nhau" (find_ids_sharing_keys).
+# WINDOW_RULES: "cùng khóa, >= K ID khác nhau trong 1 giờ" (find_ids_in_time_windows).
+#   keys: các cột của khóa nhóm, thresholds: các ngưỡng số ID của report.
+#   rows: khóa trong ROW_FILTERS, bộ lọc dòng được áp dụng trước khi tính (evaluate_rule, ReportPlan,
+#         DetectionState), hai rule chỉ dùng chung kết quả khi giống nhau.
+#   drop_missing_ids: bỏ ID bị thiếu khỏi kết quả. Các trường còn lại là tham số của engine.
+KEY_RULES = {
+    'same_promotion_phone': {'keys': ['recipient_phone_', 'pv_promotion_id'], 'thresholds': [3]},
+    'same_fsv': {'keys': ['recipient_phone_', 'fsv_voucher_code', 'buyer_shipping_address_district'], 'thresholds': [5]},
+    'same_promotion_phone_district': {'keys': ['recipient_phone_', 'pv_promotion_id', 'buyer_shipping_address_district'], 'thresholds': [3]},
+    'same_recipient_phone': {'keys': ['recipient_phone_'], 'thresholds': [3]},
+    'same_phone_6': {'keys': ['recipient_phone_'], 'thresholds': [6], 'drop_missing_ids': True},
+    'rsl': {'keys': ['normalized_phone'], 'thresholds': [4], 'count_missing_ids': True},
+    'same_name_district_city_state': {'keys': ['buyer_shipping_address_district', 'buyer_shipping_address_city', 'buyer_shipping_address_state', 'recipient_name'], 'thresholds': [6]},
+}
+
+WINDOW_RULES = {
+    'ip_create_time': {'keys': ['ip_checkout'], 'time_col': 'create_time', 'thresholds': [3],
+                       'rows': "ip_checkout != '-'"},
+    'n3_6_9': {'keys': ['N3'], 'time_col': 'registration_time', 'thresholds': [10, 6]},
+    'n3_4': {'keys': ['N3'], 'time_col': 'registration_time', 'thresholds': [4]},
+    'ip_create_time_6': {'keys': ['ip_checkout'], 'time_col': 'create_time', 'thresholds': [6], 'skip_on_hit': True,
+                         'rows': "ip_checkout != '-', buyer_id notna"},
+    'ip_create_time_4': {'keys': ['ip_checkout'], 'time_col': 'create_time', 'thresholds': [4], 'skip_on_hit': True,
+                         'rows': "ip_checkout != '-', buyer_id notna"},
+    'same_domain_reg_time': {'keys': ['domain'], 'time_col': 'registration_time', 'thresholds': [6], 'skip_on_hit': True,
+                             'rows': "domain not in excluded_domains, buyer_id notna"},
+    'same_city_state_reg_time': {'keys': ['buyer_shipping_address_state', 'buyer_shipping_address_city'], 'time_col': 'create_time',
+                                 'thresholds': [6], 'skip_on_hit': True,
+                                 'rows': "buyer_email == '', create_time - registration_time <= 20 min, buyer_id notna"},
+}
+
+
+# Public mail domains left out of the Same Domain report
+EXCLUDED_DOMAINS = ['gmail.com', 'yahoo.com.vn', 'yahoo.com', 'icloud.com', 'privaterelay.appleid.com']
+
+# The row filters of the rules: the only definition, the workers hand over their rows unfiltered
+ROW_FILTERS = {
+    "ip_checkout != '-'": lambda df: df['ip_checkout'] != '-',
+    "ip_checkout != '-', buyer_id notna": lambda df: (df['ip_checkout'] != '-') & df['buyer_id'].notna(),
+    "domain not in excluded_domains, buyer_id notna": lambda df: ~df['domain'].isin(EXCLUDED_DOMAINS) & df['buyer_id'].notna(),
+    "buyer_email == '', create_time - registration_time <= 20 min, buyer_id notna": lambda df: (
+        (df['buyer_email'].fillna('') == '') & df['buyer_id'].notna()
+        & ((pd.to_datetime(df['create_time'], errors='coerce')
+            - pd.to_datetime(df['registration_time'], errors='coerce')).dt.total_seconds() / 60 <= 20)),
+}
+
+
+def rule_rows(report_key, df):
+    """The rows of df the rule of report_key is computed on, after its ROW_FILTERS entry."""
+    rows = _report_rule(report_key).get('rows')
+    return df if rows is None else df[ROW_FILTERS[rows](df)]
+
+
+def _report_rule(report_key):
+    """Returns the KEY_RULES or WINDOW_RULES entry of a report."""
+    return KEY_RULES.get(report_key) or WINDOW_RULES[report_key]
+
+
+def _rule_pass_key(report_key):
+    """Reports with the same pass key are computed by one engine call on the same rows."""
+    rule = _report_rule(report_key)
+    if report_key in KEY_RULES:
+        return ('keys', tuple(rule['keys']), rule.get('count_missing_ids', False), rule.get('rows'))
+    return ('window', tuple(rule['keys']), rule['time_col'], rule.get('skip_on_hit', False), rule.get('rows'))
+
+
+def _evaluate_rules(report_keys, df):
+    """Computes reports sharing one pass with a single engine call. Returns report_key -> {threshold: set}."""
+    thresholds = sorted({threshold for key in report_keys for threshold in _report_rule(key)['thresholds']})
+    first = report_keys[0]
+    df = rule_rows(first, df)
+    if first in KEY_RULES:
+        rule = KEY_RULES[first]
+        ids = find_ids_sharing_keys(df, rule['keys'], thresholds, count_missing_ids=rule.get('count_missing_ids', False))
+    else:
+        rule = WINDOW_RULES[first]
+        ids = find_ids_in_time_windows(df, rule['keys'], rule['time_col'], thresholds, skip_on_hit=rule.get('skip_on_hit', False))
+
+    results = {}
+    for key in report_keys:
+        rule = _report_rule(key)
+        results[key] = {
+            threshold: {i for i in ids[threshold] if not pd.isna(i)} if rule.get('drop_missing_ids') else ids[threshold]
+            for threshold in rule['thresholds']
+        }
+    return results
+
+
+class ReportPlan:
+    """
+    Execution plan for reports run together on the same input.
+    Selected reports whose rules share keys, window and rows form one pass: the first report of a
+    pass computes every threshold of the pass and the other reports reuse the result. The row
+    filter of the pass is applied here, so the frame of whichever report comes first gives the
+    same rows.
+    """
+
+    def __init__(self, report_keys):
+        """
+        Args:
+            report_keys (list[str]): Các khóa trong REPORTS được chạy cùng nhau.
+        """
+        self.passes = {}
+        for key in report_keys:
+            if key in KEY_RULES or key in WINDOW_RULES:
+                self.passes.setdefault(_rule_pass_key(key), []).append(key)
+        self._results = {}
+        self._lock = threading.Lock()
+
+    def groups(self, report_keys):
+        """Splits report_keys into groups that should run together to share their pass."""
+        groups = [list(keys) for keys in self.passes.values()]
+        planned = {key for keys in groups for key in keys}
+        return groups + [[key] for key in report_keys if key not in planned]
+
+    def evaluate(self, report_key, df):
+        """Returns {threshold: set} of report_key, computing its whole pass on first use."""
+        with self._lock:
+            if report_key not in self._results:
+                report_keys = self.passes.get(_rule_pass_key(report_key), [report_key])
+                if report_key not in report_keys:
+                    report_keys = [report_key]
+                self._results.update(_evaluate_rules(report_keys, df))
+            return self._results[report_key]
+
+
+def evaluate_rule(report_key, df, plan=None):
+    """
+    Computes the rule of a report in KEY_RULES/WINDOW_RULES on its prepared rows, keeping those
+    of its ROW_FILTERS entry. With a plan the result is shared with the other reports of the same pass.
+
+    Returns:
+        dict: threshold -> set các ID thỏa ngưỡng.
+    """
+    if plan is not None:
+        return plan.evaluate(report_key, df)
+    return _evaluate_rules([report_key], df)[report_key]
+
+# --- ADDRESS NORMALIZATION ---
+NORMALIZER_CACHE_MAX_ENTRIES = 200000 # Số chuỗi (địa chỉ, tên) đã chuẩn hóa giữ trong bộ nhớ giữa các lần chạy
+
+# Regex for common noise words (more specific patterns first), matched as one alternation
+ADDRESS_NOISE_WORDS = [
+    r'\bsố\s+nhà\b', r'\bngõ\b', r'\bđường\b', r'\bthôn\b', r'\btổ\b', r'\bkhu\s+phố\b',
+    r'\bấp\b', r'\bkdc\b', r'\bchợ\b', r'\btrường\b', r'\bquán\b', r'\bhội\s+trường\b',
+    r'\bnhà\s+văn\s+hoá\b', r'\bđội\b', r'\bbản\b', r'\bkhu\s+dân\s+cư\b',
+    r'\bchân\s+dốc\b', r'\bđèo\b', r'\bngã\s+ba\b', r'\btoà\s+nhà\b', r'\bphường\b',
+    r'\btownship\b', r'\bvillage\b', r'\bhamlet\b', r'\bstreet\b', r'\bhouse\b',
+    r'\bxóm\b', r'\bkp\b', r'\bcty\b', r'\bcông\s+ty\b', r'\bchi\s+nhánh\b',
+    r'\bchi\s+cục\b', r'\bcông\s+viên\b', r'\bkho\b', r'\bxưởng\b', r'\bkcn\b', # Industrial park
+    r'\bkhu\s+công\s+nghiệp\b', r'\bthành\s+phố\b', r'\bquận\b', r'\bhuyện\b',
+    r'\btỉnh\b'
+]
+ADDRESS_NOISE_PATTERN = re.compile('|'.join(ADDRESS_NOISE_WORDS))
+ADDRESS_PREFIX_PATTERN = re.compile(r'^\s*(so|s)\s+\d+[a-z]?\s*,?\s*') # "so 42," "s 8a"
+PARENTHESES_PATTERN = re.compile(r'\([^)]*\)')
+SEPARATORS_PATTERN = re.compile(r'[.,;]')
+SPACES_PATTERN = re.compile(r'\s+')
+NON_ALPHANUMERIC_PATTERN = re.compile(r'[^a-z0-9\s]')
+
+
+# New helper function based on your VBA RemoveDiacritics
+def remove_diacritics(text):
+    """Removes Vietnamese diacritics (accents) from a string."""
+    if pd.isna(text) or not isinstance(text, str):
+        return text
+
+    # Use unicodedata for general diacritic removal
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
+    return text
+
+
+@functools.lru_cache(maxsize=NORMALIZER_CACHE_MAX_ENTRIES)
+def clean_address_for_fuzzy_match(address):
+    """
+    Cleans an address string for more accurate fuzzy matching,
+    incorporating VBA-like normalization (diacritics removal, specific replacements).
+    Results are memoized, addresses repeat heavily between rows and between runs.
+    """
+    text = address.lower()
+
+    # --- Start of VBA-like normalization ---
+    # 1. Remove diacritics (using a more robust method)
+    text = remove_diacritics(text)
+
+    # 2. Specific word replacements (as in your VBA)
+    text = text.replace("phuong", "p")
+    text = text.replace("quan", "q")
+    text = text.replace("duong", "") # Removed "duong" as per your VBA logic
+    # --- End of VBA-like normalization ---
+
+    # Remove common prefixes like "so 42," "s 8a"
+    text = ADDRESS_PREFIX_PATTERN.sub('', text)
+    # Remove text within parentheses
+    text = PARENTHESES_PATTERN.sub('', text)
+    # Remove common separators
+    text = SEPARATORS_PATTERN.sub('', text)
+    # Noise words are whole words, so one pass over the alternation equals one pass per word
+    text = ADDRESS_NOISE_PATTERN.sub(' ', text)
+
+    # Consolidate spaces and strip leading/trailing spaces (Trim in VBA)
+    text = SPACES_PATTERN.sub(' ', text).strip()
+    # Final non-alphanumeric removal (after noise words are gone)
+    text = NON_ALPHANUMERIC_PATTERN.sub('', text)
+    # Final consolidation of spaces
+    text = SPACES_PATTERN.sub(' ', text).strip()
+
+    return text if text else None
+
+
+@functools.lru_cache(maxsize=NORMALIZER_CACHE_MAX_ENTRIES)
+def normalize_recipient_name(text):
+    """
+    Normalizes a recipient name for better fuzzy matching.
+    Converts to lowercase, removes diacritics, and cleans non-alphanumeric chars.
+    """
+    text = text.lower()
+    # Remove Vietnamese diacritics
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('utf-8')
+    # Remove special characters, keep letters, numbers, and spaces
+    text = NON_ALPHANUMERIC_PATTERN.sub('', text)
+    # Consolidate multiple spaces and strip leading/trailing spaces
+    text = SPACES_PATTERN.sub(' ', text).strip()
+    return text if text else None # Return None if string becomes empty after cleaning
+
+
+# Bump NORMALIZER_VERSION whenever the code of a normalizer changes, pattern changes are picked up by the hash
+NORMALIZER_VERSION = 1
+NORMALIZER_RULES_HASH = hashlib.sha1(repr((
+    NORMALIZER_VERSION, ADDRESS_NOISE_WORDS,
+    [pattern.pattern for pattern in (ADDRESS_PREFIX_PATTERN, PARENTHESES_PATTERN, SEPARATORS_PATTERN,
+                                     SPACES_PATTERN, NON_ALPHANUMERIC_PATTERN)],
+)).encode('utf-8')).hexdigest()
+
+
+class NormalizedStore:
+    """
+    On-disk dictionary (SQLite) of raw strings -> normalized form, shared by all runs, sessions
+    and batch processes, so a new file only normalizes the strings never seen before.
+
+    Entries are grouped by kind ('address', 'recipient_name') and the whole store is cleared when
+    NORMALIZER_RULES_HASH changes. Any SQLite error disables the store for the current process
+    and normalization simply falls back to computing every string.
+    """
+    LOOKUP_CHUNK = 500 # Số tham số mỗi câu SELECT (giới hạn biến của SQLite)
+
+    def __init__(self, path=NORMALIZED_STORE_PATH, max_rows=NORMALIZED_STORE_MAX_ROWS):
+        self.path = path
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._ready = False
+        self._disabled = False
+
+    def _connect(self):
+        if not self._ready:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        if not self._ready:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+            connection.execute("CREATE TABLE IF NOT EXISTS normalized ("
+                               "kind TEXT NOT NULL, raw TEXT NOT NULL, cleaned TEXT, UNIQUE (kind, raw))")
+            row = connection.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+            if row is None or row[0] != NORMALIZER_RULES_HASH:
+                with connection:
+                    connection.execute("DELETE FROM normalized")
+                    connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rules', ?)", (NORMALIZER_RULES_HASH,))
+            self._ready = True
+        return connection
+
+    def _fail(self, e, log_emitter):
+        self._disabled = True
+        if log_emitter is not None:
+            log_emitter.emit(f"⚠️ Không dùng được bộ nhớ đệm chuẩn hóa ({self.path}): {e}")
+
+    def lookup(self, kind, raw_values, log_emitter=None):
+        """Returns {raw: cleaned} for the raw_values already in the store."""
+        if self._disabled or not raw_values:
+            return {}
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    known = {}
+                    for start in range(0, len(raw_values), self.LOOKUP_CHUNK):
+                        chunk = raw_values[start:start + self.LOOKUP_CHUNK]
+                        rows = connection.execute(
+                            f"SELECT raw, cleaned FROM normalized WHERE kind = ? AND raw IN ({','.join('?' * len(chunk))})",
+                            [kind, *chunk])
+                        known.update(rows)
+                    return known
+                finally:
+                    connection.close()
+        except (sqlite3.Error, OSError) as e:
+            self._fail(e, log_emitter)
+            return {}
+
+    def add(self, kind, mapping, log_emitter=None):
+        """Stores {raw: cleaned}, dropping the oldest entries beyond max_rows."""
+        if self._disabled or not mapping:
+            return
+        try:
+            with self._lock:
+                connection = self._connect()
+                try:
+                    with connection:
+                        connection.executemany("INSERT OR IGNORE INTO normalized (kind, raw, cleaned) VALUES (?, ?, ?)",
+                                               [(kind, raw, cleaned) for raw, cleaned in mapping.items()])
+                        connection.execute("DELETE FROM normalized WHERE rowid <= (SELECT MAX(rowid) FROM normalized) - ?",
+                                           (self.max_rows,))
+                finally:
+                    connection.close()
+        except (sqlite3.Error, OSError) as e:
+            self._fail(e, log_emitter)
+
+NORMALIZED_STORE = NormalizedStore()
+
+
+def _normalize_distinct(values, kind, normalize, log_emitter=None):
+    """
+    Applies normalize(str) to a column once per distinct value, taking the values seen in earlier
+    sessions from NORMALIZED_STORE and adding the new ones to it.
+
+    Returns:
+        pd.Series: Giá trị đã chuẩn hóa, None khi thiếu hoặc rỗng sau chuẩn hóa.
+    """
+    codes, uniques = pd.factorize(values)
+    raw_values = list(dict.fromkeys(str(value) for value in uniques))
+    known = NORMALIZED_STORE.lookup(kind, raw_values, log_emitter)
+    new = {raw: normalize(raw) for raw in raw_values if raw not in known}
+    NORMALIZED_STORE.add(kind, new, log_emitter)
+    known.update(new)
+    cleaned = np.array([known[str(value)] for value in uniques] + [None], dtype=object)
+    return pd.Series(cleaned[codes], index=values.index)
+
+
+def clean_addresses(addresses, log_emitter=None):
+    """Applies clean_address_for_fuzzy_match to a column, once per distinct address."""
+    return _normalize_distinct(addresses, 'address', clean_address_for_fuzzy_match, log_emitter)
+
+
+def normalize_recipient_names(names, log_emitter=None):
+    """Applies normalize_recipient_name to a column, once per distinct name."""
+    return _normalize_distinct(names, 'recipient_name', normalize_recipient_name, log_emitter)
+
+
+# --- SIMILARITY KERNEL ---
+def sort_tokens(text):
+    """Token-sorted form of a cleaned string: ratio() on it equals token_sort_ratio() on the original."""
+    return " ".join(sorted(text.split())).strip()
+
+
+def similarity_scores(query, choices, score_cutoff=0):
+    """
+    Scores `query` against every string of `choices` with fuzz.ratio in one call.
+
+    Scores are rounded to integers exactly like fuzzywuzzy does. With rapidfuzz the whole row is
+    scored by one cdist call that skips pairs which cannot reach score_cutoff (scored 0), otherwise
+    it falls back to fuzzywuzzy per pair. Pass sort_tokens() strings to get token_sort_ratio.
+
+    rapidfuzz computes the Indel ratio of python-Levenshtein, so `score >= SIMILARITY_THRESHOLD`
+    gives the same decisions as the pairwise fuzz calls only when fuzzywuzzy runs on its
+    python-Levenshtein backend. Without it fuzzywuzzy falls back to difflib, whose scores differ
+    by a few points on some pairs, so decisions near the threshold can differ from that backend.
+
+    Args:
+        query (str): Chuỗi cần so sánh.
+        choices (list[str]): Các chuỗi được so sánh với query.
+        score_cutoff (int): Điểm tối thiểu cần tính chính xác.
+
+    Returns:
+        np.ndarray: Điểm tương đồng (0-100) của từng phần tử trong choices.
+    """
+    if len(choices) == 0:
+        return np.zeros(0, dtype=np.int64)
+    profile_count('comparisons', len(choices))
+    if HAS_RAPIDFUZZ:
+        # Anything that rounds up to score_cutoff must survive the cutoff
+        scores = rapid_process.cdist([query], choices, scorer=rapid_fuzz.ratio, dtype=np.float64,
+                                     score_cutoff=max(score_cutoff - 0.5, 0))[0]
+        return np.round(scores).astype(np.int64)
+    return np.array([fuzz.ratio(query, choice) for choice in choices], dtype=np.int64)
+
+
+# --- LINKING ENGINE ---
+class DisjointSet(object):
+    """
+    Union-find over the records 0..n-1 of a report, held in numpy arrays so a whole row of
+    candidates is resolved in one call: find() points every item it resolves straight at its
+    root (path compression), union() hangs the smaller trees under the largest one.
+    """
+    def __init__(self, size):
+        self.parent = np.arange(size)
+        self.size = np.ones(size, dtype=np.int64)
+
+    @classmethod
+    def from_keys(cls, keys):
+        """A set where the records with the same key (hashable) are already linked to the first of them."""
+        links = cls(len(keys))
+        first_of_key = {}
+        links.parent = np.array([first_of_key.setdefault(key, k) for k, key in enumerate(keys)], dtype=np.int64)
+        links.size = np.bincount(links.parent, minlength=len(keys))
+        return links
+
+    def roots(self):
+        """Positions that are the root of their set (one per key right after from_keys)."""
+        return np.flatnonzero(self.parent == np.arange(len(self.parent)))
+
+    def find(self, items):
+        """Roots of `items` (array of positions)."""
+        items = np.asarray(items, dtype=np.int64)
+        roots = self.parent[items]
+        while True:
+            parents = self.parent[roots]
+            if (parents == roots).all():
+                break
+            roots = parents
+        self.parent[items] = roots
+        return roots
+
+    def union(self, items):
+        """Merges the sets of all `items` into one and returns its root."""
+        roots = np.unique(self.find(items))
+        root = roots[np.argmax(self.size[roots])]
+        self.size[root] = self.size[roots].sum()
+        self.parent[roots] = root
+        return root
+
+
+def link_record(links, i, candidates, is_match):
+    """
+    Scores record i against the candidates not linked to it yet and joins the matches in `links`.
+    A pair inside one set cannot change it, so it is never scored.
+
+    Args:
+        links (DisjointSet): Các bản ghi đã liên kết của cả báo cáo.
+        i (int): Vị trí bản ghi cần so sánh.
+        candidates (np.ndarray): Vị trí các bản ghi được so sánh với i.
+        is_match (callable): is_match(i, candidates) -> mảng bool, bản ghi nào trong candidates khớp với i.
+    """
+    candidates = candidates[links.find(candidates) != links.find([i])[0]]
+    if len(candidates) == 0:
+        return
+    matched = candidates[is_match(i, candidates)]
+    if len(matched):
+        links.union(np.append(matched, i))
+
+
+def linked_clusters(links, ids, min_distinct_ids=3):
+    """
+    Connected components of `links` holding at least min_distinct_ids distinct IDs, as reported by
+    the similar-address reports: A~B~C is one ring even when A and C do not match, and the
+    clusters do not depend on the order of the rows or of the blocks.
+
+    Args:
+        links (DisjointSet): Các bản ghi đã liên kết.
+        ids (list): ID của từng bản ghi.
+        min_distinct_ids (int): Số ID riêng biệt tối thiểu của một nhóm.
+
+    Yields:
+        tuple: (members, unique_ids) của từng nhóm hợp lệ, members là vị trí bản ghi (tăng dần).
+    """
+    roots = links.find(np.arange(len(ids)))
+    order = np.argsort(roots, kind='stable')
+    for members in np.split(order, np.flatnonzero(np.diff(roots[order])) + 1):
+        if len(members) < min_distinct_ids:
+            continue
+        unique_ids = set(ids[k] for k in members)
+        if len(unique_ids) >= min_distinct_ids:
+            profile_count('groups')
+            yield members, unique_ids
+
+
+
+def value_ranges(links, values, tolerance, ids, min_distinct_ids=3):
+    """
+    Cuts the components of `links` into ranges of values spanning at most `tolerance`, for the
+    reports whose pair rule has a value tolerance: linking chains it (100k~350k~600k), a range
+    does not. Members are taken in increasing value and a range ends before the first value more
+    than `tolerance` above its lowest one, so the ranges do not depend on the order of the rows.
+    Ranges with fewer than min_distinct_ids distinct IDs are left out, they cannot make a group.
+
+    Args:
+        links (DisjointSet): Các bản ghi đã liên kết.
+        values (np.ndarray): Giá trị (số) của từng bản ghi.
+        tolerance (float): Chênh lệch tối đa giữa hai giá trị trong một khoảng.
+        ids (list): ID của từng bản ghi.
+        min_distinct_ids (int): Số ID riêng biệt tối thiểu của một nhóm.
+
+    Yields:
+        np.ndarray: Vị trí các bản ghi (tăng dần) của từng khoảng.
+    """
+    for members, _ in linked_clusters(links, ids, min_distinct_ids):
+        members = members[np.argsort(np.asarray(values[members], dtype=np.float64), kind='stable')]
+        member_values = np.asarray(values[members], dtype=np.float64)
+        start = 0
+        while start < len(members):
+            end = int(np.searchsorted(member_values, member_values[start] + tolerance, side='right'))
+            if len(set(ids[k] for k in members[start:end])) >= min_distinct_ids:
+                yield np.sort(members[start:end])
+            start = end
+
+
+# --- BLOCKING ---
+BLOCKING_PASSES = ['prefix', 'sorted_tokens', 'phonetic'] # Các lượt tạo khối, cặp khớp của mọi lượt được hợp lại
+BLOCKING_WINDOW = 10 # Cửa sổ sorted-neighbourhood trên toàn bộ chuỗi đã sắp xếp, 0 để tắt
+MAX_BLOCK_SIZE = 1000 # Khối lớn hơn được chia theo từ tiếp theo của khóa, rồi theo cửa sổ chồng nhau (trừ lượt prefix)
+
+# Vietnamese spellings of (nearly) the same sound, applied in order on unaccented words
+PHONETIC_REPLACEMENTS = [('ngh', 'ng'), ('gh', 'g'), ('ph', 'f'), ('th', 't'), ('tr', 'c'), ('ch', 'c'),
+                         ('gi', 'z'), ('d', 'z'), ('r', 'z'), ('k', 'c'), ('q', 'c'), ('x', 's')]
+VOWELS_PATTERN = re.compile(r'[aeiouy]')
+REPEATED_LETTERS_PATTERN = re.compile(r'(.)\1+')
+
+
+@functools.lru_cache(maxsize=NORMALIZER_CACHE_MAX_ENTRIES)
+def phonetic_key(word):
+    """
+    Consonant skeleton of a cleaned word: same-sounding spellings merged, vowels and doubled
+    letters dropped. Swapped or mistyped vowels ("le loi" / "el loi" / "le lui") give the same key.
+    """
+    key = word
+    for spelling, sound in PHONETIC_REPLACEMENTS:
+        key = key.replace(spelling, sound)
+    key = REPEATED_LETTERS_PATTERN.sub(r'\1', VOWELS_PATTERN.sub('', key))
+    return key or word
+
+# Words of a cleaned string that make its blocking key, the first N of them are used
+BLOCKING_METHODS = {
+    'prefix': lambda text: text.split(),
+    'sorted_tokens': lambda text: sorted(text.split()),
+    'phonetic': lambda text: [phonetic_key(word) for word in text.split()],
+}
+
+
+def _group_positions(codes):
+    """Positions of the records of each distinct code, increasing inside a group."""
+    order = np.argsort(codes, kind='stable')
+    return np.split(order, np.flatnonzero(np.diff(codes[order])) + 1)
+
+
+def _combine_codes(columns):
+    """One code per distinct row of several integer code columns."""
+    combined = columns[0]
+    for codes in columns[1:]:
+        combined = pd.factorize(combined * (int(codes.max()) + 1) + codes)[0]
+    return combined
+
+
+def _pass_blocks(field_codes, field_words, key_lengths, exact_codes, key_ranks, max_block_size):
+    """
+    Yields the blocks of one blocking pass: records grouped on the first key_lengths words of each
+    field (and on exact_codes), groups over max_block_size regrouped with one more word, and groups
+    that cannot be refined any more cut into windows overlapping by half, in order of their words
+    then of key_ranks, so the windows do not depend on the order of the rows. With max_block_size
+    None no group is split.
+    Keys are built once per distinct string, field_codes maps each record to its string.
+    """
+    key_cache = {}
+
+    def key_codes(field, depth):
+        if (field, depth) not in key_cache:
+            length = key_lengths[field] + depth
+            keys = np.array([" ".join(words[:length]) for words in field_words[field]], dtype=object)
+            key_cache[(field, depth)] = pd.factorize(keys)[0][field_codes[field]]
+        return key_cache[(field, depth)]
+
+    word_counts = [np.array([len(words) for words in field_words[field]])[field_codes[field]] for field in range(len(field_codes))]
+    word_ranks = []
+    pending = [(np.arange(len(field_codes[0])), 0)]
+    while pending:
+        members, depth = pending.pop()
+        columns = [key_codes(field, depth)[members] for field in range(len(field_codes))]
+        if exact_codes is not None:
+            columns.insert(0, exact_codes[members])
+        for group in _group_positions(_combine_codes(columns)):
+            group = members[group]
+            if len(group) < 2:
+                continue
+            if max_block_size is None or len(group) <= max_block_size:
+                yield group
+            elif any((counts[group] > length + depth).any() for counts, length in zip(word_counts, key_lengths)):
+                pending.append((group, depth + 1))
+            else:
+                if not word_ranks:
+                    word_ranks.extend(np.argsort(np.array(sorted(range(len(words)), key=words.__getitem__)))[codes]
+                                      for words, codes in zip(field_words, field_codes))
+                group = group[np.lexsort([key_ranks[group]] + [ranks[group] for ranks in word_ranks[::-1]])]
+                step = max(1, max_block_size // 2)
+                for start in range(0, len(group) - step, step):
+                    yield np.sort(group[start:start + max_block_size])
+
+
+def plan_blocks(keys, fields, exact=None, passes=BLOCKING_PASSES, window=BLOCKING_WINDOW, max_block_size=MAX_BLOCK_SIZE):
+    """
+    Blocking of the similar-address reports. Records with the same key are linked up front and
+    only the first of them is blocked and scored. Every pass in `passes` groups them on its own
+    key (first words, first sorted words, first phonetic words of each field), so a typo in the
+    first word that splits one pass is caught by another; identical blocks of two passes are kept
+    once. With a window, records sorted on their full fields are also compared with their window-1
+    next neighbours. The 'prefix' pass is the single blocking the reports used before and its
+    blocks are never split, so every pair it puts together is still scored and the passes only
+    add matches. The blocks of the other passes hold at most max_block_size records.
+
+    Args:
+        keys (list): Khóa (hashable) của từng bản ghi, phải chứa mọi trường is_match đọc.
+        fields (list[tuple[np.ndarray, int]]): (chuỗi đã chuẩn hóa, số từ của khóa khối) của từng trường.
+        exact (np.ndarray, optional): Giá trị phải trùng nhau trong một khối (vd. giá trị đơn hàng).
+        passes (list[str]): Các lượt tạo khối, xem BLOCKING_METHODS.
+        window (int): Cửa sổ sorted-neighbourhood, 0 để tắt.
+        max_block_size (int): Số bản ghi tối đa của một khối, trừ các khối của lượt prefix.
+
+    Returns:
+        tuple: (links, blocks) - DisjointSet đã liên kết các bản ghi trùng khóa và danh sách
+        (members, window) cho candidate_lists.
+    """
+    links = DisjointSet.from_keys(keys)
+    scored = links.roots()
+    field_codes, field_texts = [], []
+    for values, _ in fields:
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object)[scored])
+        field_codes.append(codes)
+        field_texts.append(list(uniques))
+    key_lengths = [length for _, length in fields]
+    exact_codes = None if exact is None else pd.factorize(np.asarray(exact, dtype=object)[scored])[0]
+    key_ranks = np.empty(len(scored), dtype=np.int64)
+    key_ranks[sorted(range(len(scored)), key=lambda k: keys[scored[k]])] = np.arange(len(scored))
+    blocks = []
+    seen = set()
+    for method in passes:
+        split = BLOCKING_METHODS[method]
+        field_words = [[split(text) for text in texts] for texts in field_texts]
+        limit = None if method == 'prefix' else max_block_size
+        for members in _pass_blocks(field_codes, field_words, key_lengths, exact_codes, key_ranks, limit):
+            signature = members.tobytes()
+            if signature not in seen:
+                seen.add(signature)
+                blocks.append((scored[members], None))
+    if window and len(scored) > 1:
+        # One sorted run per exact value, neighbours with another value could never match
+        ranks = [np.argsort(np.argsort(np.array(texts, dtype=object)))[codes] for texts, codes in zip(field_texts, field_codes)]
+        runs = np.zeros(len(scored), dtype=np.int64) if exact_codes is None else exact_codes
+        order = np.lexsort([key_ranks] + ranks[::-1] + [runs])
+        for run in np.split(order, np.flatnonzero(np.diff(runs[order])) + 1):
+            if len(run) > 1:
+                blocks.append((scored[run], window))
+    return links, blocks
+
+
+CANDIDATE_PAIR_BATCH = 1000000 # Số cặp ứng viên tối đa sinh ra một lần, giới hạn bộ nhớ
+REACHABLE_CHUNK = 200000 # Số cặp được lọc theo số ký tự chung mỗi lần
+
+
+def reachable_filter(texts, threshold):
+    """
+    Returns reachable(left, right), a mask of the pairs of `texts` (positions) that can still reach
+    `threshold` with fuzz.ratio, so the others are never scored. ratio = 2 * LCS / (l1 + l2) and
+    the LCS of two strings is at most the number of characters they have in common (for each
+    character the smaller of both counts), which also gives the length filter. Anything that
+    rounds up to the threshold is kept, like similarity_scores.
+
+    Args:
+        texts (np.ndarray): Chuỗi được so sánh bằng fuzz.ratio (sort_tokens của địa chỉ).
+        threshold (int): Ngưỡng điểm (0-100).
+    """
+    cutoff = (threshold - 0.5) / 100
+    # Non-ASCII characters all become '?', which can only raise the counts in common
+    lengths = np.array([len(text) for text in texts], dtype=np.int64)
+    characters = np.frombuffer("".join(texts).encode('ascii', 'replace'), dtype=np.uint8)
+    alphabet, codes = np.unique(characters, return_inverse=True)
+    owners = np.repeat(np.arange(len(texts)), lengths)
+    counts = np.zeros((len(texts), len(alphabet)), dtype=np.uint16)
+    np.add.at(counts, (owners, codes), 1)
+
+    def reachable(left, right):
+        totals = lengths[left] + lengths[right]
+        kept = 2 * np.minimum(lengths[left], lengths[right]) >= cutoff * totals - 1e-9
+        remaining = np.flatnonzero(kept)
+        for start in range(0, len(remaining), REACHABLE_CHUNK):
+            chunk = remaining[start:start + REACHABLE_CHUNK]
+            common = np.minimum(counts[left[chunk]], counts[right[chunk]]).sum(axis=1, dtype=np.int64)
+            kept[chunk] = 2 * common >= cutoff * totals[chunk] - 1e-9
+        return kept
+
+    return reachable
+
+
+def _range_candidates(entry_records, starts, ends, flat, size, reachable=None, max_pairs=CANDIDATE_PAIR_BATCH,
+                      after=True):
+    """
+    Yields (i, candidates) in increasing order of i, from entries pairing record entry_records[e]
+    with the records flat[starts[e]:ends[e]]: only the records after i, each pair once, and only
+    the pairs kept by reachable(left, right). With after False the entries list each pair from
+    one side already, and the candidates of i can come before it. Pairs are expanded by batches
+    of whole records holding about max_pairs pairs.
+    """
+    order = np.argsort(entry_records, kind='stable')
+    entry_records, starts = entry_records[order], starts[order]
+    counts = np.maximum(ends[order] - starts, 0)
+    cumulative = np.cumsum(counts)
+    batch_start = 0
+    while batch_start < len(entry_records):
+        done = cumulative[batch_start - 1] if batch_start else 0
+        batch_end = max(batch_start + 1, int(np.searchsorted(cumulative, done + max_pairs, side='right')))
+        batch_end = int(np.searchsorted(entry_records, entry_records[batch_end - 1], side='right'))
+        batch_counts = counts[batch_start:batch_end]
+        first = np.cumsum(batch_counts) - batch_counts
+        left = np.repeat(entry_records[batch_start:batch_end], batch_counts)
+        right = flat[np.repeat(starts[batch_start:batch_end] - first, batch_counts) + np.arange(int(batch_counts.sum()))]
+        # Sorting keeps each record's candidates in order, a mask drops the pairs listed twice
+        pairs = np.sort(left * size + right)
+        left, right = pairs // size, pairs % size
+        kept = ((right > left) if after else (right != left)) & np.r_[True, pairs[1:] != pairs[:-1]]
+        if reachable is not None:
+            kept[kept] = reachable(left[kept], right[kept])
+        left, right = left[kept], right[kept]
+        bounds = np.flatnonzero(np.diff(left)) + 1
+        for i, candidates in zip(left[np.r_[0, bounds]] if len(left) else [], np.split(right, bounds)):
+            yield i, candidates
+        batch_start = batch_end
+
+
+def candidate_lists(blocks, size, reachable=None):
+    """
+    Yields (i, candidates) for the records of `blocks` in increasing order of i: the records after i
+    sharing one of its blocks or its sorted-neighbourhood window. A pair put together by several
+    passes is listed once, and each record is scored in a single call however many blocks hold it.
+
+    Args:
+        blocks (list): Danh sách (members, window) của plan_blocks.
+        size (int): Số bản ghi của báo cáo.
+        reachable (callable, optional): Bộ lọc cặp của reachable_filter.
+
+    Yields:
+        tuple: (i, candidates), candidates là mảng vị trí các bản ghi sau i.
+    """
+    if not blocks:
+        return
+    sizes = np.array([len(members) for members, _ in blocks], dtype=np.int64)
+    flat = np.concatenate([members for members, _ in blocks])
+    block_starts = np.repeat(np.cumsum(sizes) - sizes, sizes)
+    block_ends = np.repeat(np.cumsum(sizes), sizes)
+    windows = np.repeat(np.array([window or 0 for _, window in blocks], dtype=np.int64), sizes)
+    positions = np.arange(len(flat))
+    # A whole block pairs a record with the members after it, a window with its window-1 neighbours on both sides
+    starts = np.where(windows > 0, np.maximum(block_starts, positions - windows + 1), positions + 1)
+    ends = np.where(windows > 0, np.minimum(block_ends, positions + windows), block_ends)
+    yield from _range_candidates(flat, starts, ends, flat, size, reachable)
+
+
+# --- SIMILARITY INDEX ---
+USE_QGRAM_INDEX = True # Sinh cặp ứng viên bằng chỉ mục q-gram (đủ mọi cặp đạt ngưỡng) thay cho các lượt tạo khối
+QGRAM_SIZE = 1 # Độ dài q-gram của chỉ mục; ở ngưỡng 85, gram dài hơn cần tiền tố dài hơn và sinh nhiều cặp hơn
+QGRAM_MAX_PAIRS_PER_RECORD = 2000 # Chỉ mục sinh nhiều cặp hơn (dữ liệu ít đa dạng) thì dùng các khối
+
+
+def _min_overlap(length, partner_lengths, q, cutoff):
+    """
+    Lowest number of q-grams a string of `length` characters shares with any string of
+    `partner_lengths` it can reach `cutoff` with (ratio as a fraction). ratio = 2 * LCS / T with T
+    the sum of both lengths, the Indel distance is d = T - 2 * LCS, and each of the d gaps breaks
+    at most q-1 of the LCS q-grams, so both strings keep (2q-1) * LCS - q + 1 - (q-1) * T q-grams
+    in common.
+    """
+    totals = length + np.asarray(partner_lengths, dtype=np.int64)
+    common = np.ceil(cutoff * totals / 2 - 1e-9)
+    return int(((2 * q - 1) * common - q + 1 - (q - 1) * totals).min())
+
+
+class QGramIndex(object):
+    """
+    Similarity join of the similar-address reports: lists, for each string, every other string
+    that can possibly reach `threshold` with fuzz.ratio (token_sort_ratio on sort_tokens strings),
+    without scoring all pairs of a block.
+
+    Strings are cut into q-grams numbered by occurrence ("ab" twice gives ab#1, ab#2), so shared
+    grams count as a multiset. With `groups` each group is its own index: only strings of the same
+    group are paired (e.g. the same order value) and grams are counted inside their group. Grams
+    are ordered by document frequency, rarest (highest IDF) first, and a string only keeps a prefix
+    of n - overlap + 1 grams, overlap being the _min_overlap() bound: two strings sharing at least
+    that many grams always share one prefix gram. Pairs are generated from the shorter string of
+    each pair (AllPairs): it probes with the prefix for partners at least as long as itself, and
+    each string is indexed with the longer prefix for its shorter partners. Posting lists are
+    sorted by length, so a probe only reads the strings the length filter allows. Strings too
+    short for the bound are indexed under one extra token of their group.
+    On repetitive data the frequent grams make long posting lists; `selective` tells whether
+    the index generates at most QGRAM_MAX_PAIRS_PER_RECORD pairs per string.
+    """
+    def __init__(self, texts, threshold, groups=None, positions=None, q=QGRAM_SIZE):
+        """
+        Args:
+            texts (list[str]): Các chuỗi cần so sánh (đã chuẩn hóa, sort_tokens).
+            threshold (int): Ngưỡng điểm (0-100), cặp được làm tròn tới ngưỡng cũng được giữ.
+            groups (np.ndarray, optional): Mã nhóm (số nguyên) của từng chuỗi, chỉ ghép cặp trong cùng nhóm.
+            positions (np.ndarray, optional): Vị trí bản ghi (tăng dần) của từng chuỗi, mặc định 0..n-1.
+            q (int): Độ dài q-gram.
+        """
+        cutoff = (threshold - 0.5) / 100
+        size = len(texts)
+        lengths = np.array([len(text) for text in texts], dtype=np.int64)
+        groups = np.zeros(size, dtype=np.int64) if groups is None else np.asarray(groups, dtype=np.int64)
+        self.positions = np.arange(size) if positions is None else np.asarray(positions, dtype=np.int64)
+
+        # q-grams of all strings at once, as integer codes over the concatenated bytes
+        data = np.frombuffer("".join(texts).encode('ascii', 'replace'), dtype=np.uint8).astype(np.int64)
+        gram_counts = np.maximum(lengths - q + 1, 0)
+        records = np.repeat(np.arange(size), gram_counts)
+        first_gram = np.repeat(np.cumsum(gram_counts) - gram_counts, gram_counts)
+        starts = np.repeat(np.cumsum(lengths) - lengths, gram_counts) + np.arange(len(records)) - first_gram
+        grams = np.zeros(len(records), dtype=np.int64)
+        for offset in range(q):
+            grams = grams * 256 + data[starts + offset]
+
+        # Occurrence number of each gram inside its string
+        order = np.lexsort((grams, records))
+        records, grams = records[order], grams[order]
+        new_run = np.ones(len(records), dtype=bool)
+        new_run[1:] = (records[1:] != records[:-1]) | (grams[1:] != grams[:-1])
+        occurrences = np.arange(len(records)) - np.maximum.accumulate(np.where(new_run, np.arange(len(records)), 0))
+
+        # Partner lengths allowed by the length filter, longer ones for the probes, shorter ones for the index
+        shortest = np.ceil(lengths * cutoff / (2 - cutoff) - 1e-9).astype(np.int64)
+        longest = np.floor(lengths * (2 - cutoff) / cutoff + 1e-9).astype(np.int64)
+        bounds = {length: (_min_overlap(length, np.arange(length, high + 1), q, cutoff),
+                           _min_overlap(length, np.arange(low, length + 1), q, cutoff))
+                  for length, low, high in set(zip(lengths.tolist(), shortest.tolist(), longest.tolist()))}
+        probe_overlaps = np.array([bounds[length][0] for length in lengths.tolist()], dtype=np.int64)
+        index_overlaps = np.array([bounds[length][1] for length in lengths.tolist()], dtype=np.int64)
+        probe_lengths = np.minimum(gram_counts, gram_counts - probe_overlaps + 1)
+        index_lengths = np.minimum(gram_counts, gram_counts - index_overlaps + 1)
+        tokens = _combine_codes([groups[records], grams, occurrences]) if len(records) else np.zeros(0, dtype=np.int64)
+        short = np.flatnonzero((probe_overlaps < 1) | (index_overlaps < 1))
+        records = np.concatenate([records, short])
+        tokens = np.concatenate([tokens, tokens.max(initial=-1) + 1 + pd.factorize(groups[short])[0]])
+        probe_lengths[short] = index_lengths[short] = gram_counts[short] + 1
+
+        # Rarest tokens first in each string
+        frequencies = np.bincount(tokens)
+        order = np.lexsort((tokens, frequencies[tokens], records))
+        records, tokens = records[order], tokens[order]
+        rank = np.arange(len(records)) - np.searchsorted(records, records)
+
+        # Posting lists sorted by token, length and record; a probe reads the longer strings of its token
+        # up to the longest partner length, so each pair comes from its shorter string (ties by record)
+        indexed = rank < index_lengths[records]
+        index_records, index_tokens = records[indexed], tokens[indexed]
+        order = np.lexsort((index_records, lengths[index_records], index_tokens))
+        index_records, index_tokens = index_records[order], index_tokens[order]
+        span = int(lengths.max(initial=0)) + 2
+        keys = (index_tokens * span + lengths[index_records]) * size + index_records
+        probed = rank < probe_lengths[records]
+        probe_records, probe_tokens = records[probed], tokens[probed]
+        self.probes = self.positions[probe_records]
+        self.starts = np.searchsorted(keys, (probe_tokens * span + lengths[probe_records]) * size + probe_records, side='right')
+        self.ends = np.searchsorted(keys, (probe_tokens * span + np.minimum(longest[probe_records], span - 1) + 1) * size)
+        self.records = self.positions[index_records]
+        self.generated_pairs = int(np.maximum(self.ends - self.starts, 0).sum())
+        self.selective = self.generated_pairs <= QGRAM_MAX_PAIRS_PER_RECORD * max(size, 1)
+
+    def candidates(self, size, reachable=None):
+        """
+        Yields (i, candidates) in increasing order of i (record positions): the records sharing
+        a prefix gram with i and at least as long as i, so each pair is listed once, on either side
+        of i, filtered by reachable(left, right).
+        """
+        yield from _range_candidates(self.probes, self.starts, self.ends, self.records, size, reachable, after=False)
+
+
+def plan_candidates(keys, texts, threshold, fields, exact=None, use_index=USE_QGRAM_INDEX, passes=BLOCKING_PASSES,
+                    window=BLOCKING_WINDOW, max_block_size=MAX_BLOCK_SIZE, log_emitter=None):
+    """
+    Candidate pairs of the similar-address reports. Records with the same key are linked up front
+    and only the first of them is compared. With use_index, a QGramIndex on `texts` lists every
+    pair that can reach threshold; when it is not selective enough on this data, or without
+    use_index, plan_blocks() builds the blocks of `fields`, which can miss pairs the index finds.
+    Either way pairs go through reachable_filter() before being scored.
+
+    Args:
+        keys (list): Khóa (hashable) của từng bản ghi, phải chứa mọi trường is_match đọc.
+        texts (np.ndarray): Chuỗi được so sánh bằng fuzz.ratio (sort_tokens của địa chỉ).
+        threshold (int): Ngưỡng điểm của báo cáo.
+        fields (list[tuple[np.ndarray, int]]): Các trường tạo khối, xem plan_blocks.
+        exact (np.ndarray, optional): Giá trị phải trùng nhau giữa hai bản ghi (vd. giá trị đơn hàng).
+        use_index (bool): Dùng chỉ mục q-gram khi đủ chọn lọc.
+        passes, window, max_block_size: Cấu hình các khối, xem plan_blocks.
+        log_emitter (Signal, optional): Nơi ghi nhật ký.
+
+    Returns:
+        tuple: (links, candidates) - DisjointSet đã liên kết các bản ghi trùng khóa và iterator
+        (i, candidates) theo i tăng dần.
+    """
+    texts = np.asarray(texts, dtype=object)
+    reachable = reachable_filter(texts, threshold)
+    if use_index:
+        links = DisjointSet.from_keys(keys)
+        scored = links.roots()
+        groups = None if exact is None else pd.factorize(np.asarray(exact, dtype=object)[scored])[0]
+        index = QGramIndex(list(texts[scored]), threshold, groups=groups, positions=scored)
+        profile_count('qgram_pairs', index.generated_pairs)
+        if index.selective:
+            if log_emitter is not None:
+                log_emitter.emit(f"ℹ️ Đã lập chỉ mục q-gram cho {len(scored)} bản ghi.")
+            return links, index.candidates(len(texts), reachable)
+        if log_emitter is not None:
+            log_emitter.emit(f"ℹ️ Chỉ mục q-gram sinh quá nhiều cặp trên dữ liệu này ({index.generated_pairs:,}), dùng các khối.")
+    links, blocks = plan_blocks(keys, fields, exact=exact, passes=passes, window=window, max_block_size=max_block_size)
+    profile_count('blocks', len(blocks))
+    if log_emitter is not None:
+        log_emitter.emit(f"ℹ️ Đã tạo {len(blocks)} khối dữ liệu.")
+    return links, candidate_lists(blocks, len(texts), reachable)
+
+
+# --- RESULT SINK ---
+# Định dạng file kết quả: phần mở rộng của từng định dạng, chọn theo từng lần chạy
+RESULT_FORMATS = OrderedDict([('xlsx', '.xlsx'), ('csv', '.csv'), ('parquet', '.parquet')])
+DEFAULT_RESULT_FORMAT = 'xlsx'
+
+# Results are written by one background thread, so a worker hands its frame over and returns;
+# the interpreter waits for the queued writes at exit (concurrent.futures joins its threads).
+RESULT_WRITER = ThreadPoolExecutor(max_workers=1, thread_name_prefix='result-writer')
+
+def available_result_formats():
+    """Formats writable here: Parquet needs pyarrow."""
+    return [fmt for fmt in RESULT_FORMATS if fmt != 'parquet' or HAS_PYARROW]
+
+def result_path(output_file_path, result_format):
+    """output_file_path with the extension of result_format (the report names default to .xlsx)."""
+    return os.path.splitext(output_file_path)[0] + RESULT_FORMATS[result_format]
+
+def write_result(df, output_file_path, result_format=DEFAULT_RESULT_FORMAT):
+    """
+    Ghi một DataFrame kết quả theo định dạng đã chọn.
+    xlsx dùng xlsxwriter ở chế độ constant_memory (ghi từng dòng ra đĩa, không giữ cả sheet trong bộ nhớ),
+    csv có BOM để Excel đọc đúng tiếng Việt, parquet giữ nguyên kiểu dữ liệu.
+    Args:
+        df (pd.DataFrame): Dữ liệu kết quả.
+        output_file_path (str): Đường dẫn file, phần mở rộng phải khớp với result_format.
+        result_format (str): Một khóa trong RESULT_FORMATS.
+    """
+    if result_format == 'csv':
+        df.to_csv(output_file_path, index=False, encoding='utf-8-sig')
+    elif result_format == 'parquet':
+        # Object columns may mix str and numbers (IDs read from different sources), Arrow needs one type
+        df = df.apply(lambda col: col.astype('string') if col.dtype == object else col)
+        df.to_parquet(output_file_path, index=False)
+    else:
+        write_workbook([('Sheet1', df)], output_file_path)
+
+def write_workbook(sheets, output_file_path):
+    """
+    Ghi nhiều DataFrame vào một file .xlsx, mỗi DataFrame một sheet, theo thứ tự của sheets.
+    Dùng xlsxwriter ở chế độ constant_memory nếu có, nếu không thì openpyxl.
+    Args:
+        sheets (list[tuple[str, pd.DataFrame]]): Các cặp (tên sheet, dữ liệu).
+        output_file_path (str): Đường dẫn file .xlsx.
+    """
+    if not HAS_XLSXWRITER:
+        with pd.ExcelWriter(output_file_path, engine='openpyxl') as writer:
+            for sheet_name, df in sheets:
+                df.to_excel(writer, sheet_name=sheet_name, index=False)
+        return
+    workbook = xlsxwriter.Workbook(output_file_path, {'constant_memory': True, 'remove_timezone': True})
+    try:
+        header_format = workbook.add_format({'bold': True, 'border': 1, 'align': 'center', 'valign': 'top'})
+        date_format = workbook.add_format({'num_format': 'yyyy-mm-dd hh:mm:ss'})
+        for sheet_name, df in sheets:
+            _write_xlsx_rows(workbook.add_worksheet(sheet_name), df, header_format, date_format)
+    finally:
+        workbook.close()
+
+def _write_xlsx_rows(worksheet, df, header_format, date_format):
+    """
+    Streams df to a constant_memory worksheet row by row. constant_memory flushes a row as soon as
+    the next one starts, so the cells cannot go through DataFrame.to_excel, which writes column by column.
+    Missing values are left blank and strings are never read as formulas, like the openpyxl output.
+    """
+    for col, name in enumerate(df.columns):
+        worksheet.write_string(0, col, str(name), header_format)
+    for row, values in enumerate(zip(*(df[name].tolist() for name in df.columns)), start=1):
+        for col, value in enumerate(values):
+            if value is None or value is pd.NaT or (isinstance(value, float) and value != value):
+                continue
+            if isinstance(value, str):
+                worksheet.write_string(row, col, value)
+            elif isinstance(value, (bool, np.bool_)):
+                worksheet.write_boolean(row, col, bool(value))
+            elif isinstance(value, (int, float, np.number)):
+                worksheet.write_number(row, col, value)
+            elif isinstance(value, pd.Timestamp):
+                worksheet.write_datetime(row, col, value.to_pydatetime(), date_format)
+            else:
+                worksheet.write_string(row, col, str(value))
+
+def read_result(output_file_path):
+    """Reads back a result file written by write_result, the format taken from its extension."""
+    ext = os.path.splitext(output_file_path)[1].lower()
+    if ext == RESULT_FORMATS['csv']:
+        return pd.read_csv(output_file_path, encoding='utf-8-sig')
+    if ext == RESULT_FORMATS['parquet']:
+        return pd.read_parquet(output_file_path)
+    return pd.read_excel(output_file_path, engine='openpyxl')
+
+def wait_for_results(pending_results):
+    """
+    Đợi các file kết quả đang được ghi ở luồng nền.
+    Args:
+        pending_results (list): Các cặp (report_key, Future) do run_report thêm vào.
+    Returns:
+        set[str]: Các report_key ghi file thất bại.
+    """
+    return {report_key for report_key, future in pending_results if future.exception() is not None}
+
+
+# --- PROFILING ---
+# Each report run is timed by stage: the workers mark read/normalize/block/compare, save_result
+# marks write, everything else inside run() counts as detect.
+PROFILE_STAGES = ['read', 'normalize', 'block', 'compare', 'detect', 'write']
+PROFILE_COUNTERS = ['blocks', 'groups', 'comparisons'] # Các bộ đếm của profile_count, theo thứ tự hiển thị
+TRACE_SUFFIX = '.trace.json'
+_PROFILE_FRAMES = threading.local() # Các bước đang mở của luồng hiện tại
+
+class _ProcessMemoryCounters(ctypes.Structure):
+    """PROCESS_MEMORY_COUNTERS of the Windows psapi."""
+    _fields_ = [('cb', ctypes.c_ulong), ('PageFaultCount', ctypes.c_ulong)] + [
+        (name, ctypes.c_size_t) for name in ('PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage',
+                                             'QuotaPagedPoolUsage', 'QuotaPeakNonPagedPoolUsage',
+                                             'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+
+def peak_rss_mb():
+    """Peak resident memory of this process so far, in MB, None where the platform does not tell."""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024 # byte trên macOS, KB trên Linux
+    if sys.platform == 'win32':
+        counters = _ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        kernel32, psapi = ctypes.windll.kernel32, ctypes.windll.psapi
+        kernel32.GetCurrentProcess.restype = ctypes.c_void_p
+        psapi.GetProcessMemoryInfo.argtypes = [ctypes.c_void_p, ctypes.POINTER(_ProcessMemoryCounters), ctypes.c_ulong]
+        if psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+            return counters.PeakWorkingSetSize / (1024 * 1024)
+    return None
+
+def profile_count(name, count=1):
+    """Adds count to a counter (PROFILE_COUNTERS) of the innermost stage open in this thread, if any."""
+    frames = getattr(_PROFILE_FRAMES, 'frames', None)
+    if frames:
+        counts = frames[-1]['record']['counts']
+        counts[name] = counts.get(name, 0) + count
+
+class StageProfiler(object):
+    """
+    Số đo từng bước của một lần chạy báo cáo: thời gian thực, thời gian CPU của luồng chạy bước,
+    RSS cao nhất của process khi bước kết thúc, số dòng vào/ra và các bộ đếm của profile_count.
+    Một bước lồng trong bước khác chỉ được tính một lần: thời gian của bước con bị trừ khỏi bước cha.
+    """
+    def __init__(self):
+        self.started_at = datetime.now()
+        self.stages = {}
+        self._lock = threading.Lock() # Bước 'write' chạy ở luồng ghi file
+
+    def record(self, name):
+        """The figures of stage `name`, created empty on first use."""
+        with self._lock:
+            return self.stages.setdefault(name, {'wall_s': 0.0, 'cpu_s': 0.0, 'peak_rss_mb': None,
+                                                 'rows_in': None, 'rows_out': None, 'counts': {}})
+
+    @contextlib.contextmanager
+    def stage(self, name, rows_in=None):
+        """Times the block as stage `name` and yields its record, where the block may set 'rows_out'."""
+        record = self.record(name)
+        if rows_in is not None:
+            record['rows_in'] = rows_in
+        frames = _PROFILE_FRAMES.__dict__.setdefault('frames', [])
+        frame = {'record': record, 'child_wall': 0.0, 'child_cpu': 0.0}
+        frames.append(frame)
+        started_wall, started_cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield record
+        finally:
+            wall, cpu = time.perf_counter() - started_wall, time.thread_time() - started_cpu
+            frames.pop()
+            record['wall_s'] += wall - frame['child_wall']
+            record['cpu_s'] += cpu - frame['child_cpu']
+            record['peak_rss_mb'] = peak_rss_mb()
+            if frames:
+                frames[-1]['child_wall'] += wall
+                frames[-1]['child_cpu'] += cpu
+
+    def ordered_stages(self):
+        """(name, record) of the stages that ran, in PROFILE_STAGES order."""
+        return [(name, self.stages[name]) for name in PROFILE_STAGES if name in self.stages]
+
+    def summary_lines(self):
+        """Bảng tóm tắt các bước để ghi vào nhật ký."""
+        def number(value):
+            return '-' if value is None else f"{value:,}"
+        lines = [f"{'Bước':<10}{'Thời gian':>11}{'CPU':>10}{'RSS đỉnh':>11}{'Dòng vào':>11}{'Dòng ra':>11}  Bộ đếm"]
+        for name, record in self.ordered_stages():
+            rss = '-' if record['peak_rss_mb'] is None else f"{record['peak_rss_mb']:,.0f} MB"
+            counts = ", ".join(f"{counter} {record['counts'][counter]:,}" for counter in PROFILE_COUNTERS
+                               if counter in record['counts'])
+            lines.append(f"{name:<10}{record['wall_s']:>10.2f}s{record['cpu_s']:>9.2f}s{rss:>11}"
+                         f"{number(record['rows_in']):>11}{number(record['rows_out']):>11}  {counts}".rstrip())
+        total_wall = sum(record['wall_s'] for _, record in self.ordered_stages())
+        total_cpu = sum(record['cpu_s'] for _, record in self.ordered_stages())
+        lines.append(f"{'total':<10}{total_wall:>10.2f}s{total_cpu:>9.2f}s")
+        return lines
+
+    def to_dict(self, **info):
+        """Trace JSON: `info` (báo cáo, file...), môi trường chạy và các bước theo thứ tự."""
+        stages = self.ordered_stages()
+        return {
+            **info,
+            'started': self.started_at.isoformat(timespec='seconds'),
+            'total_wall_s': round(sum(record['wall_s'] for _, record in stages), 4),
+            'total_cpu_s': round(sum(record['cpu_s'] for _, record in stages), 4),
+            'python': platform.python_version(), 'pandas': pd.__version__, 'rapidfuzz': HAS_RAPIDFUZZ,
+            'platform': platform.platform(), 'cpus': os.cpu_count(),
+            'stages': [{'stage': name, **record, 'wall_s': round(record['wall_s'], 4), 'cpu_s': round(record['cpu_s'], 4),
+                        'peak_rss_mb': None if record['peak_rss_mb'] is None else round(record['peak_rss_mb'], 1)}
+                       for name, record in stages],
+        }
+
+
+def trace_output_path(trace_folder, output_file_path):
+    """Where a run's JSON trace is saved: trace_folder, named after the report's result file."""
+    return os.path.join(trace_folder, os.path.splitext(os.path.basename(output_file_path))[0] + TRACE_SUFFIX)
+
+
+def profiled(run):
+    """
+    Decorator of a worker's run(): times the run by stage in self.profiler and logs the table
+    once the run is over, i.e. after the result file is written when save_result queued one.
+    """
+    @functools.wraps(run)
+    def wrapper(self):
+        self.profiler = StageProfiler()
+        self.pending_result = None
+        self._run_finished = threading.Event()
+        try:
+            with self.profiler.stage('detect'):
+                run(self)
+        finally:
+            self._run_finished.set()
+        if self.pending_result is None:
+            self.report_profile()
+    return wrapper
+
+
+# --- CANCELLATION ---
+CANCEL_NONE = 0 # Giá trị của cancel flag dùng chung giữa các process
+CANCEL_DISCARD = 1 # Hủy, bỏ kết quả tìm được
+CANCEL_KEEP_PARTIAL = 2 # Hủy và lưu các ID tìm được trước khi hủy
+
+class ReportCancelled(BaseException):
+    """
+    Raised inside a worker once cancel() was requested. Derives from BaseException like
+    KeyboardInterrupt, so the workers' `except Exception` handlers do not report it as an error.
+    """
+    pass
+
+
+def partial_output_path(output_file_path):
+    """Where the IDs found before a cancellation are saved, next to the normal result file."""
+    root, ext = os.path.splitext(output_file_path)
+    return f"{root}_partial{ext}"
+
+
+def cancellable(run):
+    """Decorator of a worker's run(): a cancellation drops the worker's data and finishes with None."""
+    @functools.wraps(run)
+    def wrapper(self):
+        try:
+            run(self)
+        except ReportCancelled:
+            self.df = None # Giải phóng dữ liệu ngay, không đợi worker bị hủy
+            self.log.emit("⚠️ Đã hủy báo cáo.")
+            self.finished.emit(None)
+    return wrapper
+
+
+class ReportWorker(object):
+    """
+    Base of the report workers: cooperative cancellation. cancel() only raises a flag, the worker
+    stops at its next check_cancelled() call, i.e. after reading the input and between blocks/groups.
+    """
+    INPUT_COLUMNS = None
+    log_detail = LOG_DETAIL_NORMAL # Gán LOG_DETAIL_VERBOSE trên instance để ghi từng nhóm tìm được
+    result_format = DEFAULT_RESULT_FORMAT # Định dạng file kết quả (RESULT_FORMATS)
+    trace_folder = None # Thư mục lưu trace JSON của mỗi lần chạy (trace_output_path), None để không lưu
+
+    def __init__(self):
+        super().__init__()
+        self.df = None
+        self.pending_result = None # Future của lần ghi file kết quả ở luồng nền
+        self._saved_message = None # Dòng nhật ký ghi khi pending_result ghi xong file, xem log_when_saved
+        self.profiler = StageProfiler() # Số đo của lần chạy gần nhất, xem profiled
+        self._run_finished = threading.Event()
+        self._run_finished.set()
+        self._cancel = threading.Event()
+        self._keep_partial = False
+
+    def cancel(self, keep_partial=False):
+        """
+        Yêu cầu dừng báo cáo, an toàn khi gọi từ luồng khác.
+        Args:
+            keep_partial (bool): Lưu các ID đã tìm được vào partial_output_path trước khi dừng.
+        """
+        self._keep_partial = keep_partial
+        self._cancel.set()
+
+    def is_cancelled(self):
+        return self._cancel.is_set()
+
+    def check_cancelled(self, partial_ids=None):
+        """
+        Raises ReportCancelled when cancel() was requested, saving partial_ids first if asked to.
+        partial_ids may be a callable returning them, when they are costly to gather at every check.
+        """
+        if not self._cancel.is_set():
+            return
+        if callable(partial_ids) and self._keep_partial:
+            partial_ids = partial_ids()
+        if self._keep_partial and partial_ids:
+            partial_path = partial_output_path(result_path(self.output_file_path, self.result_format))
+            write_result(pd.DataFrame(list(partial_ids), columns=['ID']), partial_path, self.result_format)
+            self.log.emit(f"⚠️ Đã lưu {len(partial_ids)} ID tìm được trước khi hủy tại: {partial_path}")
+        raise ReportCancelled()
+
+    def save_result(self, df):
+        """
+        Queues df on RESULT_WRITER and returns without waiting, so the next report can start while
+        the file is written. output_file_path takes the extension of result_format; run_report
+        waits for pending_result before reporting success. The file only exists once pending_result
+        is done, the "saved" line goes through log_when_saved.
+        """
+        self.output_file_path = result_path(self.output_file_path, self.result_format)
+        output_file_path = self.output_file_path
+        result_format = self.result_format
+        self.profiler.record('detect')['rows_out'] = len(df)
+        self._saved_message = None
+
+        def write():
+            try:
+                with self.profiler.stage('write', rows_in=len(df)) as stage:
+                    write_result(df, output_file_path, result_format)
+                    stage['rows_out'] = len(df)
+            except Exception as e:
+                self.log.emit(f"❌ Lỗi khi ghi file kết quả {output_file_path}: {e}")
+                raise
+            else:
+                # run() sets the message right after save_result, it is known once run() returned
+                self._run_finished.wait()
+                if self._saved_message is not None:
+                    self.log.emit(self._saved_message)
+            finally:
+                # The table covers the whole run, wait for run() to return before logging it
+                self._run_finished.wait()
+                self.report_profile()
+
+        self.pending_result = RESULT_WRITER.submit(write)
+
+    def log_when_saved(self, message):
+        """Logs message once the file queued by save_result is written, nothing if the write fails."""
+        self._saved_message = message
+
+    def report_profile(self):
+        """Logs the stage table of the last run and saves its JSON trace in trace_folder if set."""
+        read = self.profiler.stages.get('read')
+        detect = self.profiler.record('detect')
+        if detect['rows_in'] is None and read is not None:
+            detect['rows_in'] = read['rows_out']
+        self.log.emit("ℹ️ Thời gian từng bước:\n" + "\n".join(self.profiler.summary_lines()))
+        if self.trace_folder is None:
+            return
+        trace_path = trace_output_path(self.trace_folder, self.output_file_path)
+        report_key = next((key for key, report in REPORTS.items() if report['worker'] is type(self)), None)
+        try:
+            with open(trace_path, 'w', encoding='utf-8') as f:
+                json.dump(self.profiler.to_dict(report=report_key, worker=type(self).__name__,
+                                                input=os.path.abspath(self.input_file_path),
+                                                output=os.path.abspath(self.output_file_path),
+                                                result_format=self.result_format), f, ensure_ascii=False, indent=2)
+            self.log.emit(f"ℹ️ Đã lưu trace tại: {trace_path}")
+        except OSError as e:
+            self.log.emit(f"⚠️ Không lưu được trace {trace_path}: {e}")
+
+    def log_verbose(self, message):
+        """Logs a per-group message only at LOG_DETAIL_VERBOSE, the normal log keeps one summary line."""
+        if self.log_detail >= LOG_DETAIL_VERBOSE:
+            self.log.emit(message)
+
+    def read_input(self):
+        """Reads INPUT_COLUMNS of the input file, stopping there if the report was cancelled meanwhile."""
+        with self.profiler.stage('read') as stage:
+            df = read_and_map_data(self.input_file_path, self.log, self.INPUT_COLUMNS)
+            stage['rows_out'] = None if df is None else len(df)
+        self.check_cancelled()
+        return df
+
+
+class Worker1(ReportWorker):
+    """
+    Lớp thực hiện việc nhóm dữ liệu Same promotion
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['recipient_phone_', 'pv_promotion_id', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            # Validate required columns
+            required_columns = ['recipient_phone_', 'pv_promotion_id', 'buyer_id']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            final_grouped_ids = evaluate_rule('same_promotion_phone', self.df, self.plan)[3]
+
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # Create a DataFrame for the final grouped IDs (single column)
+            if final_grouped_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids), columns=['ID'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_ids)} ID nhóm theo khuyến mãi tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (recipient_phone_, Promotion ID, >= 3 ID).")
+            
+            self.finished.emit(self.df)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+
+class Worker2(ReportWorker):
+
+    """
+    Lớp thực hiện việc nhóm dữ liệu same FSV
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['recipient_phone_', 'fsv_voucher_code', 'buyer_id', 'buyer_shipping_address_district']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            # Validate required columns
+            required_columns = ['recipient_phone_', 'fsv_voucher_code', 'buyer_id', 'buyer_shipping_address_district']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            final_grouped_ids = evaluate_rule('same_fsv', self.df, self.plan)[5]
+
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # Create a DataFrame for the final grouped IDs (single column)
+            if final_grouped_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids), columns=['ID'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_ids)} ID nhóm theo khuyến mãi tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (recipient_phone_, fsv_voucher_code, buyer_shipping_address_district >= 5 ID).")
+            
+            self.finished.emit(self.df)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+class Worker3(ReportWorker):
+
+    """
+    Lớp thực hiện việc nhóm dữ liệu same IP and create_time
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['ip_checkout', 'create_time', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+
+            required_columns = ['ip_checkout', 'create_time', 'buyer_id']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            
+            # Đảm bảo cột 'create_time' và 'registration_time' là kiểu datetime
+            self.df['create_time'] = pd.to_datetime(self.df['create_time'], errors='coerce')
+            
+            # Filter out rows where create_time is NaT
+            # If a record has NaT for create_time, it can't be part of a time-constrained group
+            df_filtered = self.df.dropna(subset=['create_time']).copy()
+            # Every record opens a 1-hour window on its ip_checkout (rows without IP left out by its rule);
+            # keep the IDs of every window with at least 3 unique buyer_ids
+            final_grouped_ids = evaluate_rule('ip_create_time', df_filtered, self.plan)[3]
+            self.progress.emit(100)
+
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # Create a DataFrame for the final grouped IDs (single column)
+            if final_grouped_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids), columns=['ID'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_ids)} ID nhóm tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (ít nhất 3 ID riêng biệt trong 1 giờ cho create_time).")
+            
+            self.finished.emit(True) # Indicate successful completion
+            
+        except FileNotFoundError:
+            self.log.emit(f"❌ Lỗi: Không tìm thấy file tại đường dẫn: {self.input_file_path}")
+            self.finished.emit(None)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi trong quá trình xử lý: {e}")
+            self.finished.emit(None)
+class Worker4(ReportWorker):
+
+    """
+    Lớp thực hiện việc nhóm dữ liệu Same promotion
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['recipient_phone_', 'pv_promotion_id', 'buyer_id', 'buyer_shipping_address_district']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            # Validate required columns
+            required_columns = ['recipient_phone_', 'pv_promotion_id', 'buyer_id', 'buyer_shipping_address_district']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+            # Ensure 'recipient_phone_' and 'pv_promotion_id' are strings to handle mixed types consistently
+            # self.df['recipient_phone_'] = self.df['recipient_phone_'].astype(str)
+            # self.df['pv_promotion_id'] = self.df['pv_promotion_id'].astype(str)
+            # self.df['buyer_id'] = self.df['buyer_id'].astype(str)
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            final_grouped_ids = evaluate_rule('same_promotion_phone_district', self.df, self.plan)[3]
+
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # Create a DataFrame for the final grouped IDs (single column)
+            if final_grouped_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids), columns=['ID'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_ids)} ID nhóm theo khuyến mãi tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (recipient_phone_, Promotion ID, buyer_shipping_address_district >= 3 ID).")
+            
+            self.finished.emit(self.df)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+class Worker5(ReportWorker):
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['buyer_shipping_address_state', 'buyer_id', 'item_amount', 'gmv_vnd']
+
+    def __init__(self, input_file_path, output_file_path):
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            # Giả định hàm read_and_map_data đã được định nghĩa
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            
+            
+            
+            # Các cột bắt buộc cho logic mới
+            required_columns = ["buyer_shipping_address_state", "buyer_id", "item_amount", "gmv_vnd"]
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: Thiếu cột: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang phân tích dữ liệu theo nhóm Address và Amount...")
+            
+            # Loại bỏ NaN và lọc item_amount <= 3 (nếu cần)
+            df_filtered = self.df.dropna(subset=required_columns).copy()
+            df_filtered = df_filtered[df_filtered['item_amount'] >= 3]
+            # Sắp xếp theo gmv_vnd để tối ưu việc tìm kiếm chênh lệch 300k
+            df_sorted = df_filtered.sort_values(by=['buyer_shipping_address_state', 'item_amount', 'gmv_vnd']).reset_index(drop=True)
+
+            with self.profiler.stage('compare', rows_in=len(df_sorted)) as stage:
+                final_grouped_ids = set()
+            
+                # Nhóm theo Tỉnh thành và Số lượng sản phẩm
+                grouped = df_sorted.groupby(['buyer_shipping_address_state', 'item_amount'], observed=True)
+                total_groups = len(grouped)
+                profile_count('groups', total_groups)
+                processed_groups = 0
+
+                for name, group in grouped:
+                    self.check_cancelled(final_grouped_ids)
+                    processed_groups += 1
+                    self.progress.emit(int((processed_groups / total_groups) * 100))
+                
+                    records = group.to_dict('records')
+                    if len(records) < 4:
+                        continue
+                
+                    # Duyệt tìm các bản ghi có gmv_vnd chênh lệch <= 300,000
+                    for i in range(len(records)):
+                        current_val = records[i]['gmv_vnd']
+                        potential_group = [records[i]['buyer_id']]
+                    
+                        for j in range(i + 1, len(records)):
+                            next_val = records[j]['gmv_vnd']
+                        
+                            # Vì đã sort theo gmv_vnd, nếu hiệu số > 300k thì các dòng sau cũng sẽ > 300k
+                            if (next_val - current_val) <= 300000:
+                                potential_group.append(records[j]['buyer_id'])
+                            else:
+                                break
+                    
+                        # Kiểm tra nếu có ít nhất 3 buyer_id khác nhau trong cụm này
+                        if len(set(potential_group)) >= 4:
+                            final_grouped_ids.update(set(potential_group))
+                stage['rows_out'] = len(final_grouped_ids)
+
+            self.log.emit("ℹ️ Đang xuất file kết quả...")
+            
+            if final_grouped_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids), columns=['ID'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Thành công: Tìm thấy {len(final_grouped_ids)} ID thỏa mãn điều kiện.")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào thỏa mãn các tiêu chí so sánh giá trị đơn hàng.")
+            
+            self.finished.emit(True)
+            
+        except Exception as e:
+            self.log.emit(f"❌ Lỗi hệ thống: {str(e)}")
+            self.finished.emit(None)
+class Worker6(ReportWorker):
+
+    """
+    Lớp thực hiện việc nhóm dữ liệu Same Recipient_Phone_
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['recipient_phone_', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            # Validate required columns
+            required_columns = ['recipient_phone_']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            final_grouped_ids = evaluate_rule('same_recipient_phone', self.df, self.plan)[3]
+
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # Create a DataFrame for the final grouped IDs (single column)
+            if final_grouped_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids), columns=['ID'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_ids)} ID nhóm theo khuyến mãi tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (recipient_phone_ >= 3 ID).")
+            
+            self.finished.emit(self.df)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+class Worker7(ReportWorker):
+
+    """
+    Worker to generate a Same_Similar_address document.
+    This document identifies groups of at least 3 unique buyer_ids that share
+    similar delivery address and same order value checkout (using fuzzy matching)
+    and leverages a blocking technique for improved performance.
+    Emits signals for progress, log messages, and completion status.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object) # Emits True on success, None on error/no data
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['buyer_id', 'gmv_vnd', 'buyer_shipping_address_district']
+
+    # Configuration parameters
+    SIMILARITY_THRESHOLD = 85  # Adjust this value (0-100) for both name and address
+    NAME_BLOCKING_WORDS = 7   # Number of words for name blocking
+    ADDRESS_BLOCKING_WORDS = 2 # Number of words for address blocking (after cleaning)
+    BLOCKING_PASSES = BLOCKING_PASSES # Blocking passes merged by union, see plan_blocks
+    BLOCKING_WINDOW = BLOCKING_WINDOW # Sorted-neighbourhood window, 0 to turn it off
+    MAX_BLOCK_SIZE = MAX_BLOCK_SIZE   # Larger blocks are split
+    USE_QGRAM_INDEX = USE_QGRAM_INDEX # Candidates from the q-gram index when it is selective, see plan_candidates
+
+    def __init__(self, input_file_path, output_file_path):
+        """
+        Initializes the Worker10 thread.
+        
+        Args:
+            input_file_path (str): Path to the input Excel or CSV file.
+            output_file_path (str): Path to save the output Excel file.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.df = None # To store the DataFrame
+    @profiled
+    @cancellable
+    def run(self):
+        """
+        Main method that executes the data processing logic in the thread.
+        """
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            
+            required_columns = ['buyer_id', 'gmv_vnd', 'buyer_shipping_address_district']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File thiếu các cột bắt buộc cho báo cáo này: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            # Drop rows with any NaN in required columns before further processing
+            initial_rows = len(self.df)
+            self.df.dropna(subset=required_columns, inplace=True)
+            if len(self.df) < initial_rows:
+                self.log.emit(f"ℹ️ Đã loại bỏ {initial_rows - len(self.df)} hàng có giá trị thiếu trong các cột bắt buộc.")
+
+            if self.df.empty:
+                self.log.emit("ℹ️ Không có dữ liệu hợp lệ sau khi loại bỏ các hàng thiếu thông tin bắt buộc.")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang chuẩn hóa địa chỉ...")
+            with self.profiler.stage('normalize', rows_in=len(self.df)):
+                self.df['cleaned_address'] = clean_addresses(self.df['buyer_shipping_address_district'], self.log)
+
+            # Drop rows where normalization/cleaning resulted in None
+            initial_rows_after_norm = len(self.df)
+            self.df.dropna(subset=['cleaned_address'], inplace=True)
+            if len(self.df) < initial_rows_after_norm:
+                self.log.emit(f"ℹ️ Đã loại bỏ {initial_rows_after_norm - len(self.df)} hàng có tên hoặc địa chỉ không hợp lệ sau chuẩn hóa.")
+            
+            if self.df.empty:
+                self.log.emit("ℹ️ Không có dữ liệu hợp lệ sau khi chuẩn hóa địa chỉ.")
+                self.finished.emit(None)
+                return
+            
+            # --- Blocking Step for improved performance ---
+            self.log.emit("ℹ️ Đang tìm các cặp ứng viên (chỉ mục q-gram hoặc khối) để so sánh hiệu quả hơn...")
+
+            with self.profiler.stage('block', rows_in=len(self.df)) as stage:
+                addresses = self.df['cleaned_address'].to_numpy(dtype=object)
+                sorted_addresses = np.array([sort_tokens(address) for address in addresses], dtype=object)
+                order_values = self.df['gmv_vnd'].to_numpy(dtype=object)
+                buyer_ids = self.df['buyer_id'].tolist()
+                # Candidates share the order value, see plan_candidates
+                links, candidates = plan_candidates(list(zip(addresses, order_values)), sorted_addresses, self.SIMILARITY_THRESHOLD,
+                                                    [(addresses, self.ADDRESS_BLOCKING_WORDS)], exact=order_values,
+                                                    use_index=self.USE_QGRAM_INDEX, passes=self.BLOCKING_PASSES,
+                                                    window=self.BLOCKING_WINDOW, max_block_size=self.MAX_BLOCK_SIZE,
+                                                    log_emitter=self.log)
+                stage['rows_out'] = len(links.roots())
+            # --- End Blocking Step ---
+
+            def is_match(i, candidates):
+                matched = order_values[candidates] == order_values[i]
+                similar = candidates[matched]
+                address_similarity = similarity_scores(sorted_addresses[i], sorted_addresses[similar], self.SIMILARITY_THRESHOLD)
+                matched[matched] = (addresses[similar] == addresses[i]) | (address_similarity >= self.SIMILARITY_THRESHOLD)
+                return matched
+
+            with self.profiler.stage('compare', rows_in=len(buyer_ids)) as stage:
+                self.log.emit("ℹ️ Bắt đầu so sánh trong từng khối...")
+
+                # Records come in increasing position, so the position gives the progress
+                for i, record_candidates in candidates:
+                    self.check_cancelled(lambda: set().union(*(ids for _, ids in linked_clusters(links, buyer_ids))))
+                    self.progress.emit(min(99, int((i / len(buyer_ids)) * 100)))
+                    link_record(links, i, record_candidates, is_match)
+
+                final_grouped_buyer_ids = set()
+                clusters_found = 0
+                for members, unique_ids_in_cluster in linked_clusters(links, buyer_ids):
+                    final_grouped_buyer_ids.update(unique_ids_in_cluster)
+                    clusters_found += 1
+                    self.log_verbose(f"✅ Tìm thấy nhóm hợp lệ (địa chỉ và giá trị đơn hàng khớp). {len(unique_ids_in_cluster)} ID duy nhất.")
+                stage['rows_out'] = len(final_grouped_buyer_ids)
+
+            self.log.emit(f"ℹ️ Tìm thấy {clusters_found} nhóm hợp lệ.")
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            self.progress.emit(100) # Ensure progress is 100% at the end
+
+            if final_grouped_buyer_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_buyer_ids), columns=['buyer_id'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_buyer_ids)} ID nhóm tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (ít nhất 3 ID riêng biệt với địa chỉ tương đồng và giá trị đơn hàng giống nhau).")
+            
+            self.finished.emit(True) # Indicate successful completion
+            
+        except FileNotFoundError:
+            self.log.emit(f"❌ Lỗi: Không tìm thấy file tại đường dẫn: {self.input_file_path}")
+            self.finished.emit(None)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi trong quá trình xử lý: {e}")
+            self.finished.emit(None)
+class Worker8(ReportWorker):
+
+    """
+    Tolerant Address Report
+    
+    Worker to generate a Same_Similar_address document.
+    This document identifies groups of at least 3 unique buyer_ids that share
+    similar delivery address (using fuzzy matching) and an order value checkout
+    with a difference of no more than 300,000 VND. Similar addresses are linked
+    transitively (A~B~C), but the order values of a whole group stay within the
+    tolerance: a ring is cut into value ranges, see value_ranges.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object) # Emits True on success, None on error/no data
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['buyer_id', 'gmv_vnd', 'buyer_shipping_address_district']
+
+    # Configuration parameters
+    SIMILARITY_THRESHOLD = 85  # Adjust this value (0-100) for address
+    ADDRESS_BLOCKING_WORDS = 2 # Number of words for address blocking (after cleaning)
+    BLOCKING_PASSES = BLOCKING_PASSES # Blocking passes merged by union, see plan_blocks
+    BLOCKING_WINDOW = BLOCKING_WINDOW # Sorted-neighbourhood window, 0 to turn it off
+    MAX_BLOCK_SIZE = MAX_BLOCK_SIZE   # Larger blocks are split
+    USE_QGRAM_INDEX = USE_QGRAM_INDEX # Candidates from the q-gram index when it is selective, see plan_candidates
+    ORDER_VALUE_TOLERANCE = 300000 # Max difference for Order Value (Checkout Amount)
+
+    def __init__(self, input_file_path, output_file_path):
+        """
+                
+        Args:
+            input_file_path (str): Path to the input Excel or CSV file.
+            output_file_path (str): Path to save the output Excel file.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.df = None # To store the DataFrame
+
+    # Helper function based on your VBA RemoveDiacritics
+    @profiled
+    @cancellable
+    def run(self):
+        """
+        Main method that executes the data processing logic in the thread.
+        """
+        try:
+            # Assuming read_and_map_data is defined elsewhere
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            
+            required_columns = ['buyer_id', 'gmv_vnd', 'buyer_shipping_address_district']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File thiếu các cột bắt buộc cho báo cáo này: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            # Drop rows with any NaN in required columns before further processing
+            initial_rows = len(self.df)
+            self.df.dropna(subset=required_columns, inplace=True)
+            if len(self.df) < initial_rows:
+                self.log.emit(f"ℹ️ Đã loại bỏ {initial_rows - len(self.df)} hàng có giá trị thiếu trong các cột bắt buộc.")
+
+            if self.df.empty:
+                self.log.emit("ℹ️ Không có dữ liệu hợp lệ sau khi loại bỏ các hàng thiếu thông tin bắt buộc.")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang chuẩn hóa địa chỉ...")
+            with self.profiler.stage('normalize', rows_in=len(self.df)):
+                self.df['cleaned_address'] = clean_addresses(self.df['buyer_shipping_address_district'], self.log)
+
+            # Drop rows where normalization/cleaning resulted in None
+            initial_rows_after_norm = len(self.df)
+            self.df.dropna(subset=['cleaned_address'], inplace=True)
+            if len(self.df) < initial_rows_after_norm:
+                self.log.emit(f"ℹ️ Đã loại bỏ {initial_rows_after_norm - len(self.df)} hàng có tên hoặc địa chỉ không hợp lệ sau chuẩn hóa.")
+            
+            if self.df.empty:
+                self.log.emit("ℹ️ Không có dữ liệu hợp lệ sau khi chuẩn hóa địa chỉ.")
+                self.finished.emit(None)
+                return
+            
+            # --- Blocking Step for improved performance ---
+            self.log.emit("ℹ️ Đang tìm các cặp ứng viên (chỉ mục q-gram hoặc khối) để so sánh hiệu quả hơn...")
+
+            with self.profiler.stage('block', rows_in=len(self.df)) as stage:
+                addresses = self.df['cleaned_address'].to_numpy(dtype=object)
+                sorted_addresses = np.array([sort_tokens(address) for address in addresses], dtype=object)
+                order_values = self.df['gmv_vnd'].to_numpy(dtype=object)
+                buyer_ids = self.df['buyer_id'].tolist()
+                valid_values = ~pd.isna(order_values)
+                keys = list(zip(addresses, order_values))
+                links, candidates = plan_candidates(keys, sorted_addresses, self.SIMILARITY_THRESHOLD,
+                                                    [(addresses, self.ADDRESS_BLOCKING_WORDS)], use_index=self.USE_QGRAM_INDEX,
+                                                    passes=self.BLOCKING_PASSES, window=self.BLOCKING_WINDOW,
+                                                    max_block_size=self.MAX_BLOCK_SIZE, log_emitter=self.log)
+                stage['rows_out'] = len(links.roots())
+            # --- End Blocking Step ---
+
+            def is_match(i, candidates):
+                if not valid_values[i]:
+                    return np.zeros(len(candidates), dtype=bool)
+                matched = valid_values[candidates]
+                matched[matched] = np.abs(order_values[candidates[matched]] - order_values[i]) <= self.ORDER_VALUE_TOLERANCE
+                similar = candidates[matched]
+                address_similarity = similarity_scores(sorted_addresses[i], sorted_addresses[similar], self.SIMILARITY_THRESHOLD)
+                matched[matched] = (addresses[similar] == addresses[i]) | (address_similarity >= self.SIMILARITY_THRESHOLD)
+                return matched
+
+            with self.profiler.stage('compare', rows_in=len(buyer_ids)) as stage:
+                self.log.emit("ℹ️ Bắt đầu so sánh trong từng khối...")
+
+                # Records come in increasing position, so the position gives the progress
+                for i, record_candidates in candidates:
+                    self.check_cancelled(lambda: set().union(*(ids for _, ids in linked_clusters(links, buyer_ids))))
+                    self.progress.emit(min(99, int((i / len(buyer_ids)) * 100)))
+                    link_record(links, i, record_candidates, is_match)
+
+                # Linking chains the tolerance, so each ring is cut into value ranges of at most ORDER_VALUE_TOLERANCE
+                # and its records are linked again inside their range: every group stays within the tolerance
+                groups = DisjointSet.from_keys(keys)
+                scored = np.zeros(len(buyer_ids), dtype=bool)
+                scored[groups.roots()] = True
+                for members in value_ranges(links, order_values, self.ORDER_VALUE_TOLERANCE, buyer_ids):
+                    members = members[scored[members]]
+                    for position, i in enumerate(members):
+                        link_record(groups, i, members[position + 1:], is_match)
+
+                final_grouped_buyer_ids = set()
+                clusters_found = 0
+                for members, unique_ids_in_cluster in linked_clusters(groups, buyer_ids):
+                    final_grouped_buyer_ids.update(unique_ids_in_cluster)
+                    clusters_found += 1
+                    self.log_verbose(f"✅ Tìm thấy nhóm hợp lệ (địa chỉ tương đồng và giá trị đơn hàng chênh lệch không quá {self.ORDER_VALUE_TOLERANCE:,} VND). {len(unique_ids_in_cluster)} ID duy nhất.")
+                stage['rows_out'] = len(final_grouped_buyer_ids)
+
+            self.log.emit(f"ℹ️ Tìm thấy {clusters_found} nhóm hợp lệ.")
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            self.progress.emit(100) # Ensure progress is 100% at the end
+
+            if final_grouped_buyer_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_buyer_ids), columns=['buyer_id'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_buyer_ids)} ID nhóm tại: {self.output_file_path}")
+            else:
+                self.log.emit(f"ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (ít nhất 3 ID riêng biệt với địa chỉ tương đồng và giá trị đơn hàng chênh lệch không quá {self.ORDER_VALUE_TOLERANCE:,} VND).")
+            
+            self.finished.emit(True) # Indicate successful completion
+            
+        except FileNotFoundError:
+            self.log.emit(f"❌ Lỗi: Không tìm thấy file tại đường dẫn: {self.input_file_path}")
+            self.finished.emit(None)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi trong quá trình xử lý: {e}")
+            self.finished.emit(None)
+class Worker9(ReportWorker):
+
+    """
+    Lớp thực hiện việc nhóm dữ liệu RSL
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['recipient_phone_', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+
+            
+            
+            # Add 'registration_time' to required columns
+            required_columns = ['recipient_phone_', 'buyer_id']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang chuẩn hóa số điện thoại...")
+            self.df['normalized_phone'] = normalize_phone_numbers(self.df['recipient_phone_'])
+            
+            self.df.dropna(subset=['normalized_phone'], inplace=True)
+            if self.df.empty:
+                self.log.emit("ℹ️ Không có dữ liệu hợp lệ sau khi chuẩn hóa số điện thoại.")
+                self.finished.emit(None)
+                return
+            
+            # Group by normalized phone number, counting missing buyer_id like set() did
+            final_grouped_ids = evaluate_rule('rsl', self.df, self.plan)[4]
+            self.progress.emit(100)
+
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            if final_grouped_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids), columns=['buyer_id'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_ids)} ID nhóm tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (ít nhất 4 ID riêng biệt có cùng số điện thoại).")
+            
+            self.finished.emit(True) 
+            
+        except FileNotFoundError:
+            self.log.emit(f"❌ Lỗi: Không tìm thấy file tại đường dẫn: {self.input_file_path}")
+            self.finished.emit(None)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi trong quá trình xử lý: {e}")
+            self.finished.emit(None)
+class Worker10(ReportWorker):
+
+    """
+    Similar address report
+    Worker to generate a Same_Similar_address document.
+    This document identifies groups of at least 3 unique buyer_ids that share
+    similar recipient names and similar delivery address districts (using fuzzy matching)
+    and leverages a blocking technique for improved performance.
+    Emits signals for progress, log messages, and completion status.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object) # Emits True on success, None on error/no data
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['buyer_id', 'item_name', 'buyer_shipping_address_district']
+
+    # Configuration parameters
+    SIMILARITY_THRESHOLD = 85  # Adjust this value (0-100) for both name and address
+    NAME_BLOCKING_LENGTH = 3   # Number of characters for name blocking
+    NAME_BLOCKING_WORDS = 7   # Number of words for name blocking
+    ADDRESS_BLOCKING_WORDS = 2 # Number of words for address blocking (after cleaning)
+    BLOCKING_PASSES = BLOCKING_PASSES # Blocking passes merged by union, see plan_blocks
+    BLOCKING_WINDOW = BLOCKING_WINDOW # Sorted-neighbourhood window, 0 to turn it off
+    MAX_BLOCK_SIZE = MAX_BLOCK_SIZE   # Larger blocks are split
+    USE_QGRAM_INDEX = USE_QGRAM_INDEX # Candidates from the q-gram index when it is selective, see plan_candidates
+
+    def __init__(self, input_file_path, output_file_path):
+        """
+        Initializes the Worker6 thread.
+        
+        Args:
+            input_file_path (str): Path to the input Excel or CSV file.
+            output_file_path (str): Path to save the output Excel file.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.df = None # To store the DataFrame
+
+    @profiled
+    @cancellable
+    def run(self):
+        """
+        Main method that executes the data processing logic in the thread.
+        """
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            
+            required_columns = ['buyer_id', 'item_name', 'buyer_shipping_address_district']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File thiếu các cột bắt buộc cho báo cáo này: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            # Drop rows with any NaN in required columns before further processing
+            initial_rows = len(self.df)
+            self.df.dropna(subset=required_columns, inplace=True)
+            if len(self.df) < initial_rows:
+                self.log.emit(f"ℹ️ Đã loại bỏ {initial_rows - len(self.df)} hàng có giá trị thiếu trong các cột bắt buộc.")
+
+            if self.df.empty:
+                self.log.emit("ℹ️ Không có dữ liệu hợp lệ sau khi loại bỏ các hàng thiếu thông tin bắt buộc.")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang chuẩn hóa tên người nhận và địa chỉ...")
+            with self.profiler.stage('normalize', rows_in=len(self.df)):
+                self.df['normalized_recipient_name'] = normalize_recipient_names(self.df['item_name'], self.log)
+                self.df['cleaned_address'] = clean_addresses(self.df['buyer_shipping_address_district'], self.log)
+
+            # Drop rows where normalization/cleaning resulted in None
+            initial_rows_after_norm = len(self.df)
+            self.df.dropna(subset=['normalized_recipient_name', 'cleaned_address'], inplace=True)
+            if len(self.df) < initial_rows_after_norm:
+                self.log.emit(f"ℹ️ Đã loại bỏ {initial_rows_after_norm - len(self.df)} hàng có tên hoặc địa chỉ không hợp lệ sau chuẩn hóa.")
+            
+            if self.df.empty:
+                self.log.emit("ℹ️ Không có dữ liệu hợp lệ sau khi chuẩn hóa tên và địa chỉ.")
+                self.finished.emit(None)
+                return
+
+            # --- Blocking Step for improved performance ---
+            self.log.emit("ℹ️ Đang tìm các cặp ứng viên (chỉ mục q-gram hoặc khối) để so sánh hiệu quả hơn...")
+
+            with self.profiler.stage('block', rows_in=len(self.df)) as stage:
+                names = self.df['normalized_recipient_name'].to_numpy(dtype=object)
+                name_prefixes = np.array([" ".join(name.split()[:self.NAME_BLOCKING_WORDS]) for name in names], dtype=object)
+                addresses = self.df['cleaned_address'].to_numpy(dtype=object)
+                sorted_addresses = np.array([sort_tokens(address) for address in addresses], dtype=object)
+                buyer_ids = self.df['buyer_id'].tolist()
+                # Records only match within the same first name words, candidates come from the addresses
+                links, candidates = plan_candidates(list(zip(addresses, names)), sorted_addresses, self.SIMILARITY_THRESHOLD,
+                                                    [(addresses, self.ADDRESS_BLOCKING_WORDS)], exact=name_prefixes,
+                                                    use_index=self.USE_QGRAM_INDEX, passes=self.BLOCKING_PASSES,
+                                                    window=self.BLOCKING_WINDOW, max_block_size=self.MAX_BLOCK_SIZE,
+                                                    log_emitter=self.log)
+                stage['rows_out'] = len(links.roots())
+            # --- End Blocking Step ---
+
+            # The first NAME_BLOCKING_WORDS name words must be equal, as when they were part of the block key.
+            # Then an exact address match (inspired by your VBA logic) is enough, otherwise both the address
+            # and the name must be similar; names are only scored for candidates whose address is similar.
+            def is_match(i, candidates):
+                matched = name_prefixes[candidates] == name_prefixes[i]
+                similar = candidates[matched]
+                is_exact_address_match = addresses[similar] == addresses[i]
+                address_similarity = similarity_scores(sorted_addresses[i], sorted_addresses[similar], self.SIMILARITY_THRESHOLD)
+                is_fuzzy_similar = ~is_exact_address_match & (address_similarity >= self.SIMILARITY_THRESHOLD)
+                name_similarity = similarity_scores(names[i], names[similar[is_fuzzy_similar]], self.SIMILARITY_THRESHOLD)
+                is_fuzzy_similar[is_fuzzy_similar] = name_similarity >= self.SIMILARITY_THRESHOLD
+                matched[matched] = is_exact_address_match | is_fuzzy_similar
+                return matched
+
+            with self.profiler.stage('compare', rows_in=len(buyer_ids)) as stage:
+                self.log.emit("ℹ️ Bắt đầu so sánh trong từng khối...")
+
+                # Records come in increasing position, so the position gives the progress
+                for i, record_candidates in candidates:
+                    self.check_cancelled(lambda: set().union(*(ids for _, ids in linked_clusters(links, buyer_ids))))
+                    self.progress.emit(min(99, int((i / len(buyer_ids)) * 100)))
+                    link_record(links, i, record_candidates, is_match)
+
+                final_grouped_buyer_ids = set()
+                clusters_found = 0
+                for members, unique_ids_in_cluster in linked_clusters(links, buyer_ids):
+                    # Add these buyer IDs to the final set
+                    final_grouped_buyer_ids.update(unique_ids_in_cluster)
+                    clusters_found += 1
+
+                    # Log message based on the type of match found
+                    if self.log_detail < LOG_DETAIL_VERBOSE:
+                        continue
+                    if (addresses[members] == addresses[members[0]]).all():
+                         self.log.emit(f"✅ Tìm thấy nhóm hợp lệ (địa chỉ chuẩn hóa chính xác): {len(unique_ids_in_cluster)} ID duy nhất.")
+                    else:
+                         self.log.emit(f"✅ Tìm thấy nhóm hợp lệ (tên và địa chỉ tương đồng): {len(unique_ids_in_cluster)} ID duy nhất.")
+                stage['rows_out'] = len(final_grouped_buyer_ids)
+
+            self.log.emit(f"ℹ️ Tìm thấy {clusters_found} nhóm hợp lệ.")
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            self.progress.emit(100) # Ensure progress is 100% at the end
+
+            if final_grouped_buyer_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_buyer_ids), columns=['buyer_id'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_buyer_ids)} ID nhóm tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (ít nhất 3 ID riêng biệt với tên/địa chỉ tương đồng).")
+            
+            self.finished.emit(True) # Indicate successful completion
+            
+        except FileNotFoundError:
+            self.log.emit(f"❌ Lỗi: Không tìm thấy file tại đường dẫn: {self.input_file_path}")
+            self.finished.emit(None)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi trong quá trình xử lý: {e}")
+            self.finished.emit(None)
+class Worker11(ReportWorker):
+    """
+    Lớp thực hiện việc nhóm dữ liệu N3 6 - 9
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['N3', 'registration_time', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            # Validate required columns
+            required_columns = ['N3', 'registration_time', 'buyer_id']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            # Xử lý cột restristration_time xoá các dòng NaT và chuyển đổi kiểu dữ liệu
+            self.df['registration_time'].dropna(inplace=True) 
+            # Đảm bảo cột 'registration_time' là kiểu datetime
+            self.df['registration_time'] = pd.to_datetime(self.df['registration_time'], errors='coerce')
+            
+            # Xử lý các dòng NaT trong cột 'registration_time'
+            df_filtered = self.df.dropna(subset=['registration_time']).copy()
+            
+            # Mỗi bản ghi mở một cửa sổ 1 giờ trên cùng N3, lấy ID của các cửa sổ có >= 10 và >= 6 ID riêng biệt
+            windows = evaluate_rule('n3_6_9', df_filtered, self.plan)
+            final_grouped_ids_ten = windows[10] # Set lưu trữ tất cả các ID duy nhất thuộc về bất kỳ nhóm hợp lệ
+            final_grouped_ids_six_to_nine = windows[6] # Set lưu trữ tất cả các ID duy nhất thuộc về nhóm có từ 6 ID trở lên
+            self.progress.emit(100)
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # Khởi tạo df_output_ids với giá trị mặc định là None hoặc DataFrame rỗng
+            # Initialization to handle the case where either set might be empty
+            df_output_ids = None 
+            df_six_to_nine = None
+            
+            # --- Bắt đầu logic xử lý và kết hợp DataFrame ---
+            
+            # 1. Xử lý nhóm >=10
+            if final_grouped_ids_ten:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids_ten), columns=['ID >=10'])
+            
+            # 2. Xử lý nhóm 6-9, loại bỏ ID đã có trong nhóm >=10
+            # Note: The set operation is 'final_grouped_ids_six_to_nine - final_grouped_ids_ten'
+            ids_six_to_nine_only = final_grouped_ids_six_to_nine - final_grouped_ids_ten
+            
+            if ids_six_to_nine_only:
+                df_six_to_nine = pd.DataFrame(list(ids_six_to_nine_only), columns=['ID 6-9'])
+                
+                # Nếu df_output_ids đã được tạo (tức là có ID >= 10), thì nối nó với df_six_to_nine
+                if df_output_ids is not None:
+                    df_output_ids = pd.concat([df_output_ids, df_six_to_nine], axis=1)
+                else:
+                    # Nếu chưa có ID >= 10, thì df_six_to_nine chính là DataFrame đầu ra
+                    df_output_ids = df_six_to_nine
+                    
+            # --- Kết thúc logic xử lý và kết hợp DataFrame ---
+                    
+            # 3. Lưu kết quả nếu có bất kỳ ID nào được nhóm
+            if df_output_ids is not None:
+                # Nếu đã tạo được df_output_ids (dù chỉ từ nhóm >=10 hoặc chỉ từ nhóm 6-9 hoặc cả hai)
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(df_output_ids)} ID nhóm tại: {self.output_file_path}")
+            else:
+                # Nếu không tìm thấy bất kỳ ID nào trong cả hai nhóm
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (ít nhất 6 ID riêng biệt trong 1 giờ).")
+            
+            self.finished.emit(True) # Indicate successful completion
+            
+        except FileNotFoundError:
+            self.log.emit(f"❌ Lỗi: Không tìm thấy file Excel tại đường dẫn: {self.input_file_path}")
+            self.finished.emit(None)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi trong quá trình xử lý: {e}")
+            self.finished.emit(None)
+
+class Worker12(ReportWorker):
+    
+    """
+    Lớp thực hiện việc nhóm dữ liệu Same phone NUV with threshold 6 unique buyer_id's
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['recipient_phone_', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            # 1. Read Data
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            
+            # 3. Validate required columns
+            required_columns = ['recipient_phone_', 'buyer_id']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            ids_more_than_six = evaluate_rule('same_phone_6', self.df, self.plan)[6]
+
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # 8. Create Output DataFrame
+            
+            # Create a list of Series (columns) to concatenate
+            output_columns = []
+            
+
+            if ids_more_than_six:
+                output_columns.append(pd.Series(list(ids_more_than_six), name='ID >=6'))
+
+            if output_columns:
+                # Concatenate all available Series into a single DataFrame
+                df_output_ids = pd.concat(output_columns, axis=1)
+                
+                # Save to Excel
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Hoàn thành! Đã lưu {len(ids_more_than_six)} ID vào file.")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (recipient_phone_>= 6 ID).")
+            
+            self.finished.emit(self.df)
+            
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+class Worker13(ReportWorker):
+    """
+    Lớp thực hiện việc nhóm dữ liệu N3 -4
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['N3', 'registration_time', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            # Validate required columns
+            required_columns = ['N3', 'registration_time', 'buyer_id']
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            # Xử lý cột restristration_time xoá các dòng NaT và chuyển đổi kiểu dữ liệu
+            self.df['registration_time'].dropna(inplace=True) 
+            # Đảm bảo cột 'registration_time' là kiểu datetime
+            self.df['registration_time'] = pd.to_datetime(self.df['registration_time'], errors='coerce')
+            
+            # Xử lý các dòng NaT trong cột 'registration_time'
+            df_filtered = self.df.dropna(subset=['registration_time']).copy()
+            # Mỗi bản ghi mở một cửa sổ 1 giờ trên cùng N3, lấy ID của các cửa sổ có >= 4 ID riêng biệt
+            final_grouped_ids_more_than_four = evaluate_rule('n3_4', df_filtered, self.plan)[4]
+            self.progress.emit(100)
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # Khởi tạo df_output_ids với giá trị mặc định là None hoặc DataFrame rỗng
+            # Initialization to handle the case where either set might be empty
+            df_more_than_four = None
+            
+            # --- Bắt đầu logic xử lý và kết hợp DataFrame ---
+            
+
+            
+            if final_grouped_ids_more_than_four:
+                df_more_than_four = pd.DataFrame(list(final_grouped_ids_more_than_four), columns=['ID >=4'])
+                   
+            # --- Kết thúc logic xử lý và kết hợp DataFrame ---
+                    
+            # 3. Lưu kết quả nếu có bất kỳ ID nào được nhóm
+            if df_more_than_four is not None:
+                # Nếu đã tạo được df_output_ids (dù chỉ từ nhóm >=10 hoặc chỉ từ nhóm 6-9 hoặc cả hai)
+                self.save_result(df_more_than_four)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(df_more_than_four)} ID nhóm tại: {self.output_file_path}")
+            else:
+                # Nếu không tìm thấy bất kỳ ID nào trong cả hai nhóm
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (ít nhất 4 ID riêng biệt trong 1 giờ).")
+            
+            self.finished.emit(True) # Indicate successful completion
+            
+        except FileNotFoundError:
+            self.log.emit(f"❌ Lỗi: Không tìm thấy file Excel tại đường dẫn: {self.input_file_path}")
+            self.finished.emit(None)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi trong quá trình xử lý: {e}")
+            self.finished.emit(None)
+
+class Worker14(ReportWorker):
+    
+    """
+    Lớp thực hiện việc nhóm dữ liệu Same IP and Create time within 01 hour Report with threshold 6 unique buyer_id's
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['ip_checkout', 'create_time', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            # 1. Read Data and Initial Cleaning
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+
+            # 2. Define Columns and Validate (rows without IP are left out by the rule, see ROW_FILTERS)
+            
+            
+            GROUPING_KEYS = ['ip_checkout']
+            REQUIRED_COLUMNS = ['create_time', 'buyer_id'] + GROUPING_KEYS
+            
+            if not all(col in self.df.columns for col in REQUIRED_COLUMNS):
+                missing_cols = [col for col in REQUIRED_COLUMNS if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            
+            # 3. Data Preparation
+            self.df['create_time'] = pd.to_datetime(self.df['create_time'], errors='coerce')
+            df_processed = self.df.dropna(subset=REQUIRED_COLUMNS).copy()
+            
+            # 4. Core Logic: Fixed Start Time Grouping
+            # A window that reaches 6 unique buyer_ids is taken whole and the scan restarts after it
+            ids_more_than_six = evaluate_rule('ip_create_time_6', df_processed, self.plan)[6]
+            self.progress.emit(100)
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # 5. Create Output DataFrame (same as before)
+            output_columns = []
+            
+            if ids_more_than_six:
+                output_columns.append(pd.Series(list(ids_more_than_six), name='ID >=6'))
+
+            if output_columns:
+                df_output_ids = pd.concat(output_columns, axis=1)
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Hoàn thành! Đã lưu {len(ids_more_than_six)} ID vào file.")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (Same IP >= 6 ID trong 1 giờ).")
+            
+            self.finished.emit(self.df)
+            
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+class Worker15(ReportWorker):
+   
+    """
+    Lớp thực hiện việc nhóm dữ liệu Same IP and Create time within 01 hour Report with threshold 4 unique buyer_id's
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['ip_checkout', 'create_time', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            # 1. Read Data and Initial Cleaning
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+
+            # 2. Define Columns and Validate (rows without IP are left out by the rule, see ROW_FILTERS)
+            
+            
+            GROUPING_KEYS = ['ip_checkout']
+            REQUIRED_COLUMNS = ['create_time', 'buyer_id'] + GROUPING_KEYS
+            
+            if not all(col in self.df.columns for col in REQUIRED_COLUMNS):
+                missing_cols = [col for col in REQUIRED_COLUMNS if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            
+            # 3. Data Preparation
+            self.df['create_time'] = pd.to_datetime(self.df['create_time'], errors='coerce')
+            df_processed = self.df.dropna(subset=REQUIRED_COLUMNS).copy()
+            
+            # 4. Core Logic: Fixed Start Time Grouping
+            # A window that reaches 4 unique buyer_ids is taken whole and the scan restarts after it
+            ids_more_than_four = evaluate_rule('ip_create_time_4', df_processed, self.plan)[4]
+            self.progress.emit(100)
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # 5. Create Output DataFrame (same as before)
+            output_columns = []
+            
+            if ids_more_than_four:
+                output_columns.append(pd.Series(list(ids_more_than_four), name='ID >=4'))
+
+            if output_columns:
+                df_output_ids = pd.concat(output_columns, axis=1)
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Hoàn thành! Đã lưu {len(ids_more_than_four)} ID vào file.")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (Same IP >= 4 ID trong 1 giờ).")
+            
+            self.finished.emit(self.df)
+            
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+
+class Worker16(ReportWorker):
+   
+    """
+    Lớp thực hiện việc nhóm dữ liệu Same Domain and Registration time within 01 hour Report with threshold 6  unique buyer_id's
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['domain', 'registration_time', 'buyer_id']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            # 1. Read Data and Initial Cleaning
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+
+            # 2. Define Columns and Validate (EXCLUDED_DOMAINS are left out by the rule, see ROW_FILTERS)
+            
+            
+            GROUPING_KEYS = ['domain']
+            REQUIRED_COLUMNS = ['registration_time', 'buyer_id'] + GROUPING_KEYS
+            
+            if not all(col in self.df.columns for col in REQUIRED_COLUMNS):
+                missing_cols = [col for col in REQUIRED_COLUMNS if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            
+            # 3. Data Preparation
+            self.df['registration_time'] = pd.to_datetime(self.df['registration_time'], errors='coerce')
+            df_processed = self.df.dropna(subset=REQUIRED_COLUMNS).copy()
+            
+            # 4. Core Logic: Fixed Start Time Grouping
+            # A window that reaches 6 unique buyer_ids is taken whole and the scan restarts after it
+            ids_more_than_four = evaluate_rule('same_domain_reg_time', df_processed, self.plan)[6]
+            self.progress.emit(100)
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # 5. Create Output DataFrame (same as before)
+            output_columns = []
+            
+            if ids_more_than_four:
+                output_columns.append(pd.Series(list(ids_more_than_four), name='ID >=6'))
+
+            if output_columns:
+                df_output_ids = pd.concat(output_columns, axis=1)
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Hoàn thành! Đã lưu {len(ids_more_than_four)} ID vào file.")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (Same Domain >= 6 ID trong 1 giờ).")
+            
+            self.finished.emit(self.df)
+            
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+class Worker17(ReportWorker):
+    """
+    Same city and district + reg time
+    Lớp thực hiện việc nhóm dữ liệu Same State + City and Create time within 01 hour Report with threshold 6 unique buyer_id's và create_time - registration_time <= 20 phút
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['buyer_email', 'create_time', 'buyer_id', 'registration_time', 'buyer_shipping_address_state', 'buyer_shipping_address_city']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            # 1. Read Data and Initial Cleaning
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            # 2. Define Columns and Validate (empty email and <= 20 minutes after registration: see ROW_FILTERS)
+            
+            
+            GROUPING_KEYS = ['buyer_shipping_address_state', 
+                             'buyer_shipping_address_city']
+            REQUIRED_COLUMNS = ['create_time', 'buyer_id','registration_time'] + GROUPING_KEYS
+            
+            if not all(col in self.df.columns for col in REQUIRED_COLUMNS):
+                missing_cols = [col for col in REQUIRED_COLUMNS if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            
+            # 3. Data Preparation
+            self.df['create_time'] = pd.to_datetime(self.df['create_time'], errors='coerce')
+            self.df['registration_time'] = pd.to_datetime(self.df['registration_time'], errors='coerce')
+            df_processed = self.df.dropna(subset=REQUIRED_COLUMNS).copy()
+            
+            # 4. Core Logic: Fixed Start Time Grouping
+            # A window that reaches 6 unique buyer_ids is taken whole and the scan restarts after it
+            ids_more_than_six = evaluate_rule('same_city_state_reg_time', df_processed, self.plan)[6]
+            self.progress.emit(100)
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # 5. Create Output DataFrame (same as before)
+            output_columns = []
+            
+            if ids_more_than_six:
+                output_columns.append(pd.Series(list(ids_more_than_six), name='ID >=6'))
+
+            if output_columns:
+                df_output_ids = pd.concat(output_columns, axis=1)
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Hoàn thành! Đã lưu {len(ids_more_than_six)} ID vào file.")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí Same State + City and Create time within 01 hour Report with threshold 6 unique buyer_id's và create_time - registration_time <= 20 phút).")
+            
+            self.finished.emit(self.df)
+            
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+class Worker18(ReportWorker):
+
+    """
+    Lớp thực hiện việc nhóm dữ liệu Same Name + District + City + State
+    Phát tín hiệu để cập nhật tiến độ, thông báo nhật ký và trạng thái hoàn thành.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object)
+    # Các cột báo cáo cần, chỉ những cột này được đọc từ file
+    INPUT_COLUMNS = ['buyer_id', 'buyer_shipping_address_district', 'buyer_shipping_address_city', 'buyer_shipping_address_state', 'recipient_name']
+
+    def __init__(self, input_file_path, output_file_path, plan=None):
+        """
+        Khởi tạo luồng Worker.
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel đầu vào.
+            output_file_path (str): Đường dẫn để lưu file Excel kết quả.
+            plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.output_file_path = output_file_path
+        self.plan = plan
+
+    @profiled
+    @cancellable
+    def run(self):
+        try:
+            self.df = self.read_input()
+            if self.df is None:
+                self.finished.emit(None)
+                return
+            # Validate required columns
+            required_columns = ['buyer_id', 'buyer_shipping_address_district', "buyer_shipping_address_city", "buyer_shipping_address_state", "recipient_name"]
+            if not all(col in self.df.columns for col in required_columns):
+                missing_cols = [col for col in required_columns if col not in self.df.columns]
+                self.log.emit(f"❌ Lỗi: File Excel thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                self.finished.emit(None)
+                return
+
+            self.log.emit("ℹ️ Đang xử lý dữ liệu...")
+            final_grouped_ids = evaluate_rule('same_name_district_city_state', self.df, self.plan)[6]
+
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            
+            # Create a DataFrame for the final grouped IDs (single column)
+            if final_grouped_ids:
+                df_output_ids = pd.DataFrame(list(final_grouped_ids), columns=['ID'])
+                self.save_result(df_output_ids)
+                self.log_when_saved(f"✅ Đã lưu danh sách {len(final_grouped_ids)} ID nhóm theo khuyến mãi tại: {self.output_file_path}")
+            else:
+                self.log.emit("ℹ️ Không tìm thấy ID nào để nhóm theo tiêu chí (buyer_shipping_address_district, buyer_shipping_address_city, buyer_shipping_address_state, recipient_name >= 6 ID).")
+            
+            self.finished.emit(self.df)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi: {str(e)}")
+            self.finished.emit(None)
+# --- REPORT REGISTRY ---
+# Mỗi báo cáo: lớp Worker, tên hiển thị trên nút và tên file kết quả mặc định
+REPORTS = {
+    'same_promotion_phone': {'worker': Worker1, 'label': "Same Promotion + Phone Report", 'output': "du_lieu_same_promotion_phone.xlsx"},
+    'ip_create_time': {'worker': Worker3, 'label': "Same IP and Create Time Report", 'output': "same_ip_check_out.xlsx"},
+    'same_promotion_phone_district': {'worker': Worker4, 'label': "Same Promotion + Phone + District Report", 'output': "du_lieu_same_promotion_phone_district.xlsx"},
+    'rsl_item': {'worker': Worker5, 'label': "Same RSL Item Report", 'output': "same_item_amount.xlsx"},
+    'same_recipient_phone': {'worker': Worker6, 'label': "Same Recipient Phone Report", 'output': "same_recipient_phone.xlsx"},
+    'same_order_value_similar_address': {'worker': Worker7, 'label': "Same Order Value + Similar Address", 'output': "same_order_value_check_out_and_similar_address.xlsx"},
+    'tolerant_address': {'worker': Worker8, 'label': "Tolerant Address Report", 'output': "tolerant_address.xlsx"},
+    'rsl': {'worker': Worker9, 'label': "RSL Report", 'output': "rsl.xlsx"},
+    'similar_address': {'worker': Worker10, 'label': "Similar Address Report", 'output': "similiar_address_report.xlsx"},
+    'same_fsv': {'worker': Worker2, 'label': "Same FSV Report", 'output': "same_fsv.xlsx"},
+    'n3_6_9': {'worker': Worker11, 'label': "N3 Report - 6 - 9", 'output': "du_lieu_nhom_N3.xlsx"},
+    'n3_4': {'worker': Worker13, 'label': "N3 Report - 4", 'output': "du_lieu_nhom_N3_4.xlsx"},
+    'same_phone_6': {'worker': Worker12, 'label': "Same Phone -6 Report", 'output': "same_phone.xlsx"},
+    'same_name_district_city_state': {'worker': Worker18, 'label': "Same Name + District + City + State", 'output': "same_name_district_city_state.xlsx"},
+    'ip_create_time_4': {'worker': Worker15, 'label': "Same IP and Create + RegTime 4 Report", 'output': "Same IP and Create Time 4.xlsx"},
+    'ip_create_time_6': {'worker': Worker14, 'label': "Same IP and Create + RegTime 6 Report", 'output': "Same IP and Create Time 6.xlsx"},
+    'same_domain_reg_time': {'worker': Worker16, 'label': "Same Domain + Reg Time Report", 'output': "Same domain.xlsx"},
+    'same_city_state_reg_time': {'worker': Worker17, 'label': "Same City + State + Reg Time Report", 'output': "Same city district + registration time.xlsx"},
+}
+
+BATCH_MAX_PROCESSES = max(1, (os.cpu_count() or 2) - 1) # Chừa lại một nhân cho giao diện
+
+def result_output_path(destination_folder, report_key, result_format=DEFAULT_RESULT_FORMAT):
+    """Where run_report saves a report's result in destination_folder."""
+    return result_path(os.path.join(destination_folder, REPORTS[report_key]['output']), result_format)
+
+def create_worker(report_key, input_file_path, output_file_path, plan=None):
+    """Builds the worker of a report. Rule-based reports use `plan` to share passes with the reports run with them."""
+    worker_cls = REPORTS[report_key]['worker']
+    if plan is not None and (report_key in KEY_RULES or report_key in WINDOW_RULES):
+        return worker_cls(input_file_path, output_file_path, plan=plan)
+    return worker_cls(input_file_path, output_file_path)
+
+def _watch_cancel_flag(worker, cancel_flag, done):
+    """Cancels worker once the shared cancel_flag is raised, until done is set."""
+    while not done.wait(0.2):
+        if cancel_flag.value != CANCEL_NONE:
+            worker.cancel(keep_partial=cancel_flag.value == CANCEL_KEEP_PARTIAL)
+            return
+
+def run_report(report_key, input_file_path, destination_folder, plan=None, on_progress=None, on_log=None, cancel_flag=None,
+               log_detail=LOG_DETAIL_NORMAL, result_format=DEFAULT_RESULT_FORMAT, pending_results=None, trace_folder=None):
+    """
+    Runs one report synchronously in the calling thread and saves its result in destination_folder
+    under the report's default file name (with the extension of result_format).
+    The file is written by RESULT_WRITER: without pending_results the call waits for it, with a list
+    the write is appended there as (report_key, Future) and the caller can start the next report.
+
+    Args:
+        report_key (str): Khóa trong REPORTS.
+        input_file_path (str): Đường dẫn đến file Excel/CSV đầu vào.
+        destination_folder (str): Thư mục lưu file kết quả.
+        plan (ReportPlan, optional): Kế hoạch dùng chung kết quả với các báo cáo chạy cùng.
+        on_progress (callable, optional): Nhận phần trăm tiến độ (int).
+        on_log (callable, optional): Nhận từng dòng nhật ký (str).
+        cancel_flag (multiprocessing.Value, optional): Cờ hủy dùng chung (CANCEL_*), được kiểm tra mỗi 0.2 giây.
+        log_detail (int): Mức chi tiết của nhật ký (LOG_DETAIL_*).
+        result_format (str): Định dạng file kết quả (RESULT_FORMATS).
+        pending_results (list, optional): Nhận (report_key, Future) thay vì đợi ghi xong file, xem wait_for_results.
+        trace_folder (str, optional): Thư mục lưu trace JSON thời gian từng bước của báo cáo.
+
+    Returns:
+        bool: True nếu báo cáo chạy xong, False nếu lỗi, bị hủy hoặc không có dữ liệu.
+    """
+    output_file_path = os.path.join(destination_folder, REPORTS[report_key]['output'])
+    worker = create_worker(report_key, input_file_path, output_file_path, plan)
+    worker.log_detail = log_detail
+    worker.result_format = result_format
+    worker.trace_folder = trace_folder
+    if on_progress is not None:
+        worker.progress.connect(on_progress)
+    if on_log is not None:
+        worker.log.connect(on_log)
+    results = []
+    worker.finished.connect(lambda result: results.append(result is not None))
+    if cancel_flag is None:
+        worker.run()
+    else:
+        done = threading.Event()
+        threading.Thread(target=_watch_cancel_flag, args=(worker, cancel_flag, done), daemon=True).start()
+        try:
+            worker.run()
+        finally:
+            done.set()
+    success = bool(results and results[0])
+    if success and worker.pending_result is not None:
+        if pending_results is not None:
+            pending_results.append((report_key, worker.pending_result))
+        else:
+            success = worker.pending_result.exception() is None
+    return success
+
+def _init_batch_process(cache_key, df):
+    """Pool initializer: lets a child process reuse the parent's parsed input instead of reading the file again."""
+    DATASET_CACHE.seed(cache_key, df)
+
+def _run_reports_process(report_keys, input_file_path, destination_folder, event_queue, cancel_flag, log_detail,
+                         result_format, trace_folder=None):
+    """
+    Runs a group of reports sharing one ReportPlan synchronously inside a pool process and
+    forwards their log and progress to the parent through event_queue.
+    Reports left when cancel_flag is raised are skipped. Result files are written in the background
+    while the next report runs and are all waited for before returning.
+    Returns a list of (report_key, success).
+    """
+    plan = ReportPlan(report_keys)
+    outcomes = []
+    pending_results = []
+    for report_key in report_keys:
+        if cancel_flag.value != CANCEL_NONE:
+            outcomes.append((report_key, False))
+            continue
+        last_progress = [-1]
+
+        def forward_progress(value, report_key=report_key, last_progress=last_progress):
+            # Only forward changes, workers emit once per group
+            if value != last_progress[0]:
+                last_progress[0] = value
+                event_queue.put((report_key, 'progress', value))
+
+        success = run_report(report_key, input_file_path, destination_folder, plan=plan, on_progress=forward_progress,
+                             on_log=lambda message, report_key=report_key: event_queue.put((report_key, 'log', message)),
+                             cancel_flag=cancel_flag, log_detail=log_detail, result_format=result_format,
+                             pending_results=pending_results, trace_folder=trace_folder)
+        outcomes.append((report_key, success))
+    failed_writes = wait_for_results(pending_results)
+    return [(report_key, success and report_key not in failed_writes) for report_key, success in outcomes]
+
+@contextlib.contextmanager
+def _results_staging(destination_folder, result_format, consolidated):
+    """
+    (folder, format) the reports of a batch save to: destination_folder itself, or for a consolidated
+    run a hidden folder inside it, removed with everything in it once the workbook is written.
+    """
+    if not consolidated:
+        yield destination_folder, result_format
+        return
+    staging_folder = tempfile.mkdtemp(prefix='.bae_', dir=destination_folder)
+    try:
+        yield staging_folder, CONSOLIDATED_STAGING_FORMAT
+    finally:
+        shutil.rmtree(staging_folder, ignore_errors=True)
+
+class BatchWorker(object):
+    """
+    Chạy nhiều báo cáo trên cùng một file đầu vào.
+    Dữ liệu chỉ được đọc một lần, sau đó các báo cáo được chạy song song trong một process pool
+    và mỗi kết quả được lưu vào thư mục đích với tên file mặc định của báo cáo.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    report_progress = Signal(str, int) # report_key, percentage
+    report_finished = Signal(str, bool) # report_key, success
+    finished = Signal(object)
+
+    def __init__(self, input_file_path, destination_folder, report_keys, max_processes=BATCH_MAX_PROCESSES,
+                 log_detail=LOG_DETAIL_NORMAL, result_format=DEFAULT_RESULT_FORMAT, consolidated=False, trace=False):
+        """
+        Args:
+            input_file_path (str): Đường dẫn đến file Excel/CSV đầu vào.
+            destination_folder (str): Thư mục lưu các file kết quả.
+            report_keys (list[str]): Các khóa trong REPORTS cần chạy.
+            max_processes (int): Số process chạy song song tối đa.
+            log_detail (int): Mức chi tiết nhật ký của các báo cáo (LOG_DETAIL_*).
+            result_format (str): Định dạng các file kết quả (RESULT_FORMATS).
+            consolidated (bool): Lưu tất cả vào một file CONSOLIDATED_FILE_NAME thay vì mỗi báo cáo một file.
+            trace (bool): Lưu trace JSON thời gian từng bước của mỗi báo cáo vào thư mục đích.
+        """
+        super().__init__()
+        self.input_file_path = input_file_path
+        self.destination_folder = destination_folder
+        self.report_keys = list(report_keys)
+        self.max_processes = max_processes
+        self.log_detail = log_detail
+        self.result_format = result_format
+        self.consolidated = consolidated
+        self.trace = trace
+        self._cancel_request = CANCEL_NONE
+
+    def cancel(self, keep_partial=False):
+        """
+        Yêu cầu dừng: các báo cáo đang chạy dừng ở lần kiểm tra kế tiếp, các báo cáo chưa chạy bị bỏ qua.
+        Args:
+            keep_partial (bool): Lưu các ID đã tìm được của các báo cáo đang chạy.
+        """
+        self._cancel_request = CANCEL_KEEP_PARTIAL if keep_partial else CANCEL_DISCARD
+
+    def _forward_cancel(self, cancel_flag, pending):
+        """Passes a cancel request to the pool processes once and drops the groups not started yet."""
+        if self._cancel_request != CANCEL_NONE and cancel_flag.value == CANCEL_NONE:
+            self.log.emit("⚠️ Đang hủy...")
+            cancel_flag.value = self._cancel_request
+            for future in pending:
+                future.cancel()
+
+    def run(self):
+        try:
+            # Only the columns needed by the selected reports are read
+            columns = list(dict.fromkeys(col for key in self.report_keys for col in REPORTS[key]['worker'].INPUT_COLUMNS))
+            df = read_and_map_data(self.input_file_path, self.log, columns)
+            if df is None or self._cancel_request != CANCEL_NONE:
+                if df is not None:
+                    self.log.emit("⚠️ Đã hủy báo cáo.")
+                self.finished.emit(None)
+                return
+            cache_key = DATASET_CACHE.make_key(self.input_file_path)
+            # Children read the Parquet sidecar when it holds these columns, otherwise they get the frame pickled once each
+            header = _sidecar_header(cache_key[3])
+            has_sidecar = header is not None and all(
+                os.path.exists(_sidecar_column_path(cache_key[3], header, col)) for col in columns if col in header)
+            seed_df = None if has_sidecar else df
+
+            # Reports sharing a rule pass run in the same process so the pass is computed once
+            groups = ReportPlan(self.report_keys).groups(self.report_keys)
+            for group in groups:
+                if len(group) > 1:
+                    self.log.emit(f"🔗 Dùng chung một lượt tính cho: {', '.join(REPORTS[key]['label'] for key in group)}")
+            processes = min(self.max_processes, len(groups))
+            self.log.emit(f"🚀 Chạy song song {len(self.report_keys)} báo cáo trên {processes} process...")
+            report_progress = {key: 0 for key in self.report_keys}
+            succeeded = []
+            ctx = multiprocessing.get_context('spawn')
+            with _results_staging(self.destination_folder, self.result_format, self.consolidated) as (results_folder, result_format), \
+                    ctx.Manager() as manager:
+                event_queue = manager.Queue()
+                cancel_flag = manager.Value('i', CANCEL_NONE)
+                with ProcessPoolExecutor(max_workers=processes, mp_context=ctx,
+                                         initializer=_init_batch_process, initargs=(cache_key, seed_df)) as pool:
+                    futures = {
+                        pool.submit(_run_reports_process, group, self.input_file_path, results_folder, event_queue,
+                                    cancel_flag, self.log_detail, result_format,
+                                    self.destination_folder if self.trace else None): group
+                        for group in groups
+                    }
+                    pending = set(futures)
+                    while pending:
+                        self._forward_cancel(cancel_flag, pending)
+                        self._drain_events(event_queue, report_progress)
+                        for future in [f for f in pending if f.done()]:
+                            pending.discard(future)
+                            group = futures[future]
+                            try:
+                                outcomes = [(key, False) for key in group] if future.cancelled() else future.result()
+                            except Exception as e:
+                                outcomes = [(key, False) for key in group]
+                                self.log.emit(f"❌ [{', '.join(REPORTS[key]['label'] for key in group)}] Đã xảy ra lỗi: {e}")
+                            self._drain_events(event_queue, report_progress)
+                            for key, success in outcomes:
+                                report_progress[key] = 100
+                                self.report_finished.emit(key, success)
+                                if success:
+                                    succeeded.append(key)
+                            self.progress.emit(int(sum(report_progress.values()) / len(report_progress)))
+                if self.consolidated:
+                    self._write_consolidated(results_folder, [key for key in self.report_keys if key in succeeded])
+
+            if self._cancel_request != CANCEL_NONE:
+                self.log.emit(f"⚠️ Đã hủy, hoàn thành {len(succeeded)}/{len(self.report_keys)} báo cáo.")
+            else:
+                self.log.emit(f"✅ Hoàn thành {len(succeeded)}/{len(self.report_keys)} báo cáo. Kết quả được lưu tại: {self.destination_folder}")
+            self.finished.emit(succeeded if succeeded else None)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi khi chạy nhiều báo cáo: {e}")
+            self.finished.emit(None)
+
+    def _write_consolidated(self, results_folder, report_keys):
+        """Gathers the reports written to the staging folder into CONSOLIDATED_FILE_NAME."""
+        self.log.emit("ℹ️ Đang ghi file tổng hợp...")
+        consolidated_path = os.path.join(self.destination_folder, CONSOLIDATED_FILE_NAME)
+        id_count = consolidate_results(results_folder, report_keys, consolidated_path)
+        if id_count:
+            self.log.emit(f"✅ Đã lưu {id_count} ID của {len(report_keys)} báo cáo vào một file tại: {consolidated_path}")
+        else:
+            self.log.emit("ℹ️ Không báo cáo nào tìm thấy ID, không tạo file tổng hợp.")
+
+    def _drain_events(self, event_queue, report_progress):
+        """Forwards queued child events to the UI, waiting briefly for the first one."""
+        timeout = 0.1
+        while True:
+            try:
+                key, kind, payload = event_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+            timeout = 0
+            if kind == 'log':
+                self.log.emit(f"[{REPORTS[key]['label']}] {payload}")
+            elif kind == 'progress':
+                report_progress[key] = payload
+                self.report_progress.emit(key, payload)
+                self.progress.emit(int(sum(report_progress.values()) / len(report_progress)))
+
+
+# --- CONSOLIDATED WORKBOOK ---
+# Một file .xlsx cho cả lượt chạy: sheet tổng hợp ID -> các báo cáo, sau đó mỗi báo cáo một sheet
+CONSOLIDATED_FILE_NAME = "du_lieu_tong_hop.xlsx"
+CONSOLIDATED_SUMMARY_SHEET = "Tổng hợp"
+# The reports write here first, in a hidden folder next to the workbook removed afterwards
+CONSOLIDATED_STAGING_FORMAT = 'parquet' if HAS_PYARROW else 'xlsx'
+EXCEL_SHEET_NAME_MAX = 31
+
+def _sheet_names(report_keys):
+    """Unique Excel sheet name per report: its label without the characters Excel rejects, cut to 31 characters."""
+    names = {}
+    taken = {CONSOLIDATED_SUMMARY_SHEET.lower()}
+    for report_key in report_keys:
+        label = re.sub(r'[\\/*?:\[\]]', ' ', REPORTS[report_key]['label'])
+        name = label[:EXCEL_SHEET_NAME_MAX].strip()
+        suffix = 2
+        while name.lower() in taken: # Excel compares sheet names case-insensitively
+            name = f"{label[:EXCEL_SHEET_NAME_MAX - 4].strip()} ({suffix})"
+            suffix += 1
+        taken.add(name.lower())
+        names[report_key] = name
+    return names
+
+def consolidate_results(results_folder, report_keys, output_file_path):
+    """
+    Gộp kết quả các báo cáo (đã được lưu trong results_folder theo CONSOLIDATED_STAGING_FORMAT) vào một workbook:
+    sheet CONSOLIDATED_SUMMARY_SHEET liệt kê từng ID và các báo cáo đã gắn cờ ID đó, sau đó mỗi báo cáo một sheet.
+    Workbook được ghi một lần, theo từng dòng (xem write_workbook).
+    Args:
+        results_folder (str): Thư mục chứa kết quả của các báo cáo.
+        report_keys (list[str]): Các báo cáo, theo thứ tự sheet.
+        output_file_path (str): Đường dẫn file .xlsx tổng hợp.
+    Returns:
+        int: Số ID khác nhau trong workbook, 0 nếu không báo cáo nào có kết quả (khi đó không ghi file).
+    """
+    sheet_names = _sheet_names(report_keys)
+    flagged_by = {} # ID -> các báo cáo gắn cờ, theo thứ tự của report_keys
+    sheets = []
+    for report_key in report_keys:
+        path = result_output_path(results_folder, report_key, CONSOLIDATED_STAGING_FORMAT)
+        if not os.path.exists(path):
+            continue
+        df = read_result(path)
+        sheets.append((sheet_names[report_key], df))
+        # 955.0 in one report and 955 in another are the same buyer
+        ids = _state_values(pd.Series(df.to_numpy().ravel(), dtype=object).dropna())
+        for buyer_id in dict.fromkeys(ids):
+            flagged_by.setdefault(buyer_id, []).append(REPORTS[report_key]['label'])
+    if not sheets:
+        return 0
+    summary = pd.DataFrame({
+        'ID': list(flagged_by),
+        'Số báo cáo': [len(labels) for labels in flagged_by.values()],
+        'Báo cáo': [', '.join(labels) for labels in flagged_by.values()],
+    }).sort_values('Số báo cáo', ascending=False, kind='stable')
+    write_workbook([(CONSOLIDATED_SUMMARY_SHEET, summary)] + sheets, output_file_path)
+    return len(flagged_by)
+
+
+# --- FOLDER BATCH ---
+INPUT_EXTENSIONS = ('.xlsx', '.xls', '.csv')
+BATCH_SUMMARY_FILE_NAME = "batch_summary.xlsx"
+
+def is_folder_source(source):
+    """True when source names several inputs (a directory or a glob pattern) rather than one file."""
+    return os.path.isdir(source) or any(ch in source for ch in '*?[')
+
+def find_input_files(source):
+    """Input files of a directory (not recursive) or a glob pattern, sorted, skipping Excel lock files (~$...)."""
+    pattern = os.path.join(source, '*') if os.path.isdir(source) else source
+    return sorted(path for path in glob.glob(pattern)
+                  if os.path.isfile(path) and path.lower().endswith(INPUT_EXTENSIONS)
+                  and not os.path.basename(path).startswith('~$'))
+
+def _count_output_ids(output_file_path):
+    """Number of distinct IDs in a report's result file, 0 when the report wrote none."""
+    if not os.path.exists(output_file_path):
+        return 0
+    values = pd.unique(read_result(output_file_path).to_numpy().ravel())
+    return int(pd.notna(values).sum())
+
+def _output_folder_names(input_files):
+    """Result subfolder per input file: its name without extension, plus the extension when two files share a name."""
+    stems = [os.path.splitext(os.path.basename(path))[0] for path in input_files]
+    return {
+        path: stem if stems.count(stem) == 1 else os.path.basename(path).replace('.', '_')
+        for path, stem in zip(input_files, stems)
+    }
+
+def _run_file_process(input_file_path, report_keys, output_folder, event_queue, cancel_flag, log_detail, result_format,
+                      consolidated, trace=False):
+    """
+    Runs the selected reports on one input file inside a folder batch pool process and saves
+    the results in output_folder, or in one CONSOLIDATED_FILE_NAME there when consolidated.
+    With trace the JSON traces of the reports are saved in output_folder as well.
+    Reports sharing a rule pass compute it once, reports left when cancel_flag is raised are skipped.
+    The file's data is dropped from the cache afterwards, so a process holds one file at a time.
+    Returns a list of (report_key, success, ID count).
+    """
+    file_name = os.path.basename(input_file_path)
+    os.makedirs(output_folder, exist_ok=True)
+    with _results_staging(output_folder, result_format, consolidated) as (results_folder, result_format):
+        outcomes = []
+        pending_results = []
+        try:
+            for group in ReportPlan(report_keys).groups(report_keys):
+                plan = ReportPlan(group)
+                for report_key in group:
+                    label = REPORTS[report_key]['label']
+                    success = cancel_flag.value == CANCEL_NONE and run_report(
+                        report_key, input_file_path, results_folder, plan=plan, cancel_flag=cancel_flag, log_detail=log_detail,
+                        on_log=lambda message, label=label: event_queue.put((file_name, 'log', f"[{label}] {message}")),
+                        result_format=result_format, pending_results=pending_results,
+                        trace_folder=output_folder if trace else None)
+                    outcomes.append((report_key, success))
+                    event_queue.put((file_name, 'progress', int(len(outcomes) * 100 / len(report_keys))))
+        finally:
+            DATASET_CACHE.clear()
+        # ID counts read the result files back, once they are all written
+        failed_writes = wait_for_results(pending_results)
+        outcomes = [
+            (report_key, success and report_key not in failed_writes,
+             _count_output_ids(result_output_path(results_folder, report_key, result_format))
+             if success and report_key not in failed_writes else 0)
+            for report_key, success in outcomes
+        ]
+        if consolidated:
+            succeeded = {report_key for report_key, success, _ in outcomes if success}
+            consolidate_results(results_folder, [key for key in report_keys if key in succeeded],
+                                os.path.join(output_folder, CONSOLIDATED_FILE_NAME))
+    return outcomes
+
+class FolderBatchWorker(object):
+    """
+    Chạy các báo cáo đã chọn trên nhiều file đầu vào độc lập (một thư mục hoặc một mẫu glob).
+    Mỗi file được xử lý trọn vẹn trong một process của pool, nên số process cũng là số file tối đa
+    nằm trong bộ nhớ cùng lúc. Kết quả của từng file nằm trong thư mục con cùng tên và một file tổng hợp
+    (BATCH_SUMMARY_FILE_NAME) liệt kê kết quả của mọi file và báo cáo.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    file_finished = Signal(str, bool) # file name, all reports succeeded
+    finished = Signal(object)
+
+    def __init__(self, source, destination_folder, report_keys, max_processes=BATCH_MAX_PROCESSES,
+                 log_detail=LOG_DETAIL_NORMAL, result_format=DEFAULT_RESULT_FORMAT, consolidated=False, trace=False):
+        """
+        Args:
+            source (str): Thư mục chứa các file Excel/CSV hoặc mẫu glob (vd. 'exports/*.csv').
+            destination_folder (str): Thư mục lưu kết quả.
+            report_keys (list[str]): Các khóa trong REPORTS cần chạy trên mỗi file.
+            max_processes (int): Số process (cũng là số file được đọc vào bộ nhớ) tối đa cùng lúc.
+            log_detail (int): Mức chi tiết nhật ký của các báo cáo (LOG_DETAIL_*).
+            result_format (str): Định dạng các file kết quả (RESULT_FORMATS).
+            consolidated (bool): Mỗi file đầu vào có một file CONSOLIDATED_FILE_NAME thay vì mỗi báo cáo một file.
+            trace (bool): Lưu trace JSON thời gian từng bước của mỗi báo cáo vào thư mục con của từng file.
+        """
+        super().__init__()
+        self.source = source
+        self.destination_folder = destination_folder
+        self.report_keys = list(report_keys)
+        self.max_processes = max_processes
+        self.log_detail = log_detail
+        self.result_format = result_format
+        self.consolidated = consolidated
+        self.trace = trace
+        self._cancel_request = CANCEL_NONE
+
+    cancel = BatchWorker.cancel
+    _forward_cancel = BatchWorker._forward_cancel
+
+    def run(self):
+        try:
+            input_files = find_input_files(self.source)
+            if not input_files:
+                self.log.emit(f"❌ Lỗi: Không tìm thấy file Excel/CSV nào tại: {self.source}")
+                self.finished.emit(None)
+                return
+            processes = min(self.max_processes, len(input_files))
+            self.log.emit(f"🚀 Chạy {len(self.report_keys)} báo cáo trên {len(input_files)} file, {processes} file song song...")
+            folder_names = _output_folder_names(input_files)
+            file_progress = {os.path.basename(path): 0 for path in input_files}
+            summary_rows = []
+            ctx = multiprocessing.get_context('spawn')
+            with ctx.Manager() as manager:
+                event_queue = manager.Queue()
+                cancel_flag = manager.Value('i', CANCEL_NONE)
+                with ProcessPoolExecutor(max_workers=processes, mp_context=ctx) as pool:
+                    futures = {
+                        pool.submit(_run_file_process, path, self.report_keys,
+                                    os.path.join(self.destination_folder, folder_names[path]), event_queue, cancel_flag,
+                                    self.log_detail, self.result_format, self.consolidated, self.trace): path
+                        for path in input_files
+                    }
+                    pending = set(futures)
+                    while pending:
+                        self._forward_cancel(cancel_flag, pending)
+                        self._drain_events(event_queue, file_progress)
+                        for future in [f for f in pending if f.done()]:
+                            pending.discard(future)
+                            input_file_path = futures[future]
+                            file_name = os.path.basename(input_file_path)
+                            try:
+                                outcomes = [(key, False, 0) for key in self.report_keys] if future.cancelled() else future.result()
+                            except Exception as e:
+                                outcomes = [(key, False, 0) for key in self.report_keys]
+                                self.log.emit(f"❌ [{file_name}] Đã xảy ra lỗi: {e}")
+                            self._drain_events(event_queue, file_progress)
+                            summary_rows.extend(
+                                {'File': file_name, 'Báo cáo': REPORTS[key]['label'], 'Thành công': success, 'Số ID': id_count,
+                                 'File kết quả': self._result_file(folder_names[input_file_path], key) if id_count else ''}
+                                for key, success, id_count in outcomes)
+                            file_progress[file_name] = 100
+                            all_succeeded = all(success for _, success, _ in outcomes)
+                            self.file_finished.emit(file_name, all_succeeded)
+                            self.log.emit(f"{'✅' if all_succeeded else '⚠️'} [{file_name}] Xong {sum(s for _, s, _ in outcomes)}/{len(outcomes)} báo cáo.")
+                            self.progress.emit(int(sum(file_progress.values()) / len(file_progress)))
+
+            summary_path = os.path.join(self.destination_folder, BATCH_SUMMARY_FILE_NAME)
+            pd.DataFrame(summary_rows).sort_values(['File', 'Báo cáo']).to_excel(summary_path, index=False, engine='openpyxl')
+            if self._cancel_request != CANCEL_NONE:
+                self.log.emit(f"⚠️ Đã hủy. File tổng hợp: {summary_path}")
+            else:
+                self.log.emit(f"✅ Hoàn thành {len(input_files)} file. File tổng hợp: {summary_path}")
+            self.finished.emit(summary_path)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi khi chạy nhiều file: {e}")
+            self.finished.emit(None)
+
+    def _result_file(self, folder_name, report_key):
+        """Result file of a report for the summary, relative to destination_folder."""
+        if self.consolidated:
+            return os.path.join(folder_name, CONSOLIDATED_FILE_NAME)
+        return result_output_path(folder_name, report_key, self.result_format)
+
+    def _drain_events(self, event_queue, file_progress):
+        """Forwards queued child events, waiting briefly for the first one."""
+        timeout = 0.1
+        while True:
+            try:
+                file_name, kind, payload = event_queue.get(timeout=timeout)
+            except queue.Empty:
+                return
+            timeout = 0
+            if kind == 'log':
+                self.log.emit(f"[{file_name}] {payload}")
+            elif kind == 'progress':
+                file_progress[file_name] = payload
+                self.progress.emit(int(sum(file_progress.values()) / len(file_progress)))
+
+
+# --- INCREMENTAL DETECTION ---
+# Reports updated day by day from the new orders only ("same phone", "same IP within 1 hour", N3).
+# Their rows are filtered by ROW_FILTERS like a full run. "Fixed start time" rules (skip_on_hit)
+# depend on where the scan starts and are always recomputed on the whole file.
+INCREMENTAL_REPORTS = ['same_promotion_phone', 'same_recipient_phone', 'same_phone_6', 'ip_create_time', 'n3_6_9', 'n3_4']
+INCREMENTAL_INPUT_COLUMNS = list(dict.fromkeys(
+    ['order_id', 'buyer_id'] + [column for key in INCREMENTAL_REPORTS
+                                for column in _report_rule(key)['keys'] + [_report_rule(key).get('time_col')] if column]
+))
+INCREMENTAL_RULES_HASH = hashlib.sha1(repr((
+    INCREMENTAL_STATE_VERSION, [(key, _report_rule(key)) for key in INCREMENTAL_REPORTS],
+)).encode('utf-8')).hexdigest()
+
+
+def _state_values(series, digits_as_int=False):
+    """
+    Python scalars for SQLite: missing -> None, integral floats -> int so 123.0 and 123 are one key/ID.
+    With digits_as_int=True digit-only strings become int as well: a daily export whose column has no
+    text value is parsed as numbers and loses its leading zeros ('090108' -> 90108).
+    """
+    values = [value.item() if isinstance(value, np.generic) else value
+              for value in series.astype(object).where(series.notna(), None).tolist()]
+    return [int(value) if (isinstance(value, float) and value.is_integer())
+            or (digits_as_int and isinstance(value, str) and value.isascii() and value.isdigit()) else value
+            for value in values]
+
+
+def _state_keys(df, keys):
+    """One JSON text per row for the combination of `keys`, None if any key is missing."""
+    columns = [_state_values(df[key], digits_as_int=True) for key in keys]
+    return [None if None in values else json.dumps(values, ensure_ascii=False) for values in zip(*columns)]
+
+
+class DetectionState:
+    """
+    On-disk state (SQLite) of the incremental reports, so a daily run only processes the orders it
+    has not seen yet instead of the whole overlapping multi-day export.
+
+    Kept per rule pass (reports sharing keys, window and rows share their state):
+      - orders: order_id of every ingested order, new files are deduplicated against it.
+      - key_ids: distinct buyers per key ("same phone" rules).
+      - events: (key, time, buyer) of recent orders ("N IDs within 1 hour" rules), older than
+        `retention` before the latest order are dropped.
+      - flagged: IDs that reached each threshold so far.
+    Adding orders can only raise distinct counts, so flagged IDs are never removed: only keys touched
+    by the new orders are recounted and, for window rules, only their events within one window of
+    the new times. Orders without buyer_id are never flagged.
+    The state is cleared when INCREMENTAL_RULES_HASH changes.
+    """
+    LOOKUP_CHUNK = 500 # Số tham số mỗi câu SELECT (giới hạn biến của SQLite)
+
+    def __init__(self, path=INCREMENTAL_STATE_PATH, retention=INCREMENTAL_WINDOW_RETENTION):
+        self.path = path
+        self.retention = retention
+
+    def _connect(self, log_emitter=None):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        connection.execute("CREATE TABLE IF NOT EXISTS orders (order_id PRIMARY KEY)")
+        connection.execute("CREATE TABLE IF NOT EXISTS key_ids (pass TEXT NOT NULL, key TEXT NOT NULL, buyer NOT NULL, "
+                           "UNIQUE (pass, key, buyer))")
+        connection.execute("CREATE TABLE IF NOT EXISTS events (pass TEXT NOT NULL, key TEXT NOT NULL, time INTEGER NOT NULL, buyer)")
+        connection.execute("CREATE INDEX IF NOT EXISTS events_key_time ON events (pass, key, time)")
+        connection.execute("CREATE TABLE IF NOT EXISTS flagged (pass TEXT NOT NULL, threshold INTEGER NOT NULL, buyer NOT NULL, "
+                           "UNIQUE (pass, threshold, buyer))")
+        connection.execute("CREATE TEMP TABLE touched (key TEXT PRIMARY KEY, lo INTEGER, hi INTEGER)")
+        row = connection.execute("SELECT value FROM meta WHERE key = 'rules'").fetchone()
+        if row is None or row[0] != INCREMENTAL_RULES_HASH:
+            if row is not None and log_emitter is not None:
+                log_emitter.emit("⚠️ Quy tắc báo cáo đã thay đổi, trạng thái cũ bị xóa. Hãy chạy lại toàn bộ (--full) với các file trước đó.")
+            self._clear(connection)
+            with connection:
+                connection.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rules', ?)", (INCREMENTAL_RULES_HASH,))
+        return connection
+
+    @staticmethod
+    def _clear(connection):
+        with connection:
+            for table in ('orders', 'key_ids', 'events', 'flagged'):
+                connection.execute(f"DELETE FROM {table}")
+
+    def reset(self):
+        """Drops every ingested order, for a full recomputation."""
+        connection = self._connect()
+        try:
+            self._clear(connection)
+        finally:
+            connection.close()
+
+    def ingest(self, df, log_emitter=None):
+        """
+        Adds the orders of df not seen before and updates the flagged IDs. Returns the number of new orders.
+
+        Args:
+            df (pd.DataFrame): Dữ liệu đã ánh xạ, có đủ các cột INCREMENTAL_INPUT_COLUMNS.
+            log_emitter (Signal, optional): Tín hiệu ghi log.
+        """
+        connection = self._connect(log_emitter)
+        try:
+            with connection:
+                order_ids = pd.Series(_state_values(df['order_id'], digits_as_int=True), index=df.index, dtype=object)
+                df = df[order_ids.notna() & ~order_ids.duplicated()]
+                order_ids = order_ids[df.index]
+                unique_ids = order_ids.tolist()
+                known = set()
+                for start in range(0, len(unique_ids), self.LOOKUP_CHUNK):
+                    chunk = unique_ids[start:start + self.LOOKUP_CHUNK]
+                    known.update(row[0] for row in connection.execute(
+                        f"SELECT order_id FROM orders WHERE order_id IN ({','.join('?' * len(chunk))})", chunk))
+                new_orders = df[~order_ids.isin(known)]
+                connection.executemany("INSERT INTO orders (order_id) VALUES (?)",
+                                       [(order_id,) for order_id in order_ids[new_orders.index]])
+                if log_emitter is not None:
+                    log_emitter.emit(f"ℹ️ {len(new_orders)} đơn mới, bỏ qua {len(df) - len(new_orders)} đơn đã xử lý.")
+                if len(new_orders) == 0:
+                    return 0
+
+                flagged_before = connection.execute("SELECT COUNT(DISTINCT buyer) FROM flagged").fetchone()[0]
+                passes = {}
+                for key in INCREMENTAL_REPORTS:
+                    passes.setdefault(_rule_pass_key(key), []).append(key)
+                for pass_key, report_keys in passes.items():
+                    thresholds = sorted({t for key in report_keys for t in _report_rule(key)['thresholds']})
+                    rule = _report_rule(report_keys[0])
+                    rows = rule_rows(report_keys[0], new_orders)
+                    if report_keys[0] in KEY_RULES:
+                        ids = self._update_keys(connection, repr(pass_key), rule, rows, thresholds)
+                    else:
+                        ids = self._update_windows(connection, repr(pass_key), rule, rows, thresholds)
+                    connection.executemany("INSERT OR IGNORE INTO flagged (pass, threshold, buyer) VALUES (?, ?, ?)",
+                                           [(repr(pass_key), threshold, buyer)
+                                            for threshold in thresholds for buyer in ids[threshold]])
+                if log_emitter is not None:
+                    flagged_after = connection.execute("SELECT COUNT(DISTINCT buyer) FROM flagged").fetchone()[0]
+                    log_emitter.emit(f"✅ Đã cập nhật trạng thái, {flagged_after - flagged_before} ID mới bị gắn cờ.")
+                return len(new_orders)
+        finally:
+            connection.close()
+
+    @staticmethod
+    def _touched_rows(connection, sql, pass_name, touched):
+        """Runs sql joined with the touched keys (key, lo, hi) and returns its rows."""
+        connection.execute("DELETE FROM touched")
+        connection.executemany("INSERT INTO touched (key, lo, hi) VALUES (?, ?, ?)", touched)
+        return connection.execute(sql, (pass_name,)).fetchall()
+
+    def _update_keys(self, connection, pass_name, rule, rows, thresholds):
+        """Adds (key, buyer) pairs and recounts the distinct buyers of the touched keys only."""
+        pairs = pd.DataFrame({'key': _state_keys(rows, rule['keys']), 'buyer': _state_values(rows['buyer_id'])},
+                             dtype=object).dropna().drop_duplicates()
+        connection.executemany("INSERT OR IGNORE INTO key_ids (pass, key, buyer) VALUES (?, ?, ?)",
+                               [(pass_name, key, buyer) for key, buyer in pairs.itertuples(index=False)])
+        members = pd.DataFrame(self._touched_rows(
+            connection, "SELECT k.key, k.buyer FROM key_ids k JOIN touched t ON k.pass = ? AND k.key = t.key",
+            pass_name, [(key, None, None) for key in pairs['key'].unique()]), columns=['key', 'buyer'], dtype=object)
+        counts = members.groupby('key')['buyer'].transform('size') if len(members) else pd.Series(dtype=np.int64)
+        return {threshold: set(members['buyer'][counts >= threshold]) for threshold in thresholds}
+
+    def _update_windows(self, connection, pass_name, rule, rows, thresholds):
+        """
+        Adds the events of the new orders and recomputes the windows they can change: a window
+        opened at time s holds the new time t iff t - window <= s <= t, and reads events up to s + window,
+        so the events of each touched key between its first new time - window and last new time + window
+        are enough.
+        """
+        window = pd.Timedelta(hours=1).value
+        rows = rows.dropna(subset=[rule['time_col']])
+        events = pd.DataFrame({
+            'key': pd.Series(_state_keys(rows, rule['keys']), index=rows.index, dtype=object),
+            'time': rows[rule['time_col']].to_numpy(dtype='datetime64[ns]').view(np.int64),
+            'buyer': pd.Series(_state_values(rows['buyer_id']), index=rows.index, dtype=object),
+        }).dropna(subset=['key'])
+        result = {threshold: set() for threshold in thresholds}
+        if events.empty:
+            return result
+        connection.executemany("INSERT INTO events (pass, key, time, buyer) VALUES (?, ?, ?, ?)",
+                               [(pass_name, key, int(time), buyer) for key, time, buyer in events.itertuples(index=False)])
+        ranges = events.groupby('key')['time'].agg(['min', 'max'])
+        neighbourhood = pd.DataFrame(self._touched_rows(
+            connection, "SELECT e.key, e.time, e.buyer FROM events e JOIN touched t "
+                        "ON e.pass = ? AND e.key = t.key AND e.time BETWEEN t.lo AND t.hi",
+            pass_name, [(key, int(lo) - window, int(hi) + window) for key, lo, hi in ranges.itertuples()]),
+            columns=['key', 'time', 'buyer_id'])
+        neighbourhood['time'] = pd.to_datetime(neighbourhood['time'], unit='ns')
+        # Missing buyers are rebuilt as NaN (numeric IDs) or None, so they count like in a full run
+        neighbourhood['buyer_id'] = pd.Series(neighbourhood['buyer_id'].tolist())
+        ids = find_ids_in_time_windows(neighbourhood, ['key'], 'time', thresholds)
+
+        if self.retention is not None:
+            latest = connection.execute("SELECT MAX(time) FROM events WHERE pass = ?", (pass_name,)).fetchone()[0]
+            connection.execute("DELETE FROM events WHERE pass = ? AND time < ?",
+                               (pass_name, latest - pd.Timedelta(self.retention).value))
+        return {threshold: set(_state_values(pd.Series(list(ids[threshold]), dtype=object))) - {None}
+                for threshold in thresholds}
+
+    def results(self, report_keys):
+        """Returns report_key -> {threshold: set of flagged IDs} for the INCREMENTAL_REPORTS in report_keys."""
+        connection = self._connect()
+        try:
+            results = {}
+            for key in report_keys:
+                rows = connection.execute("SELECT threshold, buyer FROM flagged WHERE pass = ?", (repr(_rule_pass_key(key)),))
+                flagged = {threshold: set() for threshold in _report_rule(key)['thresholds']}
+                for threshold, buyer in rows:
+                    if threshold in flagged:
+                        flagged[threshold].add(buyer)
+                results[key] = flagged
+            return results
+        finally:
+            connection.close()
+
+
+class IncrementalWorker(object):
+    """
+    Lớp cập nhật các báo cáo INCREMENTAL_REPORTS từ các đơn hàng mới của file đầu vào (bỏ qua các
+    order_id đã xử lý ở lần chạy trước) và lưu toàn bộ ID bị gắn cờ đến nay, mỗi ngưỡng một cột.
+    Với full=True trạng thái bị xóa và tính lại từ đầu trên tất cả các file, dùng để đối chiếu.
+    """
+    progress = ThrottledSignal(int)
+    log = Signal(str)
+    finished = Signal(object) # report_key -> {threshold: set}, None on error
+
+    def __init__(self, input_file_paths, destination_folder, report_keys=None, state_path=INCREMENTAL_STATE_PATH, full=False,
+                 result_format=DEFAULT_RESULT_FORMAT):
+        """
+        Args:
+            input_file_paths (list[str]): Các file Excel/CSV đầu vào, theo thứ tự thời gian.
+            destination_folder (str): Thư mục lưu kết quả.
+            report_keys (list[str], optional): Các báo cáo cần lưu, mặc định tất cả INCREMENTAL_REPORTS.
+            state_path (str): File SQLite lưu trạng thái giữa các lần chạy.
+            full (bool): Xóa trạng thái và tính lại toàn bộ.
+            result_format (str): Định dạng các file kết quả (RESULT_FORMATS).
+        """
+        super().__init__()
+        self.input_file_paths = list(input_file_paths)
+        self.destination_folder = destination_folder
+        self.report_keys = list(report_keys) if report_keys else list(INCREMENTAL_REPORTS)
+        self.state = DetectionState(state_path)
+        self.full = full
+        self.result_format = result_format
+
+    def run(self):
+        try:
+            frames = []
+            for input_file_path in self.input_file_paths:
+                df = read_and_map_data(input_file_path, self.log, INCREMENTAL_INPUT_COLUMNS)
+                if df is None:
+                    self.finished.emit(None)
+                    return
+                missing_cols = [col for col in INCREMENTAL_INPUT_COLUMNS if col not in df.columns]
+                if missing_cols:
+                    self.log.emit(f"❌ Lỗi: File {os.path.basename(input_file_path)} thiếu các cột bắt buộc: {', '.join(missing_cols)}")
+                    self.finished.emit(None)
+                    return
+                frames.append(df[INCREMENTAL_INPUT_COLUMNS])
+
+            if self.full:
+                self.log.emit("♻️ Tính lại toàn bộ, trạng thái cũ bị xóa.")
+                self.state.reset()
+                self.state.ingest(pd.concat(frames, ignore_index=True), self.log)
+            else:
+                for index, df in enumerate(frames):
+                    self.log.emit(f"ℹ️ Đang cập nhật từ {os.path.basename(self.input_file_paths[index])}...")
+                    self.state.ingest(df, self.log)
+                    self.progress.emit(int((index + 1) * 90 / len(frames)))
+
+            results = self.state.results(self.report_keys)
+            self.log.emit("ℹ️ Đang lưu kết quả...")
+            for key, flagged in results.items():
+                columns = [pd.Series(sorted(flagged[threshold], key=str), name=f"ID >={threshold}", dtype=object)
+                           for threshold in _report_rule(key)['thresholds'] if flagged[threshold]]
+                output_file_path = result_output_path(self.destination_folder, key, self.result_format)
+                if columns:
+                    write_result(pd.concat(columns, axis=1), output_file_path, self.result_format)
+                    self.log.emit(f"✅ [{REPORTS[key]['label']}] Đã lưu {len(set().union(*flagged.values()))} ID tại: {output_file_path}")
+                else:
+                    self.log.emit(f"ℹ️ [{REPORTS[key]['label']}] Chưa có ID nào thỏa tiêu chí.")
+            self.progress.emit(100)
+            self.finished.emit(results)
+        except Exception as e:
+            self.log.emit(f"❌ Đã xảy ra lỗi khi cập nhật trạng thái: {e}")
+            self.finished.emit(None)
+
+
+# --- COMMAND LINE ---
+def _print_progress(value):
+    """Shows the progress on one line when stderr is a terminal, logs go to stdout."""
+    if sys.stderr.isatty():
+        print(f"\r⏳ {value:3d}%", end='\n' if value >= 100 else '', file=sys.stderr, flush=True)
+
+def main(argv=None):
+    """
+    Command line entry point, returns the exit code (0 when every report succeeded).
+    bae run --report KEY [--report KEY ...] --in FILE|DIR|GLOB --out DIR [--processes N] [--format FMT] [--consolidate] [--trace] | bae list
+    bae incremental [--report KEY ...] --in FILE [FILE ...] --out DIR [--state FILE] [--full] [--format FMT]
+    """
+    parser = argparse.ArgumentParser(prog='bae', description="Chạy các báo cáo nhóm ID không cần giao diện.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('list', help="Liệt kê các báo cáo")
+    run_parser = commands.add_parser('run', help="Chạy một hoặc nhiều báo cáo trên một file hoặc cả thư mục")
+    run_parser.add_argument('--report', action='append', required=True, metavar='KEY',
+                            help="Khóa báo cáo (xem 'list'), lặp lại để chạy nhiều báo cáo, 'all' để chạy tất cả")
+    run_parser.add_argument('--in', dest='input_file_path', required=True, metavar='FILE',
+                            help="File Excel/CSV đầu vào, hoặc thư mục / mẫu glob để chạy trên từng file")
+    run_parser.add_argument('--out', dest='destination_folder', required=True, metavar='DIR', help="Thư mục lưu kết quả")
+    run_parser.add_argument('--processes', type=int, default=BATCH_MAX_PROCESSES, metavar='N',
+                            help="Số process tối đa khi chạy nhiều báo cáo hoặc nhiều file")
+    run_parser.add_argument('--verbose', action='store_true', help="Ghi nhật ký từng nhóm tìm được")
+    run_parser.add_argument('--format', dest='result_format', choices=available_result_formats(), default=DEFAULT_RESULT_FORMAT,
+                            help="Định dạng file kết quả (mặc định xlsx)")
+    run_parser.add_argument('--consolidate', action='store_true',
+                            help=f"Lưu tất cả báo cáo vào một file {CONSOLIDATED_FILE_NAME} (mỗi báo cáo một sheet, kèm sheet tổng hợp)")
+    run_parser.add_argument('--trace', action='store_true',
+                            help=f"Lưu thời gian, CPU, bộ nhớ từng bước của mỗi báo cáo ra file *{TRACE_SUFFIX} cạnh kết quả")
+    incremental_parser = commands.add_parser('incremental', help="Cập nhật các báo cáo hằng ngày chỉ từ các đơn mới")
+    incremental_parser.add_argument('--report', action='append', choices=INCREMENTAL_REPORTS, metavar='KEY',
+                                    help=f"Báo cáo cần lưu, mặc định tất cả: {', '.join(INCREMENTAL_REPORTS)}")
+    incremental_parser.add_argument('--in', dest='input_file_paths', nargs='+', required=True, metavar='FILE',
+                                    help="Các file Excel/CSV mới (các đơn đã xử lý được bỏ qua theo order_id)")
+    incremental_parser.add_argument('--out', dest='destination_folder', required=True, metavar='DIR', help="Thư mục lưu kết quả")
+    incremental_parser.add_argument('--state', dest='state_path', default=INCREMENTAL_STATE_PATH, metavar='FILE',
+                                    help="File SQLite lưu trạng thái giữa các lần chạy")
+    incremental_parser.add_argument('--full', action='store_true',
+                                    help="Xóa trạng thái và tính lại toàn bộ trên các file đầu vào, dùng để đối chiếu")
+    incremental_parser.add_argument('--format', dest='result_format', choices=available_result_formats(),
+                                    default=DEFAULT_RESULT_FORMAT, help="Định dạng file kết quả (mặc định xlsx)")
+    args = parser.parse_args(argv)
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(errors='replace') # Console Windows không hiển thị được emoji
+
+    if args.command == 'list':
+        for key, report in REPORTS.items():
+            print(f"{key:<34} {report['label']}")
+        return 0
+
+    if args.command == 'incremental':
+        missing_files = [path for path in args.input_file_paths if not os.path.isfile(path)]
+        if missing_files:
+            parser.error(f"không tìm thấy file đầu vào: {', '.join(missing_files)}")
+        os.makedirs(args.destination_folder, exist_ok=True)
+        incremental = IncrementalWorker(args.input_file_paths, args.destination_folder, args.report,
+                                        state_path=args.state_path, full=args.full, result_format=args.result_format)
+        outcome = []
+        incremental.progress.connect(_print_progress)
+        incremental.log.connect(print)
+        incremental.finished.connect(outcome.append)
+        incremental.run()
+        return 0 if outcome and outcome[0] is not None else 1
+
+    report_keys = list(REPORTS) if 'all' in args.report else list(dict.fromkeys(args.report))
+    unknown = [key for key in report_keys if key not in REPORTS]
+    if unknown:
+        parser.error(f"không có báo cáo: {', '.join(unknown)}")
+    folder_source = is_folder_source(args.input_file_path)
+    if not folder_source and not os.path.isfile(args.input_file_path):
+        parser.error(f"không tìm thấy file đầu vào: {args.input_file_path}")
+    os.makedirs(args.destination_folder, exist_ok=True)
+    log_detail = LOG_DETAIL_VERBOSE if args.verbose else LOG_DETAIL_NORMAL
+
+    if folder_source:
+        folder_batch = FolderBatchWorker(args.input_file_path, args.destination_folder, report_keys,
+                                         max_processes=max(1, args.processes), log_detail=log_detail,
+                                         result_format=args.result_format, consolidated=args.consolidate, trace=args.trace)
+        file_outcomes = {}
+        folder_batch.progress.connect(_print_progress)
+        folder_batch.log.connect(print)
+        folder_batch.file_finished.connect(file_outcomes.__setitem__)
+        folder_batch.run()
+        return 0 if file_outcomes and all(file_outcomes.values()) else 1
+
+    if len(report_keys) == 1 and not args.consolidate:
+        success = run_report(report_keys[0], args.input_file_path, args.destination_folder,
+                             on_progress=_print_progress, on_log=print, log_detail=log_detail,
+                             result_format=args.result_format, trace_folder=args.destination_folder if args.trace else None)
+        return 0 if success else 1
+    batch = BatchWorker(args.input_file_path, args.destination_folder, report_keys, max_processes=max(1, args.processes),
+                        log_detail=log_detail, result_format=args.result_format, consolidated=args.consolidate,
+                        trace=args.trace)
+    outcomes = {}
+    batch.progress.connect(_print_progress)
+    batch.log.connect(print)
+    batch.report_finished.connect(outcomes.__setitem__)
+    batch.run()
+    return 0 if outcomes and all(outcomes.get(key) for key in report_keys) else 1
+
+
+if __name__ == '__main__':
+    multiprocessing.freeze_support()
+    sys.exit(main())
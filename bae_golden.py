@@ -0,0 +1,511 @@
+"""
+Kiểm tra một bản cài đặt mới của các báo cáo (Worker1..Worker18) cho ra đúng các ID như bản cũ.
+Chạy bản cũ (legacy, mặc định baepink3.0.3.py của commit "baseline", hay một script/phiên bản khác trong git) và bản mới
+(candidate, mặc định là bae_engine) trên các file giả lập của bae_bench và các file xuất thật đã ẩn danh, so sánh tập ID
+của từng cột kết quả, thoát với mã 1 khi có khác biệt ngoài các khác biệt có chủ ý (EXPECTED_DIFFERENCES).
+Thời gian của hai bản được đo trong cùng lần chạy.
+
+    python bae_golden.py check --report all
+    python bae_golden.py check --strict --legacy baepink3.0.2.py --rows 3000
+    python bae_golden.py check --legacy 2277176:baepink3.0.3.py --fixture anon_0106.xlsx --rows 3000
+    python bae_golden.py anonymize --in export_0106.xlsx --out anon_0106.xlsx --salt "bí mật"
+"""
+import argparse
+import hashlib
+import importlib.util
+import os
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import bae_bench
+import bae_engine
+
+DEFAULT_LEGACY = 'baseline:baepink3.0.3.py' # Bản trước khi tách bae_engine, "baseline" là tên ref hoặc tiêu đề commit
+CANDIDATE_ENGINE = 'engine'
+GOLDEN_ROWS = [3000, 20000]
+GOLDEN_WORKDIR = os.path.join(tempfile.gettempdir(), 'bae_golden')
+DIFF_SAMPLE_SIZE = 5 # Số ID thừa/thiếu in ra cho mỗi cột
+GIT_SPEC_PATTERN = re.compile(r'^([^:\\/]{2,}):(.+)$') # "REV:path", không nhầm với ổ đĩa Windows "C:\..."
+
+# Khác biệt có chủ ý của bae_engine so với bản cũ, theo khóa báo cáo, check chấp nhận chúng trừ khi có --strict.
+#   extra: bản mới được tìm thêm ID, không được thiếu ID nào của bản cũ và mọi ID thừa phải được chứng minh:
+#          kết quả phải đúng bằng REFERENCE_RULES của báo cáo (so sánh toàn bộ các cặp theo quy tắc cặp của bản cũ).
+#   legacy_fails: bản cũ lỗi trên mọi file (lỗi có sẵn), bản mới chạy được thì kết quả không so sánh được.
+#   note: lý do, in ra cạnh kết quả.
+EXPECTED_DIFFERENCES = {
+    'same_order_value_similar_address': {
+        'extra': True,
+        'note': "nhóm là thành phần liên thông (A~B~C) và chỉ mục q-gram hoặc các lượt tạo khối thêm tìm được cặp khác "
+                "từ đầu địa chỉ, bản cũ chỉ so sánh trong một khối và gom các bản ghi khớp trực tiếp với bản ghi đầu nhóm",
+    },
+    'similar_address': {
+        'extra': True,
+        'note': "nhóm là thành phần liên thông (A~B~C) và chỉ mục q-gram hoặc các lượt tạo khối thêm tìm được cặp khác "
+                "từ đầu địa chỉ, bản cũ chỉ so sánh trong một khối và gom các bản ghi khớp trực tiếp với bản ghi đầu nhóm",
+    },
+    'tolerant_address': {
+        'legacy_fails': True,
+        'note': "bản cũ đọc cột 'Order Value (Checkout Amount)' sau khi cột đã đổi tên thành gmv_vnd nên luôn lỗi",
+    },
+}
+
+# Ẩn danh: tên miền công khai giữ nguyên (bộ lọc của Same Domain dùng chúng), các từ hành chính trong địa chỉ giữ nguyên
+PUBLIC_DOMAINS = {'gmail.com', 'yahoo.com.vn', 'yahoo.com', 'icloud.com', 'privaterelay.appleid.com', 'outlook.com', 'hotmail.com'}
+ADDRESS_KEEP_WORDS = {
+    'so', 'nha', 'ngo', 'ngach', 'hem', 'kiet', 'duong', 'd', 'pho', 'thon', 'to', 'khu', 'ap', 'kdc', 'kp', 'xom',
+    'phuong', 'p', 'quan', 'q', 'xa', 'huyen', 'thi', 'tran', 'tt', 'tinh', 'thanh', 'tp',
+}
+ANONYMIZED_ID_COLUMNS = ['Order ID', 'Buyer User ID', 'PV Promotion ID', 'fsv_voucher_code']
+ANONYMIZED_DIGIT_COLUMNS = ['Buyer Recipient Phone', 'N3']
+ANONYMIZED_ADDRESS_COLUMNS = ['Buyer Recipient Address', 'Buyer Recipient Address District']
+ANONYMIZED_NAME_COLUMNS = ['recipient_name']
+WORD_PATTERN = re.compile(r'\w+')
+INTEGRAL_FLOAT_PATTERN = re.compile(r'^(\d+)\.0+$') # CSV đọc dạng chuỗi: '200000001.0'
+CONSONANTS = 'bcdghklmnpqrstvx'
+VOWELS = 'aeiouy'
+
+
+# --- IMPLEMENTATIONS ---
+def load_implementation(spec, workdir=GOLDEN_WORKDIR):
+    """
+    Nạp một bản cài đặt các báo cáo.
+    Args:
+        spec (str): CANDIDATE_ENGINE cho các worker của bae_engine, đường dẫn một script có Worker1..Worker18
+            (vd. baepink3.0.2.py), hoặc "REV:đường_dẫn" để lấy script từ một commit git.
+        workdir (str): Nơi lưu script lấy từ git.
+    Returns:
+        module or None: Module của script, None cho bae_engine.
+    """
+    if spec == CANDIDATE_ENGINE:
+        return None
+    path = spec
+    match = GIT_SPEC_PATTERN.match(spec)
+    if match and not os.path.exists(spec):
+        revision, repo_path = match.groups()
+        folder = os.path.dirname(os.path.abspath(__file__))
+        source = subprocess.run(['git', 'show', f"{resolve_revision(revision, folder)}:{repo_path}"], cwd=folder,
+                                capture_output=True, check=True).stdout
+        os.makedirs(workdir, exist_ok=True)
+        path = os.path.join(workdir, re.sub(r'\W', '_', revision) + '_' + os.path.basename(repo_path))
+        with open(path, 'wb') as f:
+            f.write(source)
+    # Các script cũ dựa trên QThread, không cần màn hình để chạy worker
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    module_name = 'golden_' + re.sub(r'\W', '_', os.path.splitext(os.path.basename(path))[0])
+    module_spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(module_spec)
+    module_spec.loader.exec_module(module)
+    return module
+
+def resolve_revision(revision, folder):
+    """Commit of `revision`: a git ref or hash, otherwise the latest commit whose subject is exactly `revision`."""
+    resolved = subprocess.run(['git', 'rev-parse', '--verify', '--quiet', f"{revision}^{{commit}}"], cwd=folder,
+                              capture_output=True, text=True)
+    if resolved.returncode == 0:
+        return resolved.stdout.strip()
+    subjects = subprocess.run(['git', 'log', '--all', '--format=%H %s'], cwd=folder, capture_output=True, text=True,
+                              check=True).stdout.splitlines()
+    found = [line.split(' ', 1)[0] for line in subjects if line.split(' ', 1)[1:] == [revision]]
+    if not found:
+        raise ValueError(f"không có ref hay commit nào tên '{revision}'")
+    return found[0]
+
+def run_implementation(module, report_key, input_file_path, output_file_path):
+    """
+    Chạy một báo cáo đồng bộ bằng bản cài đặt `module` (None cho bae_engine) và đọc lại kết quả.
+    Returns:
+        dict: 'seconds' (thời gian run(), gồm cả ghi file), 'ids' (result_ids), 'success' và 'error' (dòng log lỗi cuối).
+    """
+    if os.path.exists(output_file_path):
+        os.remove(output_file_path)
+    if module is None:
+        worker = bae_engine.create_worker(report_key, input_file_path, output_file_path)
+    else:
+        worker = getattr(module, bae_engine.REPORTS[report_key]['worker'].__name__)(input_file_path, output_file_path)
+    logs = []
+    outcome = []
+    worker.log.connect(logs.append)
+    worker.finished.connect(lambda result: outcome.append(result))
+    started = time.perf_counter()
+    worker.run()
+    # Worker của bae_engine ghi file ở luồng nền, bản bọc QThread giữ nó trong .worker
+    engine_worker = getattr(worker, 'worker', worker)
+    pending_result = getattr(engine_worker, 'pending_result', None)
+    if pending_result is not None:
+        pending_result.exception()
+    seconds = time.perf_counter() - started
+    saved_path = getattr(engine_worker, 'output_file_path', output_file_path)
+    errors = [line for line in logs if line.startswith('❌')]
+    return {
+        'seconds': seconds,
+        'ids': result_ids(saved_path),
+        'success': bool(outcome) and outcome[0] is not None and not errors,
+        'error': errors[-1] if errors else '',
+    }
+
+def result_ids(output_file_path):
+    """Tập ID (bỏ ô trống, 123.0 == 123) của từng cột trong file kết quả, {} khi báo cáo không ghi file."""
+    if not os.path.exists(output_file_path):
+        return {}
+    df = bae_engine.read_result(output_file_path)
+    return {str(column): set(bae_engine._state_values(df[column].dropna())) for column in df.columns}
+
+def expected_difference(expected, old, new, differences, reference=None):
+    """
+    Lý do (note) khi khác biệt giữa hai lần chạy nằm trong `expected` (một mục của EXPECTED_DIFFERENCES), None nếu không.
+    Với 'extra', reference là tập ID của REFERENCE_RULES: ID của bản mới phải đúng bằng nó.
+    """
+    if not expected:
+        return None
+    if expected.get('legacy_fails') and not old['success'] and new['success']:
+        return expected['note']
+    if (expected.get('extra') and old['success'] == new['success'] and not any(missing for _, missing in differences.values())
+            and reference is not None and set().union(*new['ids'].values()) == reference):
+        return expected['note']
+    return None
+
+def diff_ids(legacy_ids, candidate_ids):
+    """{cột: (ID chỉ bản mới có, ID chỉ bản cũ có)} cho các cột khác nhau, cột không có coi như rỗng."""
+    differences = {}
+    for column in dict.fromkeys(list(legacy_ids) + list(candidate_ids)):
+        legacy_column = legacy_ids.get(column, set())
+        candidate_column = candidate_ids.get(column, set())
+        if legacy_column != candidate_column:
+            differences[column] = (candidate_column - legacy_column, legacy_column - candidate_column)
+    return differences
+
+
+
+# --- REFERENCE RULES ---
+# Kết quả chuẩn của các báo cáo "extra": quy tắc cặp của bản cũ (fuzzywuzzy token_sort_ratio cho địa chỉ, ratio cho
+# tên, ngưỡng 85) trên mọi cặp của từng nhóm giá trị/tên, các cặp khớp gom thành thành phần liên thông (A~B~C).
+# Không dùng chỉ mục, khối hay bộ lọc nào của bae_engine, chỉ dùng chung cách đọc file và chuẩn hóa chuỗi.
+REFERENCE_THRESHOLD = 85
+REFERENCE_NAME_WORDS = 7 # Số từ đầu của tên phải trùng nhau (NAME_BLOCKING_WORDS của bản cũ)
+
+def _similar_pairs(texts, scorer):
+    """Ma trận bool: cặp nào của `texts` đạt REFERENCE_THRESHOLD với scorer ('ratio' hoặc 'token_sort_ratio'), điểm làm tròn như fuzzywuzzy."""
+    if bae_engine.HAS_RAPIDFUZZ:
+        from rapidfuzz import utils
+        processor = utils.default_process if scorer == 'token_sort_ratio' else None
+        scores = bae_engine.rapid_process.cdist(texts, texts, scorer=getattr(bae_engine.rapid_fuzz, scorer), processor=processor,
+                                                dtype=np.float64, score_cutoff=REFERENCE_THRESHOLD - 0.5)
+        return np.round(scores) >= REFERENCE_THRESHOLD
+    score = getattr(bae_engine.fuzz, scorer)
+    return np.array([[score(left, right) >= REFERENCE_THRESHOLD for right in texts] for left in texts], dtype=bool)
+
+def _same_texts(texts):
+    """Ma trận bool: cặp nào của `texts` trùng nhau."""
+    codes = pd.factorize(pd.Series(texts, dtype=object))[0]
+    return codes[:, None] == codes[None, :]
+
+def _linked_ids(ids, pairs, min_distinct_ids=3):
+    """ID của các thành phần liên thông của `pairs` (i, j) có ít nhất min_distinct_ids ID riêng biệt."""
+    parent = list(range(len(ids)))
+
+    def find(k):
+        while parent[k] != k:
+            parent[k] = parent[parent[k]]
+            k = parent[k]
+        return k
+
+    for i, j in pairs:
+        parent[find(i)] = find(j)
+    components = {}
+    for k, buyer_id in enumerate(ids):
+        components.setdefault(find(k), set()).add(buyer_id)
+    return set().union(*(members for members in components.values() if len(members) >= min_distinct_ids))
+
+def _reference_frame(report_key, input_file_path, required_columns):
+    """Các dòng đủ cột bắt buộc của file, địa chỉ đã làm sạch ('address'); None khi thiếu cột."""
+    worker_cls = bae_engine.REPORTS[report_key]['worker']
+    logs = bae_engine.Signal(str)._bind()
+    df = bae_engine.read_and_map_data(input_file_path, logs, worker_cls.INPUT_COLUMNS)
+    if df is None or not all(column in df.columns for column in required_columns):
+        return None
+    df = df.dropna(subset=required_columns)
+    df = df.assign(address=bae_engine.clean_addresses(df['buyer_shipping_address_district']))
+    return df.dropna(subset=['address'])
+
+def _reference_ids(df, partition, is_pair):
+    """ID tìm được khi so sánh mọi cặp trong từng nhóm của `partition` bằng is_pair(group) -> ma trận bool."""
+    ids = df['buyer_id'].tolist()
+    pairs = []
+    for group in pd.Series(np.arange(len(df))).groupby(partition, sort=False).indices.values():
+        left, right = np.nonzero(np.triu(is_pair(df.iloc[group]), 1))
+        pairs.extend(zip(group[left], group[right]))
+    return set(bae_engine._state_values(pd.Series(list(_linked_ids(ids, pairs)), dtype=object)))
+
+def same_value_similar_address_reference(input_file_path):
+    """same_order_value_similar_address: cùng giá trị đơn hàng, địa chỉ trùng hoặc token_sort_ratio >= 85."""
+    df = _reference_frame('same_order_value_similar_address', input_file_path, ['buyer_id', 'gmv_vnd', 'buyer_shipping_address_district'])
+    if df is None:
+        return None
+
+    def is_pair(group):
+        addresses = group['address'].tolist()
+        return _same_texts(addresses) | _similar_pairs(addresses, 'token_sort_ratio')
+
+    return _reference_ids(df, df['gmv_vnd'].to_numpy(), is_pair)
+
+def similar_name_address_reference(input_file_path):
+    """similar_address: cùng REFERENCE_NAME_WORDS từ đầu của tên, địa chỉ trùng hoặc cả tên (ratio) và địa chỉ (token_sort_ratio) >= 85."""
+    df = _reference_frame('similar_address', input_file_path, ['buyer_id', 'item_name', 'buyer_shipping_address_district'])
+    if df is None:
+        return None
+    df = df.assign(name=bae_engine.normalize_recipient_names(df['item_name'])).dropna(subset=['name'])
+
+    def is_pair(group):
+        addresses = group['address'].tolist()
+        return _same_texts(addresses) | (_similar_pairs(group['name'].tolist(), 'ratio') & _similar_pairs(addresses, 'token_sort_ratio'))
+
+    prefixes = np.array([" ".join(name.split()[:REFERENCE_NAME_WORDS]) for name in df['name']], dtype=object)
+    return _reference_ids(df, prefixes, is_pair)
+
+REFERENCE_RULES = {
+    'same_order_value_similar_address': same_value_similar_address_reference,
+    'similar_address': similar_name_address_reference,
+}
+assert all(key in REFERENCE_RULES for key, entry in EXPECTED_DIFFERENCES.items() if entry.get('extra'))
+
+
+# --- EQUIVALENCE CHECK ---
+def golden_fixtures(rows_list, seed=0, workdir=GOLDEN_WORKDIR, log=print):
+    """File giả lập của bae_bench cho mỗi số dòng, sinh một lần và giữ trong workdir."""
+    os.makedirs(workdir, exist_ok=True)
+    paths = []
+    for rows in rows_list:
+        path = bae_bench._export_path(workdir, rows, seed, 'csv')
+        if not os.path.exists(path):
+            log(f"ℹ️ Đang sinh {rows} đơn hàng: {path}")
+            bae_bench.write_export(bae_bench.generate_orders(rows, seed=seed)[0], path)
+        paths.append(path)
+    return paths
+
+def check_equivalence(input_files, report_keys, legacy, candidate=None, workdir=GOLDEN_WORKDIR, log=print, expected=None):
+    """
+    Chạy từng báo cáo bằng cả hai bản cài đặt trên từng file và so sánh tập ID.
+    Bộ nhớ đệm của bae_engine được làm trống trước mỗi lần chạy, nên thời gian của hai bản so sánh được với nhau.
+    Một báo cáo lỗi ở cả hai bản được coi là giống nhau (lỗi có sẵn từ bản cũ), một khác biệt có trong `expected`
+    cũng vậy nhưng vẫn được in ra; ID thừa của một mục 'extra' phải đúng bằng kết quả của REFERENCE_RULES.
+    Args:
+        input_files (list[str]): Các file xuất (giả lập hoặc đã ẩn danh).
+        report_keys (list[str]): Các khóa trong REPORTS.
+        legacy (module): Bản cũ, từ load_implementation.
+        candidate (module, optional): Bản mới, None cho bae_engine.
+        workdir (str): Nơi ghi kết quả tạm và bộ nhớ đệm.
+        log (callable): Nhận từng dòng kết quả.
+        expected (dict, optional): Các khác biệt có chủ ý, xem EXPECTED_DIFFERENCES.
+    Returns:
+        list[dict]: Một bản ghi mỗi (file, báo cáo) với 'equal', 'expected' (lý do khi khác biệt có chủ ý),
+        'differences' và thời gian của hai bản.
+    """
+    output_folder = os.path.join(workdir, 'out')
+    os.makedirs(output_folder, exist_ok=True)
+    records = []
+    with bae_bench._isolated_caches(workdir):
+        for input_file_path in input_files:
+            fixture = os.path.basename(input_file_path)
+            for report_key in report_keys:
+                output_name = bae_engine.REPORTS[report_key]['output']
+                bae_bench._cold_start(workdir)
+                old = run_implementation(legacy, report_key, input_file_path, os.path.join(output_folder, 'legacy_' + output_name))
+                bae_bench._cold_start(workdir)
+                new = run_implementation(candidate, report_key, input_file_path, os.path.join(output_folder, 'candidate_' + output_name))
+                both_failed = not old['success'] and not new['success']
+                differences = {} if both_failed else diff_ids(old['ids'], new['ids'])
+                equal = not differences and (both_failed or new['success'] == old['success'])
+                entry = (expected or {}).get(report_key)
+                reference = None
+                if not equal and entry and entry.get('extra'):
+                    reference = REFERENCE_RULES[report_key](input_file_path)
+                note = None if equal else expected_difference(entry, old, new, differences, reference)
+                records.append({
+                    'fixture': fixture, 'report': report_key, 'equal': equal or note is not None, 'expected': note,
+                    'differences': differences,
+                    'legacy_s': old['seconds'], 'candidate_s': new['seconds'],
+                    'ids': len(set().union(*new['ids'].values())) if new['ids'] else 0,
+                })
+                status = '✅' if equal else '☑️' if note is not None else '❌'
+                remark = ' (lỗi ở cả hai bản)' if both_failed else f" (khác biệt dự kiến: {note})" if note is not None else ''
+                speedup = old['seconds'] / new['seconds'] if new['seconds'] else float('inf')
+                log(f"{status} {fixture:<28} {report_key:<34} {old['seconds']:7.2f}s -> {new['seconds']:7.2f}s "
+                    f"x{speedup:6.1f} {records[-1]['ids']:>7} ID{remark}")
+                if old['success'] != new['success'] and not both_failed:
+                    failed = old if not old['success'] else new
+                    log(f"    {'Bản cũ' if failed is old else 'Bản mới'} lỗi: {failed['error'] or 'không có kết quả'}")
+                for column, (extra, missing) in differences.items():
+                    log(f"    Cột '{column}': thừa {_sample(extra)}, thiếu {_sample(missing)}")
+                if reference is not None and note is None:
+                    found = set().union(*new['ids'].values()) if new['ids'] else set()
+                    log(f"    So với quy tắc cặp (REFERENCE_RULES): thừa {_sample(found - reference)}, thiếu {_sample(reference - found)}")
+    return records
+
+def uses_levenshtein_backend():
+    """Whether fuzzywuzzy (used by the legacy scripts) scores with python-Levenshtein instead of difflib."""
+    from fuzzywuzzy import fuzz
+    return fuzz.SequenceMatcher.__module__ != 'difflib'
+
+def _sample(ids):
+    """'3 [1, 2, 5]': số ID và vài ID đầu tiên."""
+    return f"{len(ids)} {sorted(ids, key=str)[:DIFF_SAMPLE_SIZE]}" if ids else '0'
+
+
+# --- ANONYMIZATION ---
+def _keyed_digest(salt, kind, value):
+    return hashlib.blake2b(f"{kind}\x00{value}".encode('utf-8'), key=salt.encode('utf-8')[:64], digest_size=16).digest()
+
+def _keyed_digits(salt, kind, value, length):
+    number = int.from_bytes(_keyed_digest(salt, kind, value), 'big')
+    return str(number % 10 ** length).zfill(length)
+
+def _id_text(value):
+    """'123', 123 và 123.0 là cùng một ID."""
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return INTEGRAL_FLOAT_PATTERN.sub(r'\1', str(value).strip())
+
+def _word_key(word):
+    """Từ không dấu, chữ thường; đ không tách dấu được nên thay riêng."""
+    return bae_engine.remove_diacritics(word.replace('đ', 'd').replace('Đ', 'D')).lower()
+
+def _pseudo_word(salt, word):
+    """Từ giả cùng độ dài, xen phụ âm/nguyên âm, giữ chữ hoa đầu từ."""
+    digest = _keyed_digest(salt, 'word', _word_key(word))
+    letters = ''.join((CONSONANTS if i % 2 == 0 else VOWELS)[digest[i % len(digest)] % (len(CONSONANTS) if i % 2 == 0 else len(VOWELS))]
+                      for i in range(len(word)))
+    return letters.capitalize() if word[:1].isupper() else letters
+
+def _anonymize_text(salt, text, keep_words):
+    def replace(match):
+        word = match.group(0)
+        if any(char.isdigit() for char in word) or _word_key(word) in keep_words:
+            return word
+        return _pseudo_word(salt, word)
+    return WORD_PATTERN.sub(replace, text)
+
+def _anonymize_id(salt, column, value):
+    text = _id_text(value)
+    if text.isdigit():
+        return _keyed_digits(salt, column, text, max(len(text), 9))
+    return 'X' + _keyed_digest(salt, column, text).hex()[:12].upper()
+
+def _anonymize_digits(salt, column, value):
+    """Giữ ký tự không phải số và chữ số đầu (0/8), thay các chữ số còn lại; cùng dãy số -> cùng kết quả."""
+    text = _id_text(value)
+    digits = re.sub(r'\D', '', text)
+    if len(digits) < 2:
+        return value
+    replacement = iter(digits[0] + _keyed_digits(salt, column, digits, len(digits) - 1))
+    return re.sub(r'\d', lambda match: next(replacement), text)
+
+def _anonymize_ip(salt, value):
+    digest = _keyed_digest(salt, 'ip', _id_text(value))
+    return '.'.join(str(part) for part in (digest[0] % 223 + 1, digest[1], digest[2], digest[3] % 254 + 1))
+
+def _anonymize_domain(salt, domain):
+    domain = domain.strip().lower()
+    if not domain or domain in PUBLIC_DOMAINS:
+        return domain
+    tld = domain.rsplit('.', 1)[-1] if '.' in domain else 'vn'
+    return f"d{_keyed_digest(salt, 'domain', domain).hex()[:10]}.{tld}"
+
+def _anonymize_email(salt, email):
+    local, _, domain = email.strip().partition('@')
+    return f"u{_keyed_digest(salt, 'email', local.lower()).hex()[:12]}@{_anonymize_domain(salt, domain)}"
+
+def anonymize_export(input_file_path, output_file_path, salt):
+    """
+    Ẩn danh một file xuất thật để dùng làm fixture: mỗi giá trị được thay bằng một giá trị giả suy ra từ khóa `salt`,
+    nên các giá trị trùng nhau vẫn trùng nhau và các nhóm theo khóa (phone, IP, N3, promotion...) được giữ nguyên.
+    Số điện thoại/N3 giữ định dạng và chữ số đầu, email giữ tên miền công khai, địa chỉ và tên được thay từng từ
+    (giữ số và các từ hành chính như phường, quận). Thời gian, tỉnh/thành, quận/huyện, sản phẩm và giá trị đơn giữ nguyên.
+    Độ giống nhau giữa các địa chỉ chỉ được giữ gần đúng, nên kết quả trên file ẩn danh dùng để so sánh hai bản
+    cài đặt với nhau chứ không phải với kết quả trên file gốc.
+    """
+    if input_file_path.lower().endswith('.csv'):
+        df = pd.read_csv(input_file_path, dtype=object)
+    else:
+        df = pd.read_excel(input_file_path, dtype=object, engine='openpyxl')
+
+    def mapped(column, anonymize):
+        if column in df.columns:
+            values = df[column]
+            distinct = {value: anonymize(value) for value in values.dropna().unique()}
+            df[column] = values.map(distinct).where(values.notna(), values)
+
+    for column in ANONYMIZED_ID_COLUMNS:
+        mapped(column, lambda value, column=column: _anonymize_id(salt, column, value))
+    for column in ANONYMIZED_DIGIT_COLUMNS:
+        # Phone và N3 dùng chung một ánh xạ, nên N3 trùng số điện thoại vẫn trùng sau khi ẩn danh
+        mapped(column, lambda value: _anonymize_digits(salt, 'phone', value))
+    mapped('Checkout IP Address', lambda value: _anonymize_ip(salt, value))
+    mapped('domain', lambda value: _anonymize_domain(salt, str(value)))
+    mapped('buyer_email', lambda value: _anonymize_email(salt, str(value)) if str(value).strip() else value)
+    for column in ANONYMIZED_ADDRESS_COLUMNS:
+        mapped(column, lambda value: _anonymize_text(salt, str(value), ADDRESS_KEEP_WORDS))
+    for column in ANONYMIZED_NAME_COLUMNS:
+        mapped(column, lambda value: _anonymize_text(salt, str(value), set()))
+    bae_bench.write_export(df, output_file_path)
+    return len(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='bae_golden', description="So sánh kết quả các báo cáo giữa bản cũ và bản mới.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    check_parser = commands.add_parser('check', help="Chạy hai bản cài đặt và so sánh tập ID")
+    check_parser.add_argument('--legacy', default=DEFAULT_LEGACY,
+                              metavar='SCRIPT', help="Script bản cũ hoặc REV:đường_dẫn trong git, REV là ref hoặc tiêu đề commit (mặc định %(default)s)")
+    check_parser.add_argument('--candidate', default=CANDIDATE_ENGINE, metavar='SCRIPT',
+                              help="Script bản mới, REV:đường_dẫn hoặc 'engine' cho bae_engine (mặc định)")
+    check_parser.add_argument('--report', action='append', metavar='KEY', help="Khóa báo cáo, lặp lại để chọn nhiều (mặc định tất cả)")
+    check_parser.add_argument('--fixture', action='append', default=[], metavar='FILE', help="File xuất đã ẩn danh, lặp lại được")
+    check_parser.add_argument('--rows', type=int, nargs='*', metavar='N',
+                              help=f"Số dòng của các file giả lập (mặc định {' '.join(map(str, GOLDEN_ROWS))} khi không có --fixture)")
+    check_parser.add_argument('--seed', type=int, default=0)
+    check_parser.add_argument('--workdir', default=GOLDEN_WORKDIR, metavar='DIR')
+    check_parser.add_argument('--strict', action='store_true', help="Không chấp nhận các khác biệt trong EXPECTED_DIFFERENCES")
+    anonymize_parser = commands.add_parser('anonymize', help="Ẩn danh một file xuất thật để làm fixture")
+    anonymize_parser.add_argument('--in', dest='input', required=True, metavar='FILE')
+    anonymize_parser.add_argument('--out', required=True, metavar='FILE', help="File .csv hoặc .xlsx")
+    anonymize_parser.add_argument('--salt', required=True, help="Khóa bí mật của ánh xạ, giữ nguyên để các file cùng ánh xạ")
+    args = parser.parse_args(argv)
+    if hasattr(sys.stdout, 'reconfigure'):
+        sys.stdout.reconfigure(errors='replace')
+
+    if args.command == 'anonymize':
+        rows = anonymize_export(args.input, args.out, args.salt)
+        print(f"✅ Đã ẩn danh {rows} đơn hàng tại: {args.out}")
+        return 0
+
+    report_keys = list(bae_engine.REPORTS) if not args.report or 'all' in args.report else list(dict.fromkeys(args.report))
+    unknown = [key for key in report_keys if key not in bae_engine.REPORTS]
+    if unknown:
+        parser.error(f"không có báo cáo: {', '.join(unknown)}")
+    rows_list = args.rows if args.rows is not None else ([] if args.fixture else GOLDEN_ROWS)
+    input_files = golden_fixtures(rows_list, seed=args.seed, workdir=args.workdir) + args.fixture
+    legacy = load_implementation(args.legacy, args.workdir)
+    if bae_engine.HAS_RAPIDFUZZ and not uses_levenshtein_backend():
+        print("⚠️ fuzzywuzzy không dùng python-Levenshtein: điểm của bản cũ (difflib) có thể khác rapidfuzz gần ngưỡng, "
+              "cài python-Levenshtein để so sánh các báo cáo địa chỉ tương đồng.")
+    candidate = load_implementation(args.candidate, args.workdir)
+    records = check_equivalence(input_files, report_keys, legacy, candidate, workdir=args.workdir,
+                                expected=None if args.strict else EXPECTED_DIFFERENCES)
+    different = [record for record in records if not record['equal']]
+    expected = [record for record in records if record['expected'] is not None]
+    legacy_total = sum(record['legacy_s'] for record in records)
+    candidate_total = sum(record['candidate_s'] for record in records)
+    print(f"{'❌' if different else '✅'} {len(records) - len(different)}/{len(records)} giống nhau"
+          f"{f' ({len(expected)} khác biệt dự kiến)' if expected else ''}, "
+          f"tổng thời gian {legacy_total:.1f}s -> {candidate_total:.1f}s")
+    return 1 if different else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# bae_engine lives next to the GUI scripts at the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import bae_bench
+
+
+@pytest.fixture
+def cold_engine(tmp_path):
+    """Engine caches (Parquet sidecars, normalized strings, parsed frames) empty and kept under tmp_path."""
+    with bae_bench._isolated_caches(str(tmp_path)):
+        bae_bench._cold_start(str(tmp_path))
+        yield tmp_path
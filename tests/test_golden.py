@@ -0,0 +1,32 @@
+"""Expected differences of the golden check: every extra ID has to match the exhaustive pair-rule reference."""
+from bae_golden import EXPECTED_DIFFERENCES, REFERENCE_RULES, _linked_ids, diff_ids, expected_difference
+
+EXPECTED = {'extra': True, 'note': 'transitive clustering'}
+
+
+def run(ids, success=True):
+    return {'success': success, 'ids': ids}
+
+
+def test_extra_ids_must_equal_the_reference():
+    old, new = run({'ids': {1, 2, 3}}), run({'ids': {1, 2, 3, 4, 5, 6}})
+    differences = diff_ids(old['ids'], new['ids'])
+    assert expected_difference(EXPECTED, old, new, differences, {1, 2, 3, 4, 5, 6}) == 'transitive clustering'
+    # A superset of the legacy IDs is not enough on its own
+    assert expected_difference(EXPECTED, old, new, differences) is None
+    assert expected_difference(EXPECTED, old, new, differences, {1, 2, 3, 4, 5}) is None
+
+
+def test_missing_ids_are_never_expected():
+    old, new = run({'ids': {1, 2, 3}}), run({'ids': {2, 3, 4}})
+    assert expected_difference(EXPECTED, old, new, diff_ids(old['ids'], new['ids']), {2, 3, 4}) is None
+
+
+def test_every_extra_report_has_a_reference():
+    assert all(key in REFERENCE_RULES for key, expected in EXPECTED_DIFFERENCES.items() if expected.get('extra'))
+
+
+def test_reference_links_chains():
+    # 0~1~2 is one chain of three IDs, 3~4 has only two
+    assert _linked_ids(['a', 'b', 'c', 'd', 'e'], [(0, 1), (1, 2), (3, 4)]) == {'a', 'b', 'c'}
+    assert _linked_ids(['a', 'a', 'b', 'c'], [(0, 1), (2, 3)]) == set()
@@ -0,0 +1,74 @@
+"""find_ids_sharing_keys against the groupby/merge and set() loops of the legacy same-key reports."""
+import numpy as np
+import pandas as pd
+import pytest
+
+from bae_engine import find_ids_sharing_keys
+
+
+def legacy_nunique(df, keys, threshold):
+    """groupby(keys).nunique() >= threshold, merged back into df, like Same Promotion Phone."""
+    counts = df.dropna(subset=keys).groupby(keys)['buyer_id'].nunique().reset_index(name='count')
+    matched = counts[counts['count'] >= threshold]
+    return set(pd.merge(df, matched[keys], on=keys, how='inner')['buyer_id'].unique())
+
+
+def legacy_set(df, keys, threshold):
+    """set() of the IDs of each group, like RSL: missing IDs are counted too."""
+    found = set()
+    for _, group in df.dropna(subset=keys).groupby(keys):
+        ids = set(group['buyer_id'].tolist())
+        if len(ids) >= threshold:
+            found.update(ids)
+    return found
+
+
+def comparable(ids):
+    """NaN != NaN, so sets holding a missing ID are compared with it as None."""
+    return {None if pd.isna(value) else value for value in ids}
+
+
+def test_distinct_ids_per_key():
+    df = pd.DataFrame({'recipient_phone_': ['1', '1', '1', '1', '2', '2'], 'buyer_id': [10, 11, 11, 12, 13, 14]})
+    assert find_ids_sharing_keys(df, ['recipient_phone_'], [2, 3, 4]) == {2: {10, 11, 12, 13, 14}, 3: {10, 11, 12}, 4: set()}
+
+
+def test_all_keys_must_match():
+    df = pd.DataFrame({'recipient_phone_': ['1', '1', '1', '1'], 'pv_promotion_id': ['a', 'a', 'b', 'a'],
+                       'buyer_id': [10, 11, 12, 13]})
+    assert find_ids_sharing_keys(df, ['recipient_phone_', 'pv_promotion_id'], [3]) == {3: {10, 11, 13}}
+
+
+def test_missing_key_never_groups():
+    df = pd.DataFrame({'recipient_phone_': [None, None, None, '1'], 'buyer_id': [10, 11, 12, 13]})
+    assert find_ids_sharing_keys(df, ['recipient_phone_'], [1, 3]) == {1: {13}, 3: set()}
+
+
+def test_missing_ids_follow_nunique_or_set():
+    df = pd.DataFrame({'recipient_phone_': ['1', '1', '1'], 'buyer_id': [10.0, 11.0, np.nan]})
+    assert find_ids_sharing_keys(df, ['recipient_phone_'], [3]) == {3: set()}
+    result = find_ids_sharing_keys(df, ['recipient_phone_'], [3], count_missing_ids=True)
+    assert comparable(result[3]) == comparable(legacy_set(df, ['recipient_phone_'], 3)) == {10.0, 11.0, None}
+
+
+def test_categorical_keys():
+    df = pd.DataFrame({'recipient_phone_': pd.Categorical(['1', '1', '2', '1'], categories=['1', '2', '3']),
+                       'buyer_id': [10, 11, 12, 12]})
+    assert find_ids_sharing_keys(df, ['recipient_phone_'], [3]) == {3: {10, 11, 12}}
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_legacy_groupby_on_random_orders(seed):
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        'recipient_phone_': rng.choice(['1', '2', '3', None], 80),
+        'pv_promotion_id': rng.choice(['a', 'b'], 80),
+        'buyer_id': rng.integers(0, 15, 80),
+    })
+    for keys in (['recipient_phone_'], ['recipient_phone_', 'pv_promotion_id']):
+        result = find_ids_sharing_keys(df, keys, [2, 3, 5])
+        for threshold, ids in result.items():
+            assert ids == legacy_nunique(df, keys, threshold)
+        result = find_ids_sharing_keys(df, keys, [2, 3, 5], count_missing_ids=True)
+        for threshold, ids in result.items():
+            assert ids == legacy_set(df, keys, threshold)
@@ -0,0 +1,57 @@
+"""Row filters of the rule-based reports: applied once by evaluate_rule, ReportPlan and DetectionState."""
+import numpy as np
+import pandas as pd
+
+from bae_engine import (KEY_RULES, ROW_FILTERS, WINDOW_RULES, DetectionState, ReportPlan, evaluate_rule, find_ids_in_time_windows,
+                        rule_rows)
+
+
+def orders(rows):
+    """Orders (ip, buyer, minutes after 08:00) with the columns of the incremental reports."""
+    start = pd.Timestamp('2024-05-01 08:00')
+    return pd.DataFrame({
+        'order_id': np.arange(len(rows)) + 1,
+        'ip_checkout': [ip for ip, _, _ in rows],
+        'buyer_id': [buyer for _, buyer, _ in rows],
+        'create_time': [start + pd.Timedelta(minutes=minutes) for _, _, minutes in rows],
+        'registration_time': [start] * len(rows),
+        'recipient_phone_': [None] * len(rows),
+        'pv_promotion_id': [None] * len(rows),
+        'N3': [None] * len(rows),
+    })
+
+
+# Buyers 1-4 share no IP ('-'), buyers 5-8 share one
+ROWS = [('-', 1, 0), ('-', 2, 5), ('-', 3, 10), ('-', 4, 15),
+        ('10.0.0.1', 5, 0), ('10.0.0.1', 6, 5), ('10.0.0.1', 7, 10), ('10.0.0.1', 8, 15)]
+
+
+def test_every_rule_filter_is_defined():
+    rules = list(KEY_RULES.values()) + list(WINDOW_RULES.values())
+    assert all(rule['rows'] in ROW_FILTERS for rule in rules if 'rows' in rule)
+
+
+def test_evaluate_rule_applies_the_row_filter():
+    df = orders(ROWS)
+    assert evaluate_rule('ip_create_time', df)[3] == {5, 6, 7, 8}
+    # An order without ID is left out by the fixed-start-time rules
+    assert evaluate_rule('ip_create_time_4', orders(ROWS + [('10.0.0.1', None, 20)]))[4] == {5, 6, 7, 8}
+    expected = find_ids_in_time_windows(df[df['ip_checkout'] != '-'], ['ip_checkout'], 'create_time', [3])[3]
+    assert evaluate_rule('ip_create_time', df)[3] == expected
+
+
+def test_shared_pass_uses_the_rows_of_the_rule():
+    # ip_create_time_6 and ip_create_time_4 share one pass: the rows come from the rule,
+    # not from whichever worker frame reaches the plan first
+    df = orders(ROWS + [('10.0.0.1', None, 20)])
+    plan = ReportPlan(['ip_create_time_6', 'ip_create_time_4'])
+    assert plan.evaluate('ip_create_time_4', df)[4] == {5, 6, 7, 8}
+    assert plan.evaluate('ip_create_time_6', rule_rows('ip_create_time_6', df))[6] == set()
+    assert len(plan.passes) == 1
+
+
+def test_incremental_state_uses_the_same_filter(tmp_path):
+    df = orders(ROWS)
+    state = DetectionState(path=str(tmp_path / 'state.sqlite'))
+    assert state.ingest(df) == len(df)
+    assert state.results(['ip_create_time'])['ip_create_time'][3] == evaluate_rule('ip_create_time', df)[3]
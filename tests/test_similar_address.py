@@ -0,0 +1,254 @@
+"""Linking, blocking and report-level checks of the similar-address reports (Worker7, Worker8, Worker10)."""
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import bae_engine
+from bae_engine import (DisjointSet, QGramIndex, candidate_lists, link_record, linked_clusters, plan_blocks,
+                        similarity_scores, sort_tokens, value_ranges)
+
+THRESHOLD = 85
+STREETS = ['le loi', 'nguyen hue', 'tran hung dao', 'hai ba trung', 'ly thuong kiet', 'phan dinh phung', 'nguyen trai']
+
+
+def run_on_export(report_key, rows, folder):
+    """Runs one report on a CSV export made of `rows` (export column names) and returns the IDs it saved."""
+    input_file_path = os.path.join(folder, 'export.csv')
+    pd.DataFrame(rows).to_csv(input_file_path, index=False)
+    assert bae_engine.run_report(report_key, input_file_path, str(folder))
+    output_file_path = os.path.join(folder, bae_engine.REPORTS[report_key]['output'])
+    if not os.path.exists(output_file_path):
+        return set()
+    return set(bae_engine.read_result(output_file_path)['buyer_id'])
+
+
+def test_tolerant_address_reads_the_mapped_order_value(cold_engine):
+    # 'Order Value (Checkout Amount)' is renamed to gmv_vnd when the file is read
+    rows = [{'Buyer User ID': buyer, 'Order Value (Checkout Amount)': value,
+             'Buyer Recipient Address District': '12 Le Loi, Phuong Ben Nghe, Quan 1'}
+            for buyer, value in [(1, 100000), (2, 200000), (3, 350000), (4, 2000000)]]
+    assert run_on_export('tolerant_address', rows, cold_engine) == {1, 2, 3}
+
+
+
+def test_tolerant_address_groups_stay_within_the_tolerance(cold_engine):
+    # 0~250k~500k~750k all link on one address, but a group spans at most ORDER_VALUE_TOLERANCE:
+    # the ring is cut into 0..250k (buyers 1, 5, 2) and 500k..750k (two buyers, not a group)
+    rows = [{'Buyer User ID': buyer, 'Order Value (Checkout Amount)': value,
+             'Buyer Recipient Address District': '12 Le Loi, Phuong Ben Nghe, Quan 1'}
+            for buyer, value in [(1, 0), (2, 250000), (3, 500000), (4, 750000), (5, 100000)]]
+    assert run_on_export('tolerant_address', rows, cold_engine) == {1, 2, 5}
+
+
+def test_value_ranges_cut_a_chain():
+    links = DisjointSet(6)
+    links.union(np.arange(6))
+    values = np.array([750000, 0, 500000, 250000, 100000, 1000000], dtype=object)
+    ranges = [sorted(members.tolist()) for members in value_ranges(links, values, 300000, [1, 2, 3, 4, 5, 6], 2)]
+    # 1000000 is left alone, under min_distinct_ids
+    assert ranges == [[1, 3, 4], [0, 2]]
+
+def clusters(links, ids, min_distinct_ids=3):
+    return sorted(sorted(unique_ids) for _, unique_ids in linked_clusters(links, ids, min_distinct_ids))
+
+
+def test_disjoint_set_is_transitive():
+    links = DisjointSet(6)
+    links.union(np.array([0, 1]))
+    links.union(np.array([2, 3]))
+    assert links.find([0])[0] != links.find([2])[0]
+    links.union(np.array([1, 3]))
+    roots = links.find(np.arange(6))
+    assert len(set(roots[:4])) == 1 and len(set(roots)) == 3
+    assert links.size[roots[0]] == 4
+
+
+def test_from_keys_links_equal_keys():
+    links = DisjointSet.from_keys([('a', 1), ('b', 1), ('a', 1), ('a', 2), ('b', 1)])
+    assert list(links.roots()) == [0, 1, 3]
+    assert list(links.find(np.arange(5))) == [0, 1, 0, 3, 1]
+
+
+def test_chain_is_one_cluster():
+    # 0~1 and 1~2 match, 0 and 2 do not: the ring still holds all three
+    matches = {(0, 1), (1, 2), (3, 4)}
+    links = DisjointSet(5)
+    for i in range(5):
+        candidates = np.arange(i + 1, 5)
+        link_record(links, i, candidates, lambda i, candidates: np.array([(i, int(c)) in matches for c in candidates], dtype=bool))
+    assert clusters(links, [10, 11, 12, 13, 14]) == [[10, 11, 12]]
+    assert clusters(links, [10, 11, 12, 13, 14], min_distinct_ids=2) == [[10, 11, 12], [13, 14]]
+
+
+def test_linked_pairs_are_not_scored_again():
+    scored = []
+
+    def is_match(i, candidates):
+        scored.extend((i, int(c)) for c in candidates)
+        return np.ones(len(candidates), dtype=bool)
+
+    links = DisjointSet(4)
+    for i in range(4):
+        link_record(links, i, np.arange(i + 1, 4), is_match)
+    assert scored == [(0, 1), (0, 2), (0, 3)]
+
+
+def test_clusters_count_distinct_ids():
+    links = DisjointSet.from_keys(['x', 'x', 'x', 'y', 'y', 'y'])
+    assert clusters(links, [1, 1, 2, 3, 4, 5]) == [[3, 4, 5]]
+
+
+def test_clusters_do_not_depend_on_row_order():
+    rng = np.random.default_rng(0)
+    edges = {tuple(sorted(pair)) for pair in rng.integers(0, 40, (30, 2)) if pair[0] != pair[1]}
+    ids = list(rng.integers(0, 30, 40))
+
+    def linked(order):
+        links = DisjointSet(len(order))
+        for k, record in enumerate(order):
+            candidates = np.arange(k + 1, len(order))
+            link_record(links, k, candidates, lambda k, candidates: np.array(
+                [tuple(sorted((order[k], order[c]))) in edges for c in candidates], dtype=bool))
+        return clusters(links, [ids[record] for record in order])
+
+    assert linked(list(range(40))) == linked(list(rng.permutation(40)))
+
+
+def typo(rng, text):
+    """One deleted, doubled or swapped letter."""
+    k = int(rng.integers(1, len(text) - 1))
+    kind = rng.integers(3)
+    if kind == 0:
+        return text[:k] + text[k + 1:]
+    if kind == 1:
+        return text[:k] + text[k] + text[k:]
+    return text[:k - 1] + text[k] + text[k - 1] + text[k + 1:]
+
+
+def addresses_fixture(seed, size=240):
+    """Cleaned addresses sharing the common 'chung cu' prefix, some with typos, most in rings of near-duplicates."""
+    rng = np.random.default_rng(seed)
+    addresses = []
+    while len(addresses) < size:
+        base = f"chung cu {STREETS[rng.integers(len(STREETS))]} {rng.integers(1, 40)} p {rng.integers(1, 15)} q {rng.integers(1, 12)}"
+        for _ in range(int(rng.integers(1, 6))):
+            addresses.append(typo(rng, base) if rng.random() < 0.5 else base)
+    return np.array(addresses[:size], dtype=object), list(rng.integers(0, size // 2, size))
+
+
+def address_match(addresses):
+    sorted_addresses = np.array([sort_tokens(address) for address in addresses], dtype=object)
+
+    def is_match(i, candidates):
+        scores = similarity_scores(sorted_addresses[i], sorted_addresses[candidates], THRESHOLD)
+        return (addresses[candidates] == addresses[i]) | (scores >= THRESHOLD)
+
+    return is_match
+
+
+def exhaustive_pairs(addresses):
+    """Every matching pair (i < j), scoring all of them."""
+    is_match = address_match(addresses)
+    return {(i, int(j)) for i in range(len(addresses)) for j in np.arange(i + 1, len(addresses))[is_match(i, np.arange(i + 1, len(addresses)))]}
+
+
+def blocked_pairs(blocks, size):
+    return {(int(i), int(j)) for i, candidates in candidate_lists(blocks, size) for j in candidates}
+
+
+def prefix_block_ids(addresses, ids, words=2):
+    """IDs found with the single prefix blocking the reports used before multi-pass blocking (every pair of a block scored)."""
+    is_match = address_match(addresses)
+    links = DisjointSet.from_keys(list(addresses))
+    prefixes = [" ".join(address.split()[:words]) for address in addresses]
+    for prefix in set(prefixes):
+        block = np.array([k for k in links.roots() if prefixes[k] == prefix])
+        for position, i in enumerate(block):
+            link_record(links, i, block[position + 1:], is_match)
+    return set().union(*(unique_ids for _, unique_ids in linked_clusters(links, ids)))
+
+
+def multi_pass_ids(addresses, ids, max_block_size, window=0):
+    is_match = address_match(addresses)
+    links, blocks = plan_blocks(list(addresses), [(addresses, 2)], max_block_size=max_block_size, window=window)
+    for i, candidates in candidate_lists(blocks, len(addresses)):
+        link_record(links, i, candidates, is_match)
+    return set().union(*(unique_ids for _, unique_ids in linked_clusters(links, ids)))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_oversized_prefix_block_keeps_every_pair(seed):
+    addresses, _ = addresses_fixture(seed)
+    links, blocks = plan_blocks(list(addresses), [(addresses, 2)], max_block_size=20, window=0)
+    scored = links.roots()
+    prefixes = np.array([" ".join(address.split()[:2]) for address in addresses], dtype=object)
+    # Most of the fixture is one 'chung cu' prefix block, far over max_block_size
+    assert (prefixes[scored] == 'chung cu').sum() > 100
+    expected = {(int(i), int(j)) for position, i in enumerate(scored) for j in scored[position + 1:] if prefixes[i] == prefixes[j]}
+    assert expected <= blocked_pairs(blocks, len(addresses))
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_multi_pass_recall_against_exhaustive_pairs(seed):
+    addresses, _ = addresses_fixture(seed)
+    links, blocks = plan_blocks(list(addresses), [(addresses, 3)], max_block_size=20)
+    roots = set(links.roots().tolist())
+    matching = {(i, j) for i, j in exhaustive_pairs(addresses) if i in roots and j in roots}
+    found = blocked_pairs(blocks, len(addresses))
+    _, prefix_blocks = plan_blocks(list(addresses), [(addresses, 3)], passes=['prefix'], window=0)
+    prefix_found = blocked_pairs(prefix_blocks, len(addresses))
+    # Passes only add candidates to the prefix blocking, and catch matching pairs it misses
+    assert prefix_found <= found
+    assert matching & prefix_found < matching & found
+
+
+@pytest.mark.parametrize('seed', range(5))
+def test_prefix_blocking_results_are_kept(seed):
+    addresses, ids = addresses_fixture(seed)
+    assert prefix_block_ids(addresses, ids) <= multi_pass_ids(addresses, ids, max_block_size=20)
+    assert prefix_block_ids(addresses, ids) <= multi_pass_ids(addresses, ids, max_block_size=20, window=5)
+
+
+def index_pairs(index, size):
+    """Pairs (i < j) listed by a QGramIndex, checking that each record comes once and in order."""
+    pairs, listed = set(), []
+    for i, candidates in index.candidates(size):
+        listed.append(int(i))
+        pairs.update((min(int(i), int(j)), max(int(i), int(j))) for j in candidates)
+    assert listed == sorted(set(listed))
+    return pairs
+
+
+@pytest.mark.parametrize('q', [1, 2, 3])
+@pytest.mark.parametrize('seed', range(3))
+def test_qgram_index_lists_every_matching_pair(seed, q):
+    addresses, _ = addresses_fixture(seed)
+    # Short strings are below the q-gram bound and paired through the extra token
+    addresses = np.concatenate([addresses, np.array(['q 1', 'p 1', 'q 11', 'p', 'cu 1'], dtype=object)])
+    texts = [sort_tokens(address) for address in addresses]
+    found = index_pairs(QGramIndex(texts, THRESHOLD, q=q), len(addresses))
+    assert exhaustive_pairs(addresses) <= found
+    assert len(found) < len(addresses) * (len(addresses) - 1) // 2
+
+
+@pytest.mark.parametrize('seed', range(3))
+def test_qgram_index_pairs_inside_each_group(seed):
+    addresses, _ = addresses_fixture(seed)
+    groups = np.random.default_rng(seed).integers(0, 3, len(addresses))
+    positions = np.arange(len(addresses)) * 2
+    index = QGramIndex([sort_tokens(address) for address in addresses], THRESHOLD, groups=groups, positions=positions)
+    found = index_pairs(index, 2 * len(addresses))
+    expected = {(2 * i, 2 * j) for i, j in exhaustive_pairs(addresses) if groups[i] == groups[j]}
+    assert expected <= found
+    assert all(groups[i // 2] == groups[j // 2] for i, j in found)
+
+
+def test_similar_address_needs_the_same_first_name_words(cold_engine):
+    address = '12 Le Loi, Phuong Ben Nghe, Quan 1'
+    rows = [{'Buyer User ID': buyer, 'item_name': name, 'Buyer Recipient Address District': address}
+            for buyer, name in [(1, 'Nguyen Van An'), (2, 'Tran Thi Bich'), (3, 'Le Van Cuong'),
+                                (4, 'Pham Minh Duc'), (5, 'Pham Minh Duc'), (6, 'Pham Minh Duc')]]
+    # An exact address match is enough within the same name words, never across different names
+    assert run_on_export('similar_address', rows, cold_engine) == {4, 5, 6}
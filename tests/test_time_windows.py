@@ -0,0 +1,86 @@
+"""find_ids_in_time_windows against the per-row scan of the legacy "N IDs within 1 hour" reports."""
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from bae_engine import find_ids_in_time_windows
+
+START = datetime(2025, 1, 6, 8)
+
+
+def legacy_windows(df, group_keys, time_col, threshold, skip_on_hit=False, window=timedelta(hours=1)):
+    """The loop of the legacy workers: a window holds row i and the later rows within `window` of it."""
+    df = df.dropna(subset=group_keys + [time_col]).sort_values(by=group_keys + [time_col])
+    found = set()
+    for _, group in df.groupby(group_keys, sort=False):
+        records = group.to_dict('records')
+        i = 0
+        while i < len(records):
+            j = i + 1
+            while j < len(records) and records[j][time_col] - records[i][time_col] <= window:
+                j += 1
+            ids = set(record['buyer_id'] for record in records[i:j])
+            if len(ids) >= threshold:
+                found.update(ids)
+                if skip_on_hit:
+                    i = j
+                    continue
+            i += 1
+    return found
+
+
+def orders(rows):
+    """(ip, minutes after START, buyer_id) -> frame."""
+    return pd.DataFrame([{'ip_checkout': ip, 'create_time': START + timedelta(minutes=minutes), 'buyer_id': buyer}
+                         for ip, minutes, buyer in rows])
+
+
+def test_window_end_is_inclusive():
+    df = orders([('a', 0, 1), ('a', 30, 2), ('a', 60, 3), ('a', 61, 4)])
+    assert find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [3]) == {3: {1, 2, 3, 4}}
+    assert find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [4]) == {4: set()}
+
+
+def test_repeated_ids_count_once():
+    df = orders([('a', 0, 1), ('a', 5, 1), ('a', 10, 2), ('a', 15, 2), ('a', 20, 1)])
+    assert find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [2, 3]) == {2: {1, 2}, 3: set()}
+
+
+def test_groups_and_missing_keys_are_separate():
+    df = orders([('a', 0, 1), ('a', 10, 2), ('b', 20, 3), (None, 30, 4), ('b', 40, 5)])
+    df.loc[len(df)] = {'ip_checkout': 'a', 'create_time': pd.NaT, 'buyer_id': 6}
+    assert find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [2, 3]) == {2: {1, 2, 3, 5}, 3: set()}
+
+
+def test_skip_on_hit_starts_after_the_hit_window():
+    # Without skipping, the window opened at 50 min also reaches {3, 4, 5}; with it, the scan
+    # resumes at 70 min, past the end of the window opened at 0.
+    df = orders([('a', 0, 1), ('a', 20, 2), ('a', 50, 3), ('a', 70, 4), ('a', 80, 5), ('a', 200, 6)])
+    assert find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [3]) == {3: {1, 2, 3, 4, 5}}
+    assert find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [3], skip_on_hit=True) == {3: {1, 2, 3}}
+
+
+def test_skip_on_hit_is_per_threshold():
+    df = orders([('a', 0, 1), ('a', 10, 2), ('a', 20, 3), ('a', 65, 4), ('a', 70, 5), ('a', 75, 6)])
+    result = find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [2, 3], skip_on_hit=True)
+    assert result[2] == legacy_windows(df, ['ip_checkout'], 'create_time', 2, skip_on_hit=True)
+    assert result[3] == legacy_windows(df, ['ip_checkout'], 'create_time', 3, skip_on_hit=True)
+
+
+def test_equal_times_share_the_window():
+    df = orders([('a', 0, 1), ('a', 0, 2), ('a', 0, 3), ('a', 0, 3)])
+    for skip_on_hit in (False, True):
+        assert find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [3], skip_on_hit=skip_on_hit) == {3: {1, 2, 3}}
+
+
+@pytest.mark.parametrize('skip_on_hit', [False, True])
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_legacy_scan_on_random_orders(seed, skip_on_hit):
+    rng = np.random.default_rng(seed)
+    rows = [(str(rng.integers(3)), int(rng.integers(0, 240)), int(rng.integers(12))) for _ in range(60)]
+    df = orders(rows).sample(frac=1, random_state=seed)
+    result = find_ids_in_time_windows(df, ['ip_checkout'], 'create_time', [2, 3, 4, 6], skip_on_hit=skip_on_hit)
+    for threshold, ids in result.items():
+        assert ids == legacy_windows(df, ['ip_checkout'], 'create_time', threshold, skip_on_hit=skip_on_hit)